@@ -0,0 +1,332 @@
+"""Admission control for LLM calls: token buckets per user and per provider."""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any
+
+from django.conf import settings
+
+MAX_USER_BUCKETS = 10_000
+MIN_POLL_SECONDS = 0.005
+MAX_POLL_SECONDS = 0.25
+
+
+class AdmissionRejected(Exception):
+    """The request could not be admitted; retry after retry_after seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"LLM request not admitted ({reason}); retry in {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _config() -> dict[str, Any]:
+    return getattr(settings, "LLM_ADMISSION", {}) or {}
+
+
+def is_enabled() -> bool:
+    return bool(_config().get("ENABLED", False))
+
+
+class TokenBucket:
+    """Classic token bucket: rate tokens/second, holding at most burst tokens."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now <= self.updated:
+            return
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self, count: int = 1) -> None:
+        self.tokens -= count
+
+    def whole_tokens(self, now: float) -> int:
+        self._refill(now)
+        return max(0, int(self.tokens))
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class _Waiter:
+    __slots__ = ("user_key", "tier", "provider", "enqueued_at", "granted")
+
+    def __init__(self, user_key, tier, provider, now):
+        self.user_key = user_key
+        self.tier = tier
+        self.provider = provider
+        self.enqueued_at = now
+        self.granted = False
+
+
+class AdmissionController:
+    """Token buckets plus a round-robin wait queue across users."""
+
+    def __init__(self, config: dict[str, Any] | None = None):
+        self._override = config
+        self._lock = threading.Lock()
+        self._user_buckets: dict[Any, tuple[tuple, TokenBucket]] = {}
+        self._provider_buckets: dict[str, tuple[tuple, TokenBucket]] = {}
+        # user_key -> FIFO of that user's waiters; dict order is the round-robin order.
+        self._queues: OrderedDict[Any, deque[_Waiter]] = OrderedDict()
+        self._depth = 0
+        self._waits: deque[float] = deque(maxlen=1000)
+        self._counts = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    @property
+    def config(self) -> dict[str, Any]:
+        return self._override if self._override is not None else _config()
+
+    # ---- buckets ----
+
+    def _bucket(self, table: dict, key: Any, limits: dict[str, float] | None) -> TokenBucket | None:
+        if not limits:
+            return None
+        params = (float(limits["rate_per_minute"]) / 60.0, float(limits["burst"]))
+        entry = table.get(key)
+        if entry is None or entry[0] != params:
+            entry = table[key] = (params, TokenBucket(*params))
+        return entry[1]
+
+    def _user_bucket(self, user_key: Any, tier: str | None) -> TokenBucket | None:
+        if user_key is None:
+            return None
+        tiers = self.config.get("TIERS", {})
+        return self._bucket(self._user_buckets, user_key, tiers.get(tier) or tiers.get("default"))
+
+    def _provider_bucket(self, provider: str) -> TokenBucket | None:
+        limits = self.config.get("PROVIDERS", {}).get(provider) or self.config.get("PROVIDER")
+        return self._bucket(self._provider_buckets, provider, limits)
+
+    def _prune_locked(self, now: float) -> None:
+        if len(self._user_buckets) <= MAX_USER_BUCKETS:
+            return
+        for key in [k for k, (_, b) in self._user_buckets.items() if b.is_full(now)]:
+            if key not in self._queues:
+                del self._user_buckets[key]
+
+    def _try_take_locked(self, user_key, tier, provider, now) -> bool:
+        user_bucket = self._user_bucket(user_key, tier)
+        provider_bucket = self._provider_bucket(provider)
+        if user_bucket is not None and not user_bucket.available(now):
+            return False
+        if provider_bucket is not None and not provider_bucket.available(now):
+            return False
+        if user_bucket is not None:
+            user_bucket.take()
+        if provider_bucket is not None:
+            provider_bucket.take()
+        return True
+
+    def _wait_hint_locked(self, waiter: _Waiter, now: float) -> float:
+        waits = [
+            b.wait_time(now)
+            for b in (self._user_bucket(waiter.user_key, waiter.tier), self._provider_bucket(waiter.provider))
+            if b is not None
+        ]
+        return max(waits, default=0.0)
+
+    # ---- queue ----
+
+    def _dispatch_locked(self, now: float) -> None:
+        """Grant queued requests round-robin (one per user per pass) while tokens last."""
+        progress = True
+        while self._queues and progress:
+            progress = False
+            for user_key in list(self._queues):
+                queue = self._queues[user_key]
+                head = queue[0]
+                if not self._try_take_locked(head.user_key, head.tier, head.provider, now):
+                    continue
+                queue.popleft()
+                head.granted = True
+                self._depth -= 1
+                self._waits.append(now - head.enqueued_at)
+                self._counts["admitted"] += 1
+                if queue:
+                    self._queues.move_to_end(user_key)
+                else:
+                    del self._queues[user_key]
+                progress = True
+
+    def _remove_locked(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.user_key)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        self._depth -= 1
+        if not queue:
+            del self._queues[waiter.user_key]
+
+    def _enter(self, user, provider: str) -> _Waiter | None:
+        """Admit immediately (None) or return a queued waiter; raise if the queue is full."""
+        user_key = getattr(user, "pk", None) if user is not None else None
+        tier = getattr(user, "subscription_tier", None)
+        now = time.monotonic()
+        with self._lock:
+            self._prune_locked(now)
+            if not self._queues and self._try_take_locked(user_key, tier, provider, now):
+                self._counts["admitted"] += 1
+                return None
+            waiter = _Waiter(user_key, tier, provider, now)
+            if self._depth >= int(self.config.get("MAX_QUEUE", 200)):
+                self._counts["rejected_queue_full"] += 1
+                raise AdmissionRejected("queue full", max(self._wait_hint_locked(waiter, now), 1.0))
+            self._queues.setdefault(user_key, deque()).append(waiter)
+            self._depth += 1
+            self._counts["queued"] += 1
+            self._dispatch_locked(now)
+            return None if waiter.granted else waiter
+
+    def _poll(self, waiter: _Waiter) -> float | None:
+        """None once admitted; otherwise seconds to sleep before polling again."""
+        deadline = waiter.enqueued_at + float(self.config.get("MAX_WAIT_SECONDS", 10))
+        now = time.monotonic()
+        with self._lock:
+            if not waiter.granted:
+                self._dispatch_locked(now)
+            if waiter.granted:
+                return None
+            if now >= deadline:
+                self._remove_locked(waiter)
+                self._counts["rejected_timeout"] += 1
+                raise AdmissionRejected("wait timeout", max(self._wait_hint_locked(waiter, now), 1.0))
+            hint = self._wait_hint_locked(waiter, now)
+        return min(deadline - now, max(MIN_POLL_SECONDS, min(hint, MAX_POLL_SECONDS)))
+
+    def try_admit(self, user=None, provider: str = "default") -> float:
+        """Admit now without queueing (0.0), else return seconds until a token is due."""
+        user_key = getattr(user, "pk", None) if user is not None else None
+        tier = getattr(user, "subscription_tier", None)
+        now = time.monotonic()
+        with self._lock:
+            if not self._queues and self._try_take_locked(user_key, tier, provider, now):
+                self._counts["admitted"] += 1
+                return 0.0
+            waiter = _Waiter(user_key, tier, provider, now)
+            return max(self._wait_hint_locked(waiter, now), MIN_POLL_SECONDS)
+
+    def admit_many(self, user=None, provider: str = "default", count: int = 1) -> int:
+        """Admit up to count calls now, without queueing; returns how many were admitted."""
+        user_key = getattr(user, "pk", None) if user is not None else None
+        tier = getattr(user, "subscription_tier", None)
+        now = time.monotonic()
+        with self._lock:
+            self._prune_locked(now)
+            if count <= 0 or user_key in self._queues:
+                return 0
+            buckets = [
+                b
+                for b in (self._user_bucket(user_key, tier), self._provider_bucket(provider))
+                if b is not None
+            ]
+            admitted = min([count] + [b.whole_tokens(now) for b in buckets])
+            for bucket in buckets:
+                bucket.take(admitted)
+            self._counts["admitted"] += admitted
+            return admitted
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Take a waiter whose caller gave up (cancelled) out of the queue."""
+        with self._lock:
+            self._remove_locked(waiter)
+
+    def admit(self, user=None, provider: str = "default") -> None:
+        """Block until the request may go upstream, or raise AdmissionRejected."""
+        waiter = self._enter(user, provider)
+        if waiter is None:
+            return
+        try:
+            while (delay := self._poll(waiter)) is not None:
+                time.sleep(delay)
+        finally:
+            self._abandon(waiter)
+
+    async def aadmit(self, user=None, provider: str = "default") -> None:
+        """Async variant of admit(); waits without holding a thread."""
+        waiter = self._enter(user, provider)
+        if waiter is None:
+            return
+        try:
+            while (delay := self._poll(waiter)) is not None:
+                await asyncio.sleep(delay)
+        finally:
+            self._abandon(waiter)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Queue depth, admission counters and queue wait times (seconds)."""
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                **self._counts,
+                "queue_depth": self._depth,
+                "waiting_users": len(self._queues),
+                "wait_seconds": {
+                    "samples": len(waits),
+                    "avg": sum(waits) / len(waits) if waits else None,
+                    "p95": waits[int(0.95 * (len(waits) - 1))] if waits else None,
+                    "max": waits[-1] if waits else None,
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._user_buckets.clear()
+            self._provider_buckets.clear()
+            self._queues.clear()
+            self._depth = 0
+            self._waits.clear()
+            for key in self._counts:
+                self._counts[key] = 0
+
+
+controller = AdmissionController()
+
+
+def admit(user=None, provider: str = "default") -> None:
+    """Admit one LLM call for user against provider (no-op when admission is disabled)."""
+    if is_enabled():
+        controller.admit(user, provider)
+
+
+async def aadmit(user=None, provider: str = "default") -> None:
+    """Async variant of admit()."""
+    if is_enabled():
+        await controller.aadmit(user, provider)
+
+
+def try_admit(user=None, provider: str = "default") -> float:
+    """Admit one call now (0.0) or return the seconds to wait before trying again."""
+    return controller.try_admit(user, provider) if is_enabled() else 0.0
+
+
+def admit_many(user=None, provider: str = "default", count: int = 1) -> int:
+    """Admit up to count LLM calls for user now, without waiting; returns how many."""
+    return controller.admit_many(user, provider, count) if is_enabled() else count
+
+
+def stats() -> dict[str, Any]:
+    return controller.snapshot()
@@ -1,18 +1,44 @@
+import asyncio
 import re
+import time
 import uuid
 from io import BytesIO
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.files.storage import default_storage
 from django.db import transaction
-from django.http import StreamingHttpResponse
+from django.http import HttpResponse
 from ninja import File, Router
 from ninja.files import UploadedFile
 
+from apps.ai import (
+    admission,
+    chat_memory,
+    cover_letters,
+    jobs,
+    llm_cache,
+    profile_cache,
+    retrieval,
+    user_providers,
+)
+from apps.ai.admission import AdmissionRejected
 from apps.ai.cv_parsing import extract_cv_text
+from apps.ai.pagination import InvalidCursor, paginate
+from apps.ai.streaming import (
+    HEARTBEAT,
+    ndjson_response,
+    sse_event,
+    sse_response,
+    streaming_response,
+    wants_sse,
+)
+from apps.ai.task_routing import request_overrides
 from apps.ai.models import (
     ChatMessage,
     ChatMessageRole,
     ChatSession,
+    CoverLetterJob,
     CVDocument,
     InterviewQuestion,
     Project,
@@ -20,10 +46,13 @@ from apps.ai.models import (
     WorkExperience,
 )
 from apps.ai.schemas import (
+    BulkCoverLetterIn,
+    BulkCoverLetterItemOut,
     ChatMessageIn,
     ChatMessageOut,
     ChatSessionOut,
     CoverLetterIn,
+    CoverLetterJobOut,
     CoverLetterOut,
     CVDocumentOut,
     ImproveAnswerIn,
@@ -38,10 +67,13 @@ from apps.ai.schemas import (
 )
 from apps.ai.services import (
     LLMService,
-    build_context,
-    build_cover_letter_system_prompt,
+    build_chat_system_prompt,
     build_improve_answer_system_prompt,
 )
+from providers.llm import metrics, usage
+from providers.llm.resilience import is_unavailable, resilience_snapshot
+from providers.llm.routing import latency_snapshot
+from providers.llm.tokens import count_tokens, prompt_budget
 
 router = Router(tags=["ai"])
 
@@ -50,6 +82,18 @@ ALLOWED_CV_CONTENT_TYPES = {
     "application/vnd.openxmlformats-officedocument.wordprocessingml.document",  # DOCX
 }
 MAX_CV_SIZE_BYTES = 10 * 1024 * 1024  # 10MB
+# Share of the chat prompt budget given to profile context; history gets the rest.
+CHAT_PROFILE_SHARE = 0.4
+# Listing sessions does not read their summaries.
+CHAT_SESSION_FIELDS = ("id", "user_id", "title", "created_at", "updated_at")
+LLM_UNAVAILABLE = {"detail": "AI service is temporarily unavailable. Please try again shortly."}
+
+
+def _rate_limited(exc: AdmissionRejected) -> dict:
+    return {
+        "detail": "Too many AI requests. Please wait a moment and try again.",
+        "retry_after": round(exc.retry_after, 1),
+    }
 
 
 def _safe_storage_name(original_name: str, prefix: str) -> str:
@@ -67,6 +111,33 @@ def ai_root(request):
     return {"detail": "Not implemented"}
 
 
+@router.get("llm/stats", response={200: dict, 401: dict, 403: dict})
+def llm_stats(request):
+    """
+    LLM health for monitoring: circuit breaker state and retry counts per provider,
+    routing latencies, response cache hit/miss counters, token usage per model
+    (including prompt-cache reads and writes), admission queue depth and wait
+    times, per-endpoint call metrics (TTFT, latency, tokens/sec, estimated cost),
+    and the per-user provider and profile context caches. Staff only.
+    """
+    if not request.user.is_authenticated:
+        return 401, {"detail": "Authentication required"}
+    if not request.user.is_staff:
+        return 403, {"detail": "Forbidden"}
+    return 200, {
+        "providers": resilience_snapshot(),
+        "routing": latency_snapshot(),
+        "response_cache": llm_cache.stats(),
+        "usage": usage.totals(),
+        "admission": admission.stats(),
+        "metrics": metrics.snapshot(),
+        "user_providers": user_providers.stats(),
+        "profile_cache": profile_cache.stats(),
+        "chat_memory": chat_memory.stats(),
+        "cover_letter_jobs": jobs.stats(),
+    }
+
+
 @router.post(
     "cv/upload",
     response={201: CVDocumentOut, 400: dict, 401: dict},
@@ -121,14 +192,35 @@ def cv_upload(request, file: File[UploadedFile] = None):
 
 @router.get(
     "chat/sessions",
-    response={200: list[ChatSessionOut], 401: dict},
+    response={200: list[ChatSessionOut], 400: dict, 401: dict},
 )
-def chat_list_sessions(request):
-    """List current user's chat sessions (newest first). Requires authentication."""
+def chat_list_sessions(
+    request,
+    response: HttpResponse,
+    before: str | None = None,
+    after: str | None = None,
+    limit: int | None = None,
+):
+    """
+    List current user's chat sessions (newest first). Requires authentication.
+    All of them unless paged: with `limit`, pass the X-Before-Cursor response
+    header as `before` for older sessions, X-After-Cursor as `after` for newer ones.
+    """
     if not request.user.is_authenticated:
         return 401, {"detail": "Authentication required"}
-    qs = ChatSession.objects.filter(user=request.user).order_by("-updated_at")[:50]
-    return 200, list(qs)
+    try:
+        page = paginate(
+            ChatSession.objects.filter(user=request.user).only(*CHAT_SESSION_FIELDS),
+            field="updated_at",
+            before=before,
+            after=after,
+            limit=limit,
+            newest_first=True,
+        )
+    except InvalidCursor as exc:
+        return 400, {"detail": str(exc)}
+    page.set_headers(response)
+    return 200, page.items
 
 
 @router.post(
@@ -145,82 +237,141 @@ def chat_create_session(request):
 
 @router.get(
     "chat/sessions/{session_id}/messages",
-    response={200: list[ChatMessageOut], 401: dict, 403: dict, 404: dict},
+    response={200: list[ChatMessageOut], 400: dict, 401: dict, 403: dict, 404: dict},
 )
-def chat_list_messages(request, session_id: uuid.UUID):
-    """List messages in a chat session. Requires auth; session must belong to user."""
+def chat_list_messages(
+    request,
+    session_id: uuid.UUID,
+    response: HttpResponse,
+    before: str | None = None,
+    after: str | None = None,
+    limit: int | None = None,
+):
+    """
+    List messages in a chat session, oldest first. Requires auth; session must belong to user.
+    All of them unless paged: with `limit` this is the latest page (the bottom of
+    the chat); pass the X-Before-Cursor response header as `before` to load older
+    messages, or X-After-Cursor as `after` for newer ones.
+    """
     if not request.user.is_authenticated:
         return 401, {"detail": "Authentication required"}
     try:
-        session = ChatSession.objects.get(pk=session_id)
+        session = ChatSession.objects.only("user_id").get(pk=session_id)
     except ChatSession.DoesNotExist:
         return 404, {"detail": "Session not found"}
     if session.user_id != request.user.id:
         return 403, {"detail": "Forbidden"}
-    qs = ChatMessage.objects.filter(session=session).order_by("created_at")
-    return 200, list(qs)
+    try:
+        page = paginate(
+            ChatMessage.objects.filter(session=session),
+            field="created_at",
+            before=before,
+            after=after,
+            limit=limit,
+        )
+    except InvalidCursor as exc:
+        return 400, {"detail": str(exc)}
+    page.set_headers(response)
+    return 200, page.items
 
 
 @router.post(
     "chat/sessions/{session_id}/messages",
-    response={200: None, 400: dict, 401: dict, 403: dict, 404: dict},
+    response={200: None, 400: dict, 401: dict, 403: dict, 404: dict, 429: dict},
 )
-def chat_send_message(request, session_id: uuid.UUID, payload: ChatMessageIn):
+async def chat_send_message(request, session_id: uuid.UUID, payload: ChatMessageIn):
     """
     Send a message and stream the assistant reply. Uses profile context.
     Requires authentication; session must belong to the user.
+    The reply is plain text, or Server-Sent Events with Accept: text/event-stream.
+    Async so that, under ASGI, a stream does not hold a worker for its duration.
     """
-    if not request.user.is_authenticated:
+    user = await request.auser()
+    if not user.is_authenticated:
         return 401, {"detail": "Authentication required"}
     try:
-        session = ChatSession.objects.get(pk=session_id)
+        session = await ChatSession.objects.aget(pk=session_id)
     except ChatSession.DoesNotExist:
         return 404, {"detail": "Session not found"}
-    if session.user_id != request.user.id:
+    if session.user_id != user.id:
         return 403, {"detail": "Forbidden"}
     content = (payload.content or "").strip()
     if not content:
         return 400, {"detail": "Message content is required"}
 
-    ChatMessage.objects.create(
+    service = await LLMService.acreate(
+        endpoint="chat", user=user, route_overrides=request_overrides(request, user)
+    )
+    try:
+        await service.aadmit()
+    except AdmissionRejected as exc:
+        return 429, _rate_limited(exc)
+    model = service.model
+    await ChatMessage.objects.acreate(
         session=session,
         role=ChatMessageRole.USER,
         content=content,
+        token_count=count_tokens(content, model),
     )
     if not session.title:
         session.title = content[:200] if len(content) > 200 else content
-        session.save(update_fields=["title", "updated_at"])
-
-    history = [
-        {"role": msg.role, "content": msg.content}
-        for msg in session.messages.order_by("created_at")
-    ]
-    system_prompt = build_context(request.user)
-    service = LLMService()
+        await session.asave(update_fields=["title", "updated_at"])
+
+    budget = prompt_budget(model, service.max_tokens)
+    profile_budget = int(budget * CHAT_PROFILE_SHARE)
+    if retrieval.is_enabled():
+        profile_context, excerpts = await profile_cache.aget_grounding(
+            user, content, max_tokens=profile_budget, model=model
+        )
+    else:
+        profile_context = await profile_cache.aget_context(
+            user, max_tokens=profile_budget, model=model
+        )
+        excerpts = ""
+    window = await chat_memory.aload_window(
+        session,
+        max_tokens=budget - count_tokens(profile_context, model) - count_tokens(excerpts, model),
+        model=model,
+    )
+    system_prompt = build_chat_system_prompt(
+        profile_context,
+        summary=window.summary,
+        excerpts=excerpts,
+        cache_profile=not retrieval.is_enabled(),
+    )
+    history = window.history
     accumulated: list[str] = []
 
-    def stream_gen():
-        nonlocal accumulated
+    async def stream_gen():
+        # On client disconnect Django cancels the response (CancelledError) or
+        # closes this generator (GeneratorExit); either way the provider stream
+        # is closed at once and whatever arrived is saved as a truncated reply.
+        stream = service.astream_complete(
+            history,
+            system_prompt=system_prompt,
+            max_tokens=service.max_tokens,
+        )
+        completed = False
         try:
-            for chunk in service.stream_complete(
-                history,
-                system_prompt=system_prompt,
-                max_tokens=2048,
-            ):
+            async for chunk in stream:
                 accumulated.append(chunk)
                 yield chunk
+            completed = True
         finally:
+            await stream.aclose()
             if accumulated:
-                ChatMessage.objects.create(
+                reply = "".join(accumulated)
+                await ChatMessage.objects.acreate(
                     session=session,
                     role=ChatMessageRole.ASSISTANT,
-                    content="".join(accumulated),
+                    content=reply,
+                    token_count=count_tokens(reply, model),
+                    is_truncated=not completed,
                 )
+            if window.due:
+                chat_memory.schedule(session.id)
 
-    return StreamingHttpResponse(
-        stream_gen(),
-        content_type="text/plain; charset=utf-8",
-    )
+    return streaming_response(stream_gen(), sse=wants_sse(request))
 
 
 # ---- Cover Letter ----
@@ -228,26 +379,254 @@ def chat_send_message(request, session_id: uuid.UUID, payload: ChatMessageIn):
 
 @router.post(
     "cover-letter",
-    response={200: CoverLetterOut, 400: dict, 401: dict},
+    response={200: CoverLetterOut, 400: dict, 401: dict, 429: dict, 503: dict},
 )
-def generate_cover_letter(request, payload: CoverLetterIn):
+async def generate_cover_letter(request, payload: CoverLetterIn):
     """
     Generate a cover letter from the user's profile and the given job description.
-    Requires authentication.
+    Requires authentication. The letter is stored as an AIOutput (output_id); the
+    same job description and tone return the stored letter (reused) until the
+    profile changes, unless regenerate is set.
+    For long generations prefer POST cover-letter/jobs, which returns at once.
     """
-    if not request.user.is_authenticated:
+    user = await request.auser()
+    if not user.is_authenticated:
         return 401, {"detail": "Authentication required"}
     jd = (payload.job_description or "").strip()
     if not jd:
         return 400, {"detail": "Job description is required"}
-    profile_context = build_context(request.user)
-    system_prompt = build_cover_letter_system_prompt(
-        profile_context, jd, tone=payload.tone or "formal"
+    overrides = request_overrides(request, user)
+    if not (payload.regenerate or overrides):
+        stored = await cover_letters.afind_output(user, jd, payload.tone)
+        if stored is not None:
+            return 200, CoverLetterOut(cover_letter=stored.content, output_id=stored.id, reused=True)
+    prompt = await cover_letters.aprepare(user, jd, payload.tone, route_overrides=overrides)
+    try:
+        text = await prompt.service.acomplete(
+            prompt.messages, system_prompt=prompt.system_prompt, max_tokens=prompt.max_tokens
+        )
+    except AdmissionRejected as exc:
+        return 429, _rate_limited(exc)
+    except Exception as exc:
+        if is_unavailable(exc):
+            return 503, LLM_UNAVAILABLE
+        raise
+    text = text.strip()
+    job_description = await cover_letters.arecord_job_description(user, jd)
+    output = await cover_letters.asave_output(user, prompt, text, job_description)
+    return 200, CoverLetterOut(cover_letter=text, output_id=output.id)
+
+
+@router.post(
+    "cover-letter/stream",
+    response={200: None, 400: dict, 401: dict, 429: dict},
+)
+async def stream_cover_letter(request, payload: CoverLetterIn):
+    """
+    Generate a cover letter like POST cover-letter, streaming it as it is written
+    (plain text, or Server-Sent Events with Accept: text/event-stream, as for chat).
+    The letter is stored as an AIOutput once the stream has completed; a stored
+    letter for the same request is sent in one piece.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return 401, {"detail": "Authentication required"}
+    jd = (payload.job_description or "").strip()
+    if not jd:
+        return 400, {"detail": "Job description is required"}
+    overrides = request_overrides(request, user)
+    if not (payload.regenerate or overrides):
+        stored = await cover_letters.afind_output(user, jd, payload.tone)
+        if stored is not None:
+
+            async def stored_gen():
+                yield stored.content
+
+            return streaming_response(stored_gen(), sse=wants_sse(request))
+    prompt = await cover_letters.aprepare(user, jd, payload.tone, route_overrides=overrides)
+    try:
+        await prompt.service.aadmit()
+    except AdmissionRejected as exc:
+        return 429, _rate_limited(exc)
+
+    async def stream_gen():
+        # A letter cut short (client gone, provider failure) is not stored.
+        stream = prompt.service.astream_complete(
+            prompt.messages, system_prompt=prompt.system_prompt, max_tokens=prompt.max_tokens
+        )
+        parts: list[str] = []
+        try:
+            async for chunk in stream:
+                parts.append(chunk)
+                yield chunk
+        finally:
+            await stream.aclose()
+        text = "".join(parts).strip()
+        if text:
+            job_description = await cover_letters.arecord_job_description(user, jd)
+            await cover_letters.asave_output(user, prompt, text, job_description)
+
+    return streaming_response(stream_gen(), sse=wants_sse(request))
+
+
+@router.post(
+    "cover-letter/bulk",
+    response={200: None, 400: dict, 401: dict},
+)
+async def bulk_cover_letters(request, payload: BulkCoverLetterIn):
+    """
+    Cover letters for several tracked applications and/or pasted job descriptions,
+    streamed as NDJSON: one BulkCoverLetterItemOut per line, in order of completion.
+    Letters are generated concurrently from one profile context and stored as
+    AIOutputs; stored letters are reused as for POST cover-letter. As many
+    letters as the user's admission budget allows are generated here; the rest
+    are queued as cover-letter jobs and their lines carry a job_id instead.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return 401, {"detail": "Authentication required"}
+    texts = [jd.strip() for jd in payload.job_descriptions]
+    if not (payload.application_ids or texts) or not all(texts):
+        return 400, {"detail": "Application ids or job descriptions are required"}
+    limit = cover_letters.max_bulk_items()
+    if len(payload.application_ids) + len(texts) > limit:
+        return 400, {"detail": f"At most {limit} cover letters per request"}
+    items = await cover_letters.aresolve_items(user, payload.application_ids, texts)
+    overrides = request_overrides(request, user)
+    batch = await cover_letters.aprepare_many(
+        user,
+        items,
+        payload.tone,
+        reuse=not (payload.regenerate or overrides),
+        route_overrides=overrides,
+    )
+    batch.admit()
+    queued = await sync_to_async(
+        lambda: [
+            jobs.enqueue(user, item.text, batch.tone, reuse=False, application_id=item.application_id)
+            for item in batch.deferred
+        ]
+    )()
+    results = cover_letters.agenerate_many(batch)
+
+    async def lines():
+        for item, job in zip(batch.deferred, queued):
+            line = BulkCoverLetterItemOut(
+                index=item.index, application_id=item.application_id, job_id=job.id
+            )
+            yield line.model_dump_json().encode() + b"\n"
+        try:
+            async for result in results:
+                line = BulkCoverLetterItemOut(
+                    index=result.item.index,
+                    application_id=result.item.application_id,
+                    cover_letter=result.output.content if result.output else None,
+                    output_id=result.output.id if result.output else None,
+                    reused=result.reused,
+                    error=result.error,
+                )
+                yield line.model_dump_json().encode() + b"\n"
+        finally:
+            await results.aclose()
+
+    return ndjson_response(lines())
+
+
+def _job_out(job: CoverLetterJob) -> CoverLetterJobOut:
+    return CoverLetterJobOut(
+        id=job.id,
+        status=job.status,
+        progress_chars=job.progress_chars,
+        cover_letter=job.output.content if job.output else None,
+        output_id=job.output_id,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
     )
-    messages = [{"role": "user", "content": "Please write the cover letter based on the instructions above."}]
-    service = LLMService()
-    text = service.complete(messages, system_prompt=system_prompt, max_tokens=1024)
-    return 200, CoverLetterOut(cover_letter=text.strip())
+
+
+async def _job_events(job: CoverLetterJob):
+    """SSE feed for job: its state on every change, heartbeats while idle, then "end"."""
+    poll = float(getattr(settings, "LLM_COVER_LETTER_JOBS", {}).get("POLL_SECONDS", 1.0))
+    heartbeat = float(getattr(settings, "LLM_STREAMING", {}).get("HEARTBEAT_SECONDS", 15))
+    event_id = 0
+    last_state = None
+    last_sent = time.monotonic()
+    while True:
+        state = (job.status, job.progress_chars)
+        if state != last_state:
+            event_id += 1
+            data = _job_out(job).model_dump_json().encode()
+            yield sse_event(data, event_id=event_id, event="status")
+            last_state, last_sent = state, time.monotonic()
+        elif time.monotonic() - last_sent >= heartbeat:
+            yield HEARTBEAT
+            last_sent = time.monotonic()
+        if job.status in jobs.TERMINAL_STATUSES:
+            yield sse_event(b"", event_id=event_id + 1, event="end")
+            return
+        await asyncio.sleep(poll)
+        job = await CoverLetterJob.objects.select_related("output").aget(pk=job.pk)
+
+
+@router.post(
+    "cover-letter/jobs",
+    response={202: CoverLetterJobOut, 400: dict, 401: dict},
+)
+async def enqueue_cover_letter(request, payload: CoverLetterIn):
+    """
+    Queue a cover letter for the given job description and return the job at once.
+    Follow it with GET cover-letter/jobs/{id} (polling) or .../events (SSE).
+    A letter already stored for the same request gives a job that has succeeded.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return 401, {"detail": "Authentication required"}
+    jd = (payload.job_description or "").strip()
+    if not jd:
+        return 400, {"detail": "Job description is required"}
+    job = await sync_to_async(jobs.enqueue)(user, jd, payload.tone, reuse=not payload.regenerate)
+    return 202, _job_out(job)
+
+
+@router.get(
+    "cover-letter/jobs/{job_id}",
+    response={200: CoverLetterJobOut, 401: dict, 403: dict, 404: dict},
+)
+async def get_cover_letter_job(request, job_id: uuid.UUID):
+    """Status of a cover-letter job; includes the letter once it has succeeded."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return 401, {"detail": "Authentication required"}
+    try:
+        job = await CoverLetterJob.objects.select_related("output").aget(pk=job_id)
+    except CoverLetterJob.DoesNotExist:
+        return 404, {"detail": "Job not found"}
+    if job.user_id != user.id:
+        return 403, {"detail": "Forbidden"}
+    return 200, _job_out(job)
+
+
+@router.get(
+    "cover-letter/jobs/{job_id}/events",
+    response={200: None, 401: dict, 403: dict, 404: dict},
+)
+async def cover_letter_job_events(request, job_id: uuid.UUID):
+    """
+    Server-Sent Events for a cover-letter job: a "status" event (the job as JSON)
+    whenever its status or progress changes, then "end" once it has finished.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return 401, {"detail": "Authentication required"}
+    try:
+        job = await CoverLetterJob.objects.select_related("output").aget(pk=job_id)
+    except CoverLetterJob.DoesNotExist:
+        return 404, {"detail": "Job not found"}
+    if job.user_id != user.id:
+        return 403, {"detail": "Forbidden"}
+    return sse_response(_job_events(job))
 
 
 # ---- Q&A Improvement ----
@@ -255,14 +634,15 @@ def generate_cover_letter(request, payload: CoverLetterIn):
 
 @router.post(
     "improve-answer",
-    response={200: ImproveAnswerOut, 400: dict, 401: dict, 403: dict, 404: dict},
+    response={200: ImproveAnswerOut, 400: dict, 401: dict, 403: dict, 404: dict, 429: dict, 503: dict},
 )
-def improve_answer(request, payload: ImproveAnswerIn):
+async def improve_answer(request, payload: ImproveAnswerIn):
     """
     Send draft interview answer to LLM; returns STAR-formatted improved version.
     Optionally pass user_answer_id to save the result to that UserAnswer.
     """
-    if not request.user.is_authenticated:
+    user = await request.auser()
+    if not user.is_authenticated:
         return 401, {"detail": "Authentication required"}
     draft = (payload.draft_answer or "").strip()
     if not draft:
@@ -271,20 +651,32 @@ def improve_answer(request, payload: ImproveAnswerIn):
     user_answer = None
     if payload.user_answer_id is not None:
         try:
-            user_answer = UserAnswer.objects.get(pk=payload.user_answer_id)
+            user_answer = await UserAnswer.objects.aget(pk=payload.user_answer_id)
         except UserAnswer.DoesNotExist:
             return 404, {"detail": "UserAnswer not found"}
-        if user_answer.user_id != request.user.id:
+        if user_answer.user_id != user.id:
             return 403, {"detail": "Forbidden"}
 
     system_prompt = build_improve_answer_system_prompt(payload.question)
     messages = [{"role": "user", "content": draft}]
-    improved = LLMService().complete(messages, system_prompt=system_prompt, max_tokens=1024)
+    service = await LLMService.acreate(
+        endpoint="improve_answer", user=user, route_overrides=request_overrides(request, user)
+    )
+    try:
+        improved = await service.acomplete(
+            messages, system_prompt=system_prompt, max_tokens=service.max_tokens
+        )
+    except AdmissionRejected as exc:
+        return 429, _rate_limited(exc)
+    except Exception as exc:
+        if is_unavailable(exc):
+            return 503, LLM_UNAVAILABLE
+        raise
 
     if user_answer:
         user_answer.ai_improved_answer = improved
         user_answer.is_ai_generated = True
-        user_answer.save(update_fields=["ai_improved_answer", "is_ai_generated", "updated_at"])
+        await user_answer.asave(update_fields=["ai_improved_answer", "is_ai_generated", "updated_at"])
 
     return 200, ImproveAnswerOut(improved_answer=improved)
 
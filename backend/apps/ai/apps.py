@@ -3,3 +3,34 @@ from django.apps import AppConfig
 
 class AiConfig(AppConfig):
     name = "apps.ai"
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import post_delete, post_save, pre_save
+
+        from apps.ai import profile_cache, user_providers
+        from apps.ai.models import CVDocument, Education, Project, WorkExperience
+        from apps.users.models import UserProviderSettings
+
+        for signal in (post_save, post_delete):
+            signal.connect(
+                user_providers._settings_changed,
+                sender=UserProviderSettings,
+                dispatch_uid="ai.user_providers.invalidate",
+            )
+            for model in (WorkExperience, Project, Education, CVDocument):
+                signal.connect(
+                    profile_cache._profile_row_changed,
+                    sender=model,
+                    dispatch_uid=f"ai.profile_cache.{model.__name__}",
+                )
+        pre_save.connect(
+            profile_cache._user_saving,
+            sender=get_user_model(),
+            dispatch_uid="ai.profile_cache.user_saving",
+        )
+        post_save.connect(
+            profile_cache._user_saved,
+            sender=get_user_model(),
+            dispatch_uid="ai.profile_cache.user",
+        )
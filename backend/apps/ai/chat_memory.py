@@ -0,0 +1,173 @@
+"""Chat session memory: a verbatim message window plus a rolling summary."""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from apps.ai.models import ChatSession
+from apps.ai.services import HISTORY_FIELDS, LLMService, fit_history
+from providers.llm.tokens import count_tokens, prompt_budget, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_ENDPOINT = "chat_summary"
+# Admission bucket for summaries: background work, so not charged to the user.
+SUMMARY_ADMISSION_BUCKET = "chat_summary"
+
+SUMMARY_SYSTEM_PROMPT = """You maintain the running summary of a conversation between a job seeker and their AI career assistant.
+
+Update the current summary with the new messages. Keep facts about the user, their goals, decisions made, advice given and open questions; drop greetings and small talk. Write in the third person, as short paragraphs or bullet points. Reply with the updated summary only."""
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+# Session ids with a job queued or running; a session is summarised by one job at a time.
+_pending: set[Any] = set()
+_lock = threading.Lock()
+_counts = {"scheduled": 0, "skipped": 0, "completed": 0, "conflicts": 0, "failed": 0}
+
+
+def _config() -> dict[str, Any]:
+    return getattr(settings, "LLM_CHAT_MEMORY", {}) or {}
+
+
+def _window() -> int:
+    return int(_config().get("WINDOW_MESSAGES", 12))
+
+
+def _read_limit() -> int:
+    return _window() + int(_config().get("SUMMARY_BATCH", 8))
+
+
+@dataclass
+class Window:
+    """What a chat turn sends: the summary and the recent messages that fit."""
+
+    summary: str
+    history: list[dict[str, str]]
+    # A summary job should run after this turn.
+    due: bool = False
+
+
+async def aload_window(session: ChatSession, *, max_tokens: int, model: str | None = None) -> Window:
+    """
+    The session's summary and its unsummarised messages that fit in max_tokens
+    (the summary's tokens included), oldest first.
+    """
+    summary = session.summary or ""
+    limit = _read_limit()
+    messages = session.messages.order_by("-created_at").only(*HISTORY_FIELDS)
+    if session.summarised_until is not None:
+        messages = messages.filter(created_at__gt=session.summarised_until)
+    rows = [msg async for msg in messages[:limit]]
+    history = fit_history(rows, max_tokens=max_tokens - count_tokens(summary, model), model=model)
+    return Window(summary=summary, history=history, due=len(rows) >= limit)
+
+
+def _transcript(messages, summary: str, max_tokens: int, model: str | None) -> str:
+    lines = [f"{msg.get_role_display()}: {msg.content}" for msg in messages]
+    text = "\n\n".join(lines)
+    return (
+        f"Current summary:\n{summary or '(none yet)'}\n\n"
+        f"New messages:\n{truncate_to_tokens(text, max_tokens, model)}"
+    )
+
+
+def summarise(session_id) -> bool:
+    """
+    Fold the session's messages older than the window into its summary.
+    Returns True when the summary was updated.
+    """
+    session = ChatSession.objects.filter(pk=session_id).first()
+    if session is None:
+        return False
+    cursor = session.summarised_until
+    window = _window()
+    messages = session.messages.order_by("created_at").only(*HISTORY_FIELDS, "created_at")
+    if cursor is not None:
+        messages = messages.filter(created_at__gt=cursor)
+    # Oldest unsummarised first; a backlog larger than this is folded over several jobs.
+    rows = list(messages[: window + int(_config().get("MAX_FOLD_MESSAGES", 40))])
+    fold = rows[: len(rows) - window]
+    if not fold:
+        return False
+
+    service = LLMService(endpoint=SUMMARY_ENDPOINT, admission_bucket=SUMMARY_ADMISSION_BUCKET)
+    model = service.model
+    budget = prompt_budget(model, service.max_tokens) - count_tokens(SUMMARY_SYSTEM_PROMPT, model)
+    summary_tokens = count_tokens(session.summary, model)
+    prompt = _transcript(fold, session.summary, max(budget - summary_tokens, 0), model)
+    summary = service.complete(
+        [{"role": "user", "content": prompt}],
+        system_prompt=SUMMARY_SYSTEM_PROMPT,
+        max_tokens=service.max_tokens,
+    ).strip()
+    if not summary:
+        return False
+
+    # Write only if no other job moved the cursor since it was read.
+    updated = ChatSession.objects.filter(pk=session.pk, summarised_until=cursor).update(
+        summary=summary, summarised_until=fold[-1].created_at
+    )
+    if not updated:
+        with _lock:
+            _counts["conflicts"] += 1
+        return False
+    return True
+
+
+def _run(session_id) -> None:
+    close_old_connections()
+    try:
+        if summarise(session_id):
+            with _lock:
+                _counts["completed"] += 1
+    except Exception:
+        logger.exception("Summarising chat session %s failed", session_id)
+        with _lock:
+            _counts["failed"] += 1
+    finally:
+        with _lock:
+            _pending.discard(session_id)
+        close_old_connections()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(_config().get("WORKERS", 2)),
+                thread_name_prefix="chat-summary",
+            )
+        return _executor
+
+
+def schedule(session_id) -> bool:
+    """Queue a summary job for the session unless one is already queued or running."""
+    if not _config().get("ENABLED", True):
+        return False
+    with _lock:
+        if session_id in _pending:
+            _counts["skipped"] += 1
+            return False
+        _pending.add(session_id)
+        _counts["scheduled"] += 1
+    _pool().submit(_run, session_id)
+    return True
+
+
+def stats() -> dict[str, int]:
+    with _lock:
+        return {**_counts, "pending": len(_pending)}
+
+
+def reset() -> None:
+    with _lock:
+        _pending.clear()
+        for key in _counts:
+            _counts[key] = 0
@@ -0,0 +1,385 @@
+"""Cover-letter generation shared by the cover-letter endpoints and job worker."""
+
+import hashlib
+import re
+import unicodedata
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.conf import settings
+
+from apps.ai import profile_cache
+from apps.ai.admission import AdmissionRejected
+from apps.ai.models import AIOutput, AIOutputType, JobDescription
+from apps.ai.services import (
+    COVER_LETTER_TONE_INSTRUCTIONS,
+    DEFAULT_PROFILE_MAX_TOKENS,
+    CompletionRequest,
+    LLMService,
+    build_cover_letter_system_blocks,
+)
+from apps.tracker.models import Application
+from providers.llm.base import SystemBlock, system_text
+from providers.llm.resilience import is_unavailable
+from providers.llm.tokens import count_tokens, prompt_budget, truncate_to_tokens
+
+ENDPOINT = "cover_letter"
+DEFAULT_TONE = "formal"
+REQUEST_MESSAGES = [
+    {"role": "user", "content": "Please write the cover letter based on the instructions above."}
+]
+
+_BLANKS_RE = re.compile(r"[ \t\f\v\u00a0]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def normalize_job_description(text: str) -> str:
+    """Canonical form of a job description: NFC, trimmed lines, at most one blank line in a row."""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = (_BLANKS_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 (hex) of the normalised job description: JobDescription.content_hash."""
+    return hashlib.sha256(normalize_job_description(text).encode("utf-8")).hexdigest()
+
+
+def normalize_tone(tone: str | None) -> str:
+    """The tone a letter is actually written in (unknown tones fall back to formal)."""
+    tone = (tone or DEFAULT_TONE).lower()
+    return tone if tone in COVER_LETTER_TONE_INSTRUCTIONS else DEFAULT_TONE
+
+
+@dataclass
+class CoverLetterPrompt:
+    """A prepared cover-letter request."""
+
+    service: LLMService
+    system_prompt: list[SystemBlock]
+    tone: str = DEFAULT_TONE
+    messages: list[dict[str, str]] = field(default_factory=lambda: list(REQUEST_MESSAGES))
+
+    @property
+    def max_tokens(self) -> int:
+        return self.service.max_tokens
+
+
+def _service(user, route_overrides: dict[str, Any] | None) -> tuple[LLMService, int]:
+    service = LLMService(endpoint=ENDPOINT, user=user, route_overrides=route_overrides)
+    return service, prompt_budget(service.model, service.max_tokens)
+
+
+async def _aservice(user, route_overrides: dict[str, Any] | None) -> tuple[LLMService, int]:
+    service = await LLMService.acreate(endpoint=ENDPOINT, user=user, route_overrides=route_overrides)
+    return service, prompt_budget(service.model, service.max_tokens)
+
+
+def _fit(service: LLMService, budget: int, job_description: str) -> tuple[str, int]:
+    """The job description trimmed to half the budget, and the profile's budget."""
+    model = service.model
+    jd = truncate_to_tokens(job_description, budget // 2, model)
+    return jd, min(DEFAULT_PROFILE_MAX_TOKENS, budget - count_tokens(jd, model))
+
+
+def prepare(
+    user,
+    job_description: str,
+    tone: str | None = None,
+    *,
+    route_overrides: dict[str, Any] | None = None,
+) -> CoverLetterPrompt:
+    """Service and prompt for a letter for job_description (sync callers, e.g. workers)."""
+    service, budget = _service(user, route_overrides)
+    jd, profile_budget = _fit(service, budget, job_description)
+    profile_context = profile_cache.get_context(user, max_tokens=profile_budget, model=service.model)
+    tone = normalize_tone(tone)
+    return CoverLetterPrompt(service, build_cover_letter_system_blocks(profile_context, jd, tone=tone), tone)
+
+
+async def aprepare(
+    user,
+    job_description: str,
+    tone: str | None = None,
+    *,
+    route_overrides: dict[str, Any] | None = None,
+) -> CoverLetterPrompt:
+    """Async variant of prepare(); database lookups only happen on cache misses."""
+    service, budget = await _aservice(user, route_overrides)
+    jd, profile_budget = _fit(service, budget, job_description)
+    profile_context = await profile_cache.aget_context(
+        user, max_tokens=profile_budget, model=service.model
+    )
+    tone = normalize_tone(tone)
+    return CoverLetterPrompt(service, build_cover_letter_system_blocks(profile_context, jd, tone=tone), tone)
+
+
+def record_job_description(user, raw_text: str, application_id=None) -> JobDescription:
+    """The user's JobDescription for raw_text, created on first use (keyed by content hash)."""
+    text = normalize_job_description(raw_text)
+    job_description, _ = JobDescription.objects.get_or_create(
+        user=user,
+        content_hash=content_hash(text),
+        defaults={"raw_text": text, "application_id": application_id},
+    )
+    return job_description
+
+
+async def arecord_job_description(user, raw_text: str, application_id=None) -> JobDescription:
+    text = normalize_job_description(raw_text)
+    job_description, _ = await JobDescription.objects.aget_or_create(
+        user=user,
+        content_hash=content_hash(text),
+        defaults={"raw_text": text, "application_id": application_id},
+    )
+    return job_description
+
+
+def _reusable(user, job_description: str, tone: str | None):
+    return AIOutput.objects.filter(
+        user=user,
+        type=AIOutputType.COVER_LETTER,
+        job_description__content_hash=content_hash(job_description),
+        tone=normalize_tone(tone),
+        profile_version=user.profile_version,
+    ).order_by("-created_at")
+
+
+def find_output(user, job_description: str, tone: str | None = None) -> AIOutput | None:
+    """The latest letter stored for this job description, tone and the user's current profile."""
+    return _reusable(user, job_description, tone).first()
+
+
+async def afind_output(user, job_description: str, tone: str | None = None) -> AIOutput | None:
+    return await _reusable(user, job_description, tone).afirst()
+
+
+def _output(user, prompt: CoverLetterPrompt, text: str, job_description: JobDescription | None) -> AIOutput:
+    return AIOutput(
+        user=user,
+        type=AIOutputType.COVER_LETTER,
+        job_description=job_description,
+        application_id=job_description.application_id if job_description else None,
+        content=text,
+        prompt_snapshot=system_text(prompt.system_prompt),
+        tone=prompt.tone,
+        profile_version=user.profile_version,
+    )
+
+
+def save_output(
+    user, prompt: CoverLetterPrompt, text: str, job_description: JobDescription | None = None
+) -> AIOutput:
+    output = _output(user, prompt, text, job_description)
+    output.save()
+    return output
+
+
+async def asave_output(
+    user, prompt: CoverLetterPrompt, text: str, job_description: JobDescription | None = None
+) -> AIOutput:
+    output = _output(user, prompt, text, job_description)
+    await output.asave()
+    return output
+
+
+def error_message(exc: Exception) -> str:
+    """What to tell the user about a letter that could not be generated."""
+    if isinstance(exc, AdmissionRejected):
+        return "Too many AI requests. Please try again shortly."
+    if is_unavailable(exc):
+        return "AI service is temporarily unavailable. Please try again shortly."
+    return "Cover letter generation failed."
+
+
+def _bulk_config() -> dict[str, Any]:
+    return getattr(settings, "LLM_COVER_LETTER_BULK", {}) or {}
+
+
+def max_bulk_items() -> int:
+    return int(_bulk_config().get("MAX_ITEMS", 50))
+
+
+@dataclass
+class BulkItem:
+    """One letter of a bulk request; text is None when the application was not found."""
+
+    index: int
+    text: str | None
+    application_id: Any = None
+
+
+@dataclass
+class BulkResult:
+    """Outcome of one BulkItem; output is None when error is set."""
+
+    item: BulkItem
+    output: AIOutput | None = None
+    reused: bool = False
+    error: str | None = None
+
+
+def application_text(application: Application) -> str:
+    """Job description text made from a tracked application with no stored job description."""
+    lines = [f"{application.job_title} at {application.company_name}"]
+    if application.location:
+        lines.append(f"Location: {application.location}")
+    if application.job_url:
+        lines.append(f"Posting: {application.job_url}")
+    if application.notes:
+        lines.extend(["", application.notes])
+    return "\n".join(lines)
+
+
+async def aresolve_items(user, application_ids: list, job_descriptions: list[str]) -> list[BulkItem]:
+    """
+    BulkItems for the user's applications (their latest stored job description,
+    else application_text()) followed by the pasted job descriptions.
+    """
+    applications = {
+        a.pk: a
+        async for a in Application.objects.filter(
+            user=user, pk__in=application_ids, deleted_at__isnull=True
+        )
+    }
+    stored: dict[Any, str] = {}
+    async for application_id, raw_text in (
+        JobDescription.objects.filter(user=user, application_id__in=list(applications))
+        .order_by("created_at")
+        .values_list("application_id", "raw_text")
+    ):
+        stored[application_id] = raw_text  # latest wins
+    items: list[BulkItem] = []
+    for application_id in application_ids:
+        application = applications.get(application_id)
+        text = None
+        if application is not None:
+            text = stored.get(application_id) or application_text(application)
+        items.append(BulkItem(len(items), text, application_id))
+    items.extend(BulkItem(len(items), text) for text in job_descriptions)
+    return items
+
+
+async def _afind_outputs(user, hashes: set[str], tone: str) -> dict[str, AIOutput]:
+    """Latest stored letter per job description hash, in one query."""
+    found: dict[str, AIOutput] = {}
+    async for output in (
+        AIOutput.objects.filter(
+            user=user,
+            type=AIOutputType.COVER_LETTER,
+            job_description__content_hash__in=hashes,
+            tone=tone,
+            profile_version=user.profile_version,
+        )
+        .select_related("job_description")
+        .order_by("-created_at")
+    ):
+        found.setdefault(output.job_description.content_hash, output)
+    return found
+
+
+@dataclass
+class BulkBatch:
+    """A bulk request split into results known up front and letters to generate."""
+
+    user: Any
+    tone: str
+    ready: list[BulkResult]
+    pending: list[BulkItem]
+    service: LLMService | None = None
+    budget: int = 0
+    # Letters over the user's admission budget, to be generated later as jobs.
+    deferred: list[BulkItem] = field(default_factory=list)
+
+    def admit(self) -> None:
+        """Admit the letters to generate now; those the user's budget has no room for are deferred."""
+        if self.pending:
+            admitted = self.service.admit_batch(len(self.pending))
+            self.pending, self.deferred = self.pending[:admitted], self.pending[admitted:]
+
+
+async def aprepare_many(
+    user,
+    items: list[BulkItem],
+    tone: str | None = None,
+    *,
+    reuse: bool = True,
+    route_overrides: dict[str, Any] | None = None,
+) -> BulkBatch:
+    """
+    Split items into results known without the LLM (applications not found,
+    stored letters with reuse) and letters still to generate.
+    """
+    tone = normalize_tone(tone)
+    ready: list[BulkResult] = []
+    pending: list[BulkItem] = []
+    for item in items:
+        if item.text is None:
+            ready.append(BulkResult(item, error="Application not found."))
+        else:
+            pending.append(item)
+    if reuse and pending:
+        found = await _afind_outputs(user, {content_hash(item.text) for item in pending}, tone)
+        remaining = []
+        for item in pending:
+            output = found.get(content_hash(item.text))
+            if output is None:
+                remaining.append(item)
+            else:
+                ready.append(BulkResult(item, output=output, reused=True))
+        pending = remaining
+    batch = BulkBatch(user, tone, ready, pending)
+    if pending:
+        batch.service, batch.budget = await _aservice(user, route_overrides)
+    return batch
+
+
+async def agenerate_many(batch: BulkBatch) -> AsyncIterator[BulkResult]:
+    """
+    Results for an admitted batch, yielded as they are ready: the ready ones
+    first, then new letters in order of completion, each stored as an AIOutput.
+    At most LLM_COVER_LETTER_BULK["CONCURRENCY"] generations run at once; a
+    failed item yields a result with error set instead of stopping the rest.
+    """
+    for result in batch.ready:
+        yield result
+    if not batch.pending:
+        return
+
+    user, tone, service, budget = batch.user, batch.tone, batch.service, batch.budget
+    # One profile rendering for every letter: the budget left by the longest
+    # job description allowed (half the prompt budget).
+    profile_context = await profile_cache.aget_context(
+        user,
+        max_tokens=min(DEFAULT_PROFILE_MAX_TOKENS, budget - budget // 2),
+        model=service.model,
+    )
+    prompts = [
+        CoverLetterPrompt(
+            service,
+            build_cover_letter_system_blocks(
+                profile_context, truncate_to_tokens(item.text, budget // 2, service.model), tone=tone
+            ),
+            tone,
+        )
+        for item in batch.pending
+    ]
+    requests = [
+        CompletionRequest(p.messages, system_prompt=p.system_prompt, max_tokens=p.max_tokens)
+        for p in prompts
+    ]
+    results = service.aiter_complete_many(
+        requests, max_concurrency=int(_bulk_config().get("CONCURRENCY", 8))
+    )
+    try:
+        async for result in results:
+            item = batch.pending[result.index]
+            if not result.ok:
+                yield BulkResult(item, error=error_message(result.error))
+                continue
+            job_description = await arecord_job_description(user, item.text, item.application_id)
+            output = await asave_output(user, prompts[result.index], result.text.strip(), job_description)
+            yield BulkResult(item, output=output)
+    finally:
+        await results.aclose()
@@ -0,0 +1,285 @@
+"""Background cover-letter jobs (in-process thread pool or standalone worker)."""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from apps.ai import cover_letters
+from apps.ai.models import CoverLetterJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = frozenset({JobStatus.SUCCEEDED, JobStatus.FAILED})
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_sweeper: threading.Thread | None = None
+_lock = threading.Lock()
+# Jobs submitted to this process's pool (or waiting on a retry timer) and not done yet.
+_pending: set = set()
+_counts = {"enqueued": 0, "succeeded": 0, "failed": 0, "deferred": 0, "requeued": 0}
+
+
+def _config() -> dict[str, Any]:
+    return getattr(settings, "LLM_COVER_LETTER_JOBS", {}) or {}
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _lock:
+        _counts[key] += n
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(_config().get("WORKERS", 4)),
+                thread_name_prefix="cover-letter-job",
+            )
+        return _executor
+
+
+def enqueue(
+    user,
+    job_description: str,
+    tone: str | None = None,
+    *,
+    reuse: bool = True,
+    application_id=None,
+) -> CoverLetterJob:
+    """
+    Store a queued job for a letter for job_description. With reuse, a letter
+    already stored for it (see cover_letters.find_output) gives a succeeded job.
+    """
+    tone = cover_letters.normalize_tone(tone)
+    stored = cover_letters.find_output(user, job_description, tone) if reuse else None
+    with transaction.atomic():
+        jd = cover_letters.record_job_description(user, job_description, application_id)
+        if stored is not None:
+            now = timezone.now()
+            return CoverLetterJob.objects.create(
+                user=user,
+                job_description=jd,
+                tone=tone,
+                status=JobStatus.SUCCEEDED,
+                output=stored,
+                progress_chars=len(stored.content),
+                started_at=now,
+                finished_at=now,
+            )
+        job = CoverLetterJob.objects.create(user=user, job_description=jd, tone=tone)
+        if _config().get("IN_PROCESS", True):
+            transaction.on_commit(lambda: _submit(job.pk))
+    _count("enqueued")
+    return job
+
+
+class _Deferred(Exception):
+    """The job could not be admitted yet; run it again after delay seconds."""
+
+    def __init__(self, delay: float):
+        super().__init__(f"Not admitted; retry in {delay:.1f}s")
+        self.delay = delay
+
+
+def _claim(job_id) -> tuple[CoverLetterJob, QuerySet] | None:
+    """
+    Mark a queued job running for this worker; None when it was not queued. Also
+    returns the job's row as long as this claim holds: later updates go through
+    it, so a worker whose job was requeued (and maybe claimed again) changes nothing.
+    """
+    now = timezone.now()
+    claimed = CoverLetterJob.objects.filter(
+        Q(not_before__isnull=True) | Q(not_before__lte=now), pk=job_id, status=JobStatus.QUEUED
+    ).update(status=JobStatus.RUNNING, started_at=now, heartbeat_at=now, not_before=None)
+    if claimed != 1:
+        return None
+    job = CoverLetterJob.objects.select_related("user", "job_description").get(pk=job_id)
+    return job, CoverLetterJob.objects.filter(pk=job_id, status=JobStatus.RUNNING, started_at=now)
+
+
+def _generate(job: CoverLetterJob, claim: QuerySet) -> None:
+    if job.job_description is None:
+        raise ValueError("The job description was deleted")
+    prompt = cover_letters.prepare(job.user, job.job_description.raw_text, job.tone)
+    # Never hold a pool thread waiting for admission: put the job back instead.
+    delay = prompt.service.try_admit()
+    if delay:
+        raise _Deferred(delay)
+    interval = float(_config().get("PROGRESS_INTERVAL", 0.5))
+    parts: list[str] = []
+    chars = 0
+    reported = time.monotonic()
+    for chunk in prompt.service.stream_complete(
+        prompt.messages, system_prompt=prompt.system_prompt, max_tokens=prompt.max_tokens
+    ):
+        parts.append(chunk)
+        chars += len(chunk)
+        if time.monotonic() - reported >= interval:
+            claim.update(progress_chars=chars, heartbeat_at=timezone.now())
+            reported = time.monotonic()
+    with transaction.atomic():
+        output = cover_letters.save_output(job.user, prompt, "".join(parts).strip(), job.job_description)
+        finished = claim.update(
+            status=JobStatus.SUCCEEDED,
+            output=output,
+            progress_chars=chars,
+            finished_at=timezone.now(),
+        )
+        if not finished:
+            # Requeued while running: the worker that owns it now stores the letter.
+            transaction.set_rollback(True)
+            logger.warning("Cover letter job %s was requeued while running", job.pk)
+
+
+def _run(job_id) -> float | None:
+    """run(); returns the delay when the job was put back for later."""
+    claimed = _claim(job_id)
+    if claimed is None:
+        return None
+    job, claim = claimed
+    try:
+        _generate(job, claim)
+    except _Deferred as exc:
+        claim.update(
+            status=JobStatus.QUEUED,
+            started_at=None,
+            heartbeat_at=None,
+            not_before=timezone.now() + timedelta(seconds=exc.delay),
+        )
+        _count("deferred")
+        return exc.delay
+    except Exception as exc:
+        logger.exception("Cover letter job %s failed", job_id)
+        claim.update(
+            status=JobStatus.FAILED, error=cover_letters.error_message(exc), finished_at=timezone.now()
+        )
+        _count("failed")
+    else:
+        _count("succeeded")
+    return 0.0
+
+
+def run(job_id) -> bool:
+    """Claim and run one job; False when it was not queued (e.g. another worker took it)."""
+    return _run(job_id) is not None
+
+
+def _due() -> QuerySet:
+    return CoverLetterJob.objects.filter(
+        Q(not_before__isnull=True) | Q(not_before__lte=timezone.now()), status=JobStatus.QUEUED
+    ).order_by("created_at")
+
+
+def run_next() -> float | None:
+    """
+    Run the oldest queued job that is due. None when there was none; otherwise
+    0.0 once the job finished, or the seconds it was put back for (not admitted yet).
+    """
+    for job_id in _due().values_list("pk", flat=True)[:10]:
+        delay = _run(job_id)
+        if delay is not None:
+            return delay
+    return None
+
+
+def requeue_stale() -> int:
+    """Put jobs whose worker stopped (no heartbeat for STALE_SECONDS) back in the queue."""
+    cutoff = timezone.now() - timedelta(seconds=float(_config().get("STALE_SECONDS", 600)))
+    requeued = CoverLetterJob.objects.filter(status=JobStatus.RUNNING, heartbeat_at__lt=cutoff).update(
+        status=JobStatus.QUEUED, started_at=None, heartbeat_at=None, progress_chars=0
+    )
+    if requeued:
+        _count("requeued", requeued)
+    return requeued
+
+
+def _submit(job_id) -> bool:
+    """Run job_id on the pool unless this process already has it; False when it does."""
+    with _lock:
+        if job_id in _pending:
+            return False
+        _pending.add(job_id)
+    _pool().submit(_run_in_thread, job_id)
+    return True
+
+
+def _run_in_thread(job_id) -> None:
+    close_old_connections()
+    try:
+        delay = _run(job_id)
+    except Exception:
+        logger.exception("Cover letter job %s could not be run", job_id)
+        delay = None
+    finally:
+        close_old_connections()
+    if delay:
+        # Still pending: the sweeper leaves it to the timer.
+        timer = threading.Timer(delay, lambda: _pool().submit(_run_in_thread, job_id))
+        timer.daemon = True
+        timer.start()
+    else:
+        with _lock:
+            _pending.discard(job_id)
+
+
+def sweep() -> int:
+    """
+    Requeue stale jobs, then submit every due queued job this process is not
+    already running (jobs left by a restart, a stopped worker or another process).
+    Returns how many were submitted.
+    """
+    requeue_stale()
+    return sum(_submit(job_id) for job_id in _due().values_list("pk", flat=True))
+
+
+def _sweep_forever(interval: float) -> None:
+    while True:
+        close_old_connections()
+        try:
+            sweep()
+        except Exception:
+            logger.exception("Cover letter job sweep failed")
+        finally:
+            close_old_connections()
+        time.sleep(interval)
+
+
+def start_sweeper() -> bool:
+    """
+    With IN_PROCESS, sweep() now and every SWEEP_SECONDS on a daemon thread
+    (once per process); False when it is off or already running.
+    """
+    global _sweeper
+    config = _config()
+    interval = float(config.get("SWEEP_SECONDS", 30))
+    if not config.get("IN_PROCESS", True) or interval <= 0:
+        return False
+    with _executor_lock:
+        if _sweeper is not None:
+            return False
+        _sweeper = threading.Thread(
+            target=_sweep_forever, args=(interval,), name="cover-letter-sweeper", daemon=True
+        )
+    _sweeper.start()
+    return True
+
+
+def stats() -> dict[str, int]:
+    with _lock:
+        return dict(_counts)
+
+
+def reset() -> None:
+    with _lock:
+        for key in _counts:
+            _counts[key] = 0
@@ -0,0 +1,114 @@
+"""Opt-in response cache for LLMService.complete."""
+
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = "llm:response:v1:"
+
+
+def _config() -> dict[str, Any]:
+    return getattr(settings, "LLM_RESPONSE_CACHE", {}) or {}
+
+
+def is_enabled(endpoint: str | None) -> bool:
+    """Return True when responses for this endpoint may be served from cache."""
+    if not endpoint:
+        return False
+    return endpoint in set(_config().get("ENDPOINTS", ()))
+
+
+def _cache():
+    return caches[_config().get("ALIAS", "default")]
+
+
+def _timeout() -> int | None:
+    return _config().get("TIMEOUT")
+
+
+def make_key(
+    *,
+    scope: str | None = None,
+    provider: str,
+    model: str | None,
+    messages: list[dict[str, str]],
+    system_prompt: Any,
+    max_tokens: int,
+) -> str:
+    """
+    Stable hash of the full request; any change in inputs yields a new key. scope
+    keeps one caller's replies from another's (e.g. "user:<pk>").
+    """
+    payload = json.dumps(
+        {
+            "scope": scope,
+            "provider": provider,
+            "model": model,
+            "system_prompt": system_prompt,
+            "messages": messages,
+            "max_tokens": max_tokens,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return KEY_PREFIX + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Counters:
+    """Thread-safe per-endpoint hit/miss counters (process-local)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: dict[str, dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def incr(self, endpoint: str, field: str) -> None:
+        with self._lock:
+            self._counts[endpoint][field] += 1
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {endpoint: dict(counts) for endpoint, counts in self._counts.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+counters = _Counters()
+
+
+def lookup(endpoint: str, key: str) -> str | None:
+    """Return the cached response for key (recording a hit or miss)."""
+    value = _cache().get(key)
+    counters.incr(endpoint, "hits" if value is not None else "misses")
+    return value
+
+
+def store(key: str, value: str) -> None:
+    """Store a response; empty replies are never cached."""
+    if value:
+        _cache().set(key, value, timeout=_timeout())
+
+
+async def alookup(endpoint: str, key: str) -> str | None:
+    """Async variant of lookup()."""
+    value = await _cache().aget(key)
+    counters.incr(endpoint, "hits" if value is not None else "misses")
+    return value
+
+
+async def astore(key: str, value: str) -> None:
+    """Async variant of store()."""
+    if value:
+        await _cache().aset(key, value, timeout=_timeout())
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """Hit/miss counters per endpoint since process start."""
+    return counters.snapshot()
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.ai import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued cover-letter jobs (see apps.ai.jobs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the jobs queued now, then exit.",
+        )
+
+    def handle(self, *args, poll_interval, once, **options):
+        self.stdout.write("Cover letter worker started")
+        done = deferred = 0
+        while True:
+            close_old_connections()
+            jobs.requeue_stale()
+            delay = jobs.run_next()
+            if delay is not None:
+                if delay:
+                    deferred += 1
+                else:
+                    done += 1
+                continue
+            if once:
+                break
+            time.sleep(poll_interval)
+        self.stdout.write(
+            self.style.SUCCESS(f"Ran {done} cover letter job(s), put back {deferred} not yet admitted")
+        )
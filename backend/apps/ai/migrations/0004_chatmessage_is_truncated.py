@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='is_truncated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
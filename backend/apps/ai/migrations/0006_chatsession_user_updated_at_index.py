@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0005_chatsession_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='chat_sessio_user_id_f59f1c_idx'),
+        ),
+    ]
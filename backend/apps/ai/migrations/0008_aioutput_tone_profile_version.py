@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0007_coverletterjob'),
+        ('tracker', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aioutput',
+            name='profile_version',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='aioutput',
+            name='tone',
+            field=models.CharField(blank=True, max_length=30, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='aioutput',
+            index=models.Index(fields=['job_description', 'type', 'tone', 'profile_version'], name='ai_outputs_job_des_7dade0_idx'),
+        ),
+    ]
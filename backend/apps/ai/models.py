@@ -232,12 +232,19 @@ class ChatSession(models.Model):
         related_name="chat_sessions",
     )
     title = models.CharField(max_length=255, blank=True, null=True)
+    # Rolling summary of the messages up to and including summarised_until
+    # (their created_at); later messages are sent verbatim. See apps.ai.chat_memory.
+    summary = models.TextField(blank=True, default="")
+    summarised_until = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "chat_sessions"
         ordering = ["-updated_at"]
+        indexes = [
+            models.Index(fields=["user", "-updated_at", "-id"]),
+        ]
 
     def __str__(self):
         return self.title or str(self.id)
@@ -264,6 +271,8 @@ class ChatMessage(models.Model):
     )
     content = models.TextField()
     token_count = models.IntegerField(blank=True, null=True)
+    # Reply cut short (client disconnected or the provider failed mid-stream).
+    is_truncated = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -312,6 +321,10 @@ class AIOutput(models.Model):
     )
     content = models.TextField()
     prompt_snapshot = models.TextField(blank=True, null=True)
+    # What the output was generated with, so an identical request can reuse it
+    # (see apps.ai.cover_letters.find_output).
+    tone = models.CharField(max_length=30, blank=True, null=True)
+    profile_version = models.IntegerField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -320,7 +333,67 @@ class AIOutput(models.Model):
         indexes = [
             models.Index(fields=["user", "type"]),
             models.Index(fields=["user", "-created_at"]),
+            models.Index(fields=["job_description", "type", "tone", "profile_version"]),
         ]
 
     def __str__(self):
         return f"{self.get_type_display()} ({self.user_id})"
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Running"
+    SUCCEEDED = "succeeded", "Succeeded"
+    FAILED = "failed", "Failed"
+
+
+class CoverLetterJob(models.Model):
+    """Queued cover-letter generation, run by a worker (see apps.ai.jobs)."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="cover_letter_jobs",
+    )
+    job_description = models.ForeignKey(
+        JobDescription,
+        on_delete=models.SET_NULL,
+        related_name="cover_letter_jobs",
+        blank=True,
+        null=True,
+    )
+    tone = models.CharField(max_length=30, default="formal")
+    status = models.CharField(
+        max_length=20,
+        choices=JobStatus.choices,
+        default=JobStatus.QUEUED,
+    )
+    # Characters generated so far, updated while the letter streams in.
+    progress_chars = models.IntegerField(default=0)
+    output = models.ForeignKey(
+        AIOutput,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+    )
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    # Refreshed by the running worker; a job whose heartbeat stops is requeued.
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    # Set when a job is put back for later (rate limited); not run before then.
+    not_before = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "cover_letter_jobs"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["user", "-created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Cover letter job {self.id} ({self.status})"
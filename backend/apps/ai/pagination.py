@@ -0,0 +1,95 @@
+"""Keyset (cursor) pagination for chat sessions and messages."""
+
+import base64
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from django.db.models import Q, QuerySet
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+BEFORE_HEADER = "X-Before-Cursor"
+AFTER_HEADER = "X-After-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """Raised for a malformed cursor or conflicting paging parameters."""
+
+
+def encode_cursor(value: datetime, pk: uuid.UUID) -> str:
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        value, pk = raw.split("|")
+        return datetime.fromisoformat(value), uuid.UUID(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+
+
+@dataclass
+class Page:
+    """One page of rows in display order, with the cursors of the pages around it."""
+
+    items: list[Any]
+    before: str | None = None
+    after: str | None = None
+
+    def set_headers(self, response) -> None:
+        if self.before:
+            response[BEFORE_HEADER] = self.before
+        if self.after:
+            response[AFTER_HEADER] = self.after
+
+
+def paginate(
+    queryset: QuerySet,
+    *,
+    field: str,
+    before: str | None = None,
+    after: str | None = None,
+    limit: int | None = None,
+    newest_first: bool = False,
+) -> Page:
+    """
+    Page of queryset ordered by (field, id). Without a cursor this is the newest
+    page, so a chat opens at the bottom; without a cursor or limit it is every
+    row (clients that do not page). Items are newest first when newest_first is
+    set, else oldest first.
+    """
+    if before and after:
+        raise InvalidCursor("Pass either before or after, not both")
+    if limit is None and not before and not after:
+        rows = list(queryset.order_by(field, "id"))
+        return Page(items=rows[::-1] if newest_first else rows)
+    limit = max(1, min(DEFAULT_PAGE_SIZE if limit is None else limit, MAX_PAGE_SIZE))
+    if after:
+        value, pk = decode_cursor(after)
+        queryset = queryset.filter(Q(**{f"{field}__gt": value}) | Q(**{field: value, "id__gt": pk}))
+        rows = list(queryset.order_by(field, "id")[: limit + 1])
+        more_before, more_after = True, len(rows) > limit
+        rows = rows[:limit]
+    else:
+        if before:
+            value, pk = decode_cursor(before)
+            queryset = queryset.filter(Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": pk}))
+        rows = list(queryset.order_by(f"-{field}", "-id")[: limit + 1])
+        more_before, more_after = len(rows) > limit, bool(before)
+        rows = rows[:limit]
+        rows.reverse()
+
+    # rows are oldest first here.
+    def cursor(row) -> str:
+        return encode_cursor(getattr(row, field), row.pk)
+
+    return Page(
+        items=rows[::-1] if newest_first else rows,
+        before=cursor(rows[0]) if rows and more_before else None,
+        after=cursor(rows[-1]) if rows and more_after else None,
+    )
@@ -0,0 +1,166 @@
+"""Cached AI profile context, versioned per user."""
+
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F
+
+from apps.ai import retrieval
+from apps.ai.services import (
+    DEFAULT_PROFILE_MAX_TOKENS,
+    ProfileSnapshot,
+    load_profile,
+    render_context,
+)
+from providers.llm.tokens import count_tokens
+
+# User fields that appear in the AI context.
+PROFILE_USER_FIELDS = frozenset({"full_name", "target_role", "skills"})
+# Renderings kept per cached profile (one per distinct budget/model).
+MAX_RENDERINGS = 8
+
+
+class _Entry:
+    __slots__ = ("profile", "rendered", "index")
+
+    def __init__(self, profile: ProfileSnapshot):
+        self.profile = profile
+        self.rendered: OrderedDict[tuple, str] = OrderedDict()
+        self.index: retrieval.BM25Index | None = None
+
+
+_cache: OrderedDict[tuple[Any, int], _Entry] = OrderedDict()
+_lock = threading.Lock()
+_counts = {"hits": 0, "misses": 0}
+
+
+def _max_entries() -> int:
+    return int(getattr(settings, "PROFILE_CONTEXT_CACHE_SIZE", 1000))
+
+
+def bump_profile_version(user_id) -> None:
+    """Mark user_id's profile as changed (for writes that skip signals, e.g. update())."""
+    get_user_model().objects.filter(pk=user_id).update(profile_version=F("profile_version") + 1)
+
+
+def _lookup(key: tuple) -> _Entry | None:
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            _counts["misses"] += 1
+            return None
+        _cache.move_to_end(key)
+        _counts["hits"] += 1
+        return entry
+
+
+def _store(key: tuple, profile: ProfileSnapshot) -> _Entry:
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            entry = _cache[key] = _Entry(profile)
+        _cache.move_to_end(key)
+        while len(_cache) > _max_entries():
+            _cache.popitem(last=False)
+        return entry
+
+
+def _render(entry: _Entry, max_tokens: int | None, model: str | None) -> str:
+    budget = (max_tokens, model)
+    with _lock:
+        text = entry.rendered.get(budget)
+    if text is not None:
+        return text
+    text = render_context(entry.profile, max_tokens=max_tokens, model=model)
+    with _lock:
+        entry.rendered[budget] = text
+        while len(entry.rendered) > MAX_RENDERINGS:
+            entry.rendered.popitem(last=False)
+    return text
+
+
+def _key(user) -> tuple:
+    return (user.pk, user.profile_version)
+
+
+def get_context(user, *, max_tokens: int | None = None, model: str | None = None) -> str:
+    """build_context() for a loaded User, served from cache while its profile_version holds."""
+    key = _key(user)
+    entry = _lookup(key) or _store(key, load_profile(user))
+    return _render(entry, max_tokens, model)
+
+
+async def aget_context(user, *, max_tokens: int | None = None, model: str | None = None) -> str:
+    """Async variant of get_context(); only a cache miss leaves the event loop."""
+    key = _key(user)
+    entry = _lookup(key)
+    if entry is None:
+        entry = _store(key, await sync_to_async(load_profile)(user))
+    return _render(entry, max_tokens, model)
+
+
+def _grounding(entry: _Entry, query: str, max_tokens: int | None, model: str | None) -> tuple[str, str]:
+    if entry.index is None:
+        # Concurrent first uses may both build it; either result is correct.
+        entry.index = retrieval.build_index(entry.profile)
+    header = "\n\n".join(entry.profile.header)
+    if max_tokens is None:
+        max_tokens = DEFAULT_PROFILE_MAX_TOKENS
+    budget = max_tokens - count_tokens(header, model)
+    return header, retrieval.excerpts(entry.index, query, max_tokens=budget, model=model)
+
+
+async def aget_grounding(
+    user, query: str, *, max_tokens: int | None = None, model: str | None = None
+) -> tuple[str, str]:
+    """
+    (profile header, profile excerpts relevant to query), together within
+    max_tokens: what a chat turn sends instead of the whole profile.
+    """
+    key = _key(user)
+    entry = _lookup(key)
+    if entry is None:
+        entry = _store(key, await sync_to_async(load_profile)(user))
+    return _grounding(entry, query, max_tokens, model)
+
+
+def stats() -> dict[str, int]:
+    with _lock:
+        return {**_counts, "size": len(_cache)}
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+        for key in _counts:
+            _counts[key] = 0
+
+
+def _user_saving(sender, instance, update_fields=None, **kwargs) -> None:
+    # A full save writes profile_version too: take the current one, so a stale
+    # instance does not put an old version (and its cached context) back.
+    if update_fields is None and not instance._state.adding:
+        current = (
+            sender.objects.filter(pk=instance.pk).values_list("profile_version", flat=True).first()
+        )
+        if current is not None:
+            instance.profile_version = current
+
+
+def _user_saved(sender, instance, created=False, update_fields=None, **kwargs) -> None:
+    if created or (update_fields is not None and not PROFILE_USER_FIELDS & set(update_fields)):
+        return
+    bump_profile_version(instance.pk)
+    # Keep the saved instance current so it does not serve the old version.
+    instance.profile_version = (
+        sender.objects.filter(pk=instance.pk).values_list("profile_version", flat=True).first()
+        or instance.profile_version
+    )
+
+
+def _profile_row_changed(sender, instance, **kwargs) -> None:
+    bump_profile_version(instance.user_id)
@@ -0,0 +1,126 @@
+"""BM25 retrieval over profile content, for grounding chat turns."""
+
+import heapq
+import math
+import re
+from array import array
+from typing import Any
+
+from django.conf import settings
+
+from apps.ai.services import ProfileSnapshot
+from providers.llm.tokens import count_tokens
+
+# BM25 parameters (the usual defaults).
+K1 = 1.2
+B = 0.75
+
+EXCERPTS_HEADER = "--- Relevant profile excerpts ---"
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can could do for from had has have how i if in into is it "
+    "its me my no not of on or our so than that the their them then there these they this "
+    "to was we were what when where which who why will with would you your".split()
+)
+
+
+def _config() -> dict[str, Any]:
+    return getattr(settings, "LLM_RETRIEVAL", {}) or {}
+
+
+def is_enabled() -> bool:
+    return bool(_config().get("ENABLED", True))
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _windows(text: str, size: int, overlap: int) -> list[str]:
+    words = text.split()
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    step = max(size - overlap, 1)
+    return [" ".join(words[i : i + size]) for i in range(0, len(words) - overlap, step)]
+
+
+def chunk_profile(profile: ProfileSnapshot) -> list[str]:
+    """Profile content as retrieval chunks, in profile order."""
+    config = _config()
+    size = int(config.get("CHUNK_WORDS", 120))
+    overlap = int(config.get("CHUNK_OVERLAP", 30))
+    chunks: list[str] = []
+    for lines in profile.sections.values():
+        for line in lines:
+            chunks.extend(_windows(line, size, overlap))
+    chunks.extend(f"CV: {window}" for window in _windows(profile.cv_text, size, overlap))
+    return chunks
+
+
+class BM25Index:
+    """BM25 over a fixed list of chunks, with array-backed postings."""
+
+    __slots__ = ("chunks", "_terms", "_doc_ids", "_freqs", "_lengths", "_avg_length")
+
+    def __init__(self, chunks: list[str]):
+        self.chunks = chunks
+        postings: dict[str, tuple[array, array]] = {}
+        self._lengths = array("I")
+        for doc_id, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            self._lengths.append(len(tokens))
+            counts: dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                ids, freqs = postings.setdefault(token, (array("I"), array("H")))
+                ids.append(doc_id)
+                freqs.append(min(count, 0xFFFF))
+        # term -> index into the parallel posting lists.
+        self._terms = {term: i for i, term in enumerate(postings)}
+        self._doc_ids = [ids for ids, _ in postings.values()]
+        self._freqs = [freqs for _, freqs in postings.values()]
+        self._avg_length = (sum(self._lengths) / len(chunks)) if chunks else 0.0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Up to k (chunk id, score) pairs for query, best first; chunks sharing no term are left out."""
+        n = len(self.chunks)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            slot = self._terms.get(term)
+            if slot is None:
+                continue
+            ids, freqs = self._doc_ids[slot], self._freqs[slot]
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            for doc_id, freq in zip(ids, freqs):
+                norm = K1 * (1 - B + B * self._lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (K1 + 1) / (freq + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def build_index(profile: ProfileSnapshot) -> BM25Index:
+    return BM25Index(chunk_profile(profile))
+
+
+def excerpts(index: BM25Index, query: str, *, max_tokens: int, model: str | None = None) -> str:
+    """
+    The top-k chunks for query that fit in max_tokens, in profile order. When no
+    chunk matches (small talk), the leading chunks are used instead.
+    """
+    k = int(_config().get("TOP_K", 6))
+    hits = index.search(query, k)
+    ranked = [doc_id for doc_id, _ in hits] if hits else list(range(min(k, len(index))))
+    kept: list[int] = []
+    used = count_tokens(EXCERPTS_HEADER, model)
+    for doc_id in ranked:
+        cost = count_tokens(index.chunks[doc_id], model)
+        if used + cost <= max_tokens:
+            kept.append(doc_id)
+            used += cost
+    if not kept:
+        return ""
+    return "\n\n".join([EXCERPTS_HEADER, *(index.chunks[doc_id] for doc_id in sorted(kept))])
@@ -37,6 +37,7 @@ class ChatMessageOut(BaseModel):
     id: UUID
     role: str
     content: str
+    is_truncated: bool = False
     created_at: datetime
 
 
@@ -59,12 +60,54 @@ class CoverLetterIn(BaseModel):
 
     job_description: str
     tone: str = "formal"
+    # Write a new letter even when one is stored for this job description and tone.
+    regenerate: bool = False
 
 
 class CoverLetterOut(BaseModel):
-    """Response with generated cover letter text."""
+    """Response with generated cover letter text; reused when it is a stored letter."""
 
     cover_letter: str
+    output_id: UUID | None = None
+    reused: bool = False
+
+
+class BulkCoverLetterIn(BaseModel):
+    """Payload for bulk cover letters: tracked applications and/or pasted job descriptions."""
+
+    application_ids: list[UUID] = []
+    job_descriptions: list[str] = []
+    tone: str = "formal"
+    regenerate: bool = False
+
+
+class BulkCoverLetterItemOut(BaseModel):
+    """
+    One line of the bulk cover-letter stream; index is the item's position in the
+    request. job_id is set instead of cover_letter for a letter queued as a job.
+    """
+
+    index: int
+    application_id: UUID | None = None
+    cover_letter: str | None = None
+    output_id: UUID | None = None
+    job_id: UUID | None = None
+    reused: bool = False
+    error: str | None = None
+
+
+class CoverLetterJobOut(BaseModel):
+    """State of a queued cover-letter generation; cover_letter is set once it has succeeded."""
+
+    id: UUID
+    status: str
+    progress_chars: int = 0
+    cover_letter: str | None = None
+    output_id: UUID | None = None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
 
 
 class ImproveAnswerOut(BaseModel):
@@ -1,49 +1,233 @@
 """AI app business logic and service layer."""
 
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any
+
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch, prefetch_related_objects
+from django.db.models.functions import Substr
 
-from providers.llm.base import LLMProvider
+from apps.ai import admission, llm_cache, singleflight, task_routing, user_providers
+from apps.ai.models import CVDocument, Education, Project, WorkExperience
+from providers.llm import usage
+from providers.llm.base import LLMProvider, SystemBlock, SystemPrompt, system_text
 from providers.llm.factory import get_llm
+from providers.llm.metrics import InstrumentedProvider
+from providers.llm.resilience import RetryPolicy, with_resilience
+from providers.llm.tokens import (
+    MESSAGE_OVERHEAD_TOKENS,
+    allocate,
+    count_message_tokens,
+    count_tokens,
+    truncate_to_tokens,
+)
+from providers.llm.usage import Usage
+
+
+# Profile sections in priority order, with their share of the profile budget.
+# Unused share is handed on to later sections that still need room.
+PROFILE_SECTION_SHARES = {
+    "experience": 0.35,
+    "cv": 0.35,
+    "projects": 0.2,
+    "education": 0.1,
+}
+DEFAULT_PROFILE_MAX_TOKENS = 4000
+
+
+def _fit_lines(lines: list[str], max_tokens: int, model: str | None) -> list[str]:
+    """Leading lines that fit in max_tokens (whole lines only)."""
+    kept: list[str] = []
+    used = 0
+    for line in lines:
+        cost = count_tokens(line, model)
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return kept
+
+
+CV_HEADER = "--- CV / Resume (extracted text) ---"
+# Rows read per profile section.
+PROFILE_SECTION_ROWS = 20
+# CV characters read from the database: about 8k tokens, more than any profile budget
+# gives the CV (render_context trims it to the actual budget).
+CV_MAX_CHARS = 32_000
+
+
+@dataclass(frozen=True)
+class ProfileSnapshot:
+    """Immutable profile content used for AI context, before fitting it to a token budget."""
 
+    header: tuple[str, ...]
+    sections: Mapping[str, tuple[str, ...]]
+    cv_text: str
 
-def build_context(user) -> str:
+
+def _profile_prefetches() -> list[Prefetch]:
+    """One query per section: live rows only, needed columns only, first rows per user."""
+    return [
+        Prefetch(
+            "work_experiences",
+            queryset=WorkExperience.objects.filter(deleted_at__isnull=True).only(
+                "user_id", "role", "company", "start_date", "end_date", "description"
+            )[:PROFILE_SECTION_ROWS],
+            to_attr="profile_experience",
+        ),
+        Prefetch(
+            "projects",
+            queryset=Project.objects.filter(deleted_at__isnull=True).only(
+                "user_id", "title", "description"
+            )[:PROFILE_SECTION_ROWS],
+            to_attr="profile_projects",
+        ),
+        Prefetch(
+            "education",
+            queryset=Education.objects.only(
+                "user_id", "degree", "institution", "field_of_study"
+            )[:PROFILE_SECTION_ROWS],
+            to_attr="profile_education",
+        ),
+        Prefetch(
+            "cv_documents",
+            queryset=CVDocument.objects.filter(is_primary=True, deleted_at__isnull=True)
+            .only("user_id")
+            .annotate(cv_excerpt=Substr("parsed_text", 1, CV_MAX_CHARS)),
+            to_attr="profile_cv",
+        ),
+    ]
+
+
+def load_profile(user) -> ProfileSnapshot:
     """
-    Build system-prompt context from user profile (work experience, projects, education, CV).
-    Used to ground the AI career assistant.
+    Read the AI-relevant profile of user (a User or its pk) in a fixed number of
+    queries: one per section, plus one for the user when given a pk.
     """
     User = get_user_model()
-    if not isinstance(user, User):
-        user = User.objects.get(pk=user)
-    parts = ["You are a helpful career assistant. Use the following profile context when relevant.\n"]
+    if isinstance(user, User):
+        # Prefetches are not repeated for attributes already set by an earlier load.
+        for prefetch in _profile_prefetches():
+            user.__dict__.pop(prefetch.to_attr, None)
+        prefetch_related_objects([user], *_profile_prefetches())
+    else:
+        user = User.objects.prefetch_related(*_profile_prefetches()).get(pk=user)
+    header = ["You are a helpful career assistant. Use the following profile context when relevant.\n"]
     if user.full_name:
-        parts.append(f"Name: {user.full_name}")
+        header.append(f"Name: {user.full_name}")
     if user.target_role:
-        parts.append(f"Target role: {user.target_role}")
+        header.append(f"Target role: {user.target_role}")
     if user.skills:
         skills = user.skills if isinstance(user.skills, list) else user.skills.values() if isinstance(user.skills, dict) else []
         if skills:
-            parts.append(f"Skills: {', '.join(str(s) for s in skills)}")
-    work = getattr(user, "work_experiences", None)
-    if work is not None and hasattr(work, "all"):
-        for w in work.all()[:20]:
-            parts.append(f"Experience: {w.role} at {w.company} ({w.start_date} - {w.end_date or 'present'}). {w.description or ''}")
-    projs = getattr(user, "projects", None)
-    if projs is not None and hasattr(projs, "all"):
-        for p in projs.all()[:20]:
-            parts.append(f"Project: {p.title}. {p.description}")
-    edu = getattr(user, "education", None)
-    if edu is not None and hasattr(edu, "all"):
-        for e in edu.all()[:20]:
-            parts.append(f"Education: {e.degree} at {e.institution} ({e.field_of_study or ''})")
-    cv = getattr(user, "cv_documents", None)
-    if cv is not None and hasattr(cv, "filter"):
-        primary = cv.filter(is_primary=True).first()
-        if primary and primary.parsed_text:
-            parts.append("--- CV / Resume (extracted text) ---")
-            parts.append(primary.parsed_text[:8000] or "")
+            header.append(f"Skills: {', '.join(str(s) for s in skills)}")
+
+    sections = {
+        "experience": tuple(
+            f"Experience: {w.role} at {w.company} ({w.start_date} - {w.end_date or 'present'}). {w.description or ''}"
+            for w in user.profile_experience
+        ),
+        "cv": (),
+        "projects": tuple(f"Project: {p.title}. {p.description}" for p in user.profile_projects),
+        "education": tuple(
+            f"Education: {e.degree} at {e.institution} ({e.field_of_study or ''})"
+            for e in user.profile_education
+        ),
+    }
+    primary = user.profile_cv[0] if user.profile_cv else None
+    return ProfileSnapshot(
+        header=tuple(header),
+        sections=MappingProxyType(sections),
+        cv_text=(primary.cv_excerpt or "") if primary else "",
+    )
+
+
+def render_context(profile: ProfileSnapshot, *, max_tokens: int | None = None, model: str | None = None) -> str:
+    """
+    Fit profile into max_tokens (counted for model): name, target role and skills are
+    always kept, then each section is trimmed to its share of what remains, by priority
+    (see PROFILE_SECTION_SHARES).
+    """
+    if max_tokens is None:
+        max_tokens = DEFAULT_PROFILE_MAX_TOKENS
+    parts = list(profile.header)
+    cv_text = profile.cv_text
+    remaining = max_tokens - count_tokens("\n\n".join(parts), model)
+    needs = {
+        name: sum(count_tokens(line, model) for line in lines)
+        for name, lines in profile.sections.items()
+    }
+    needs["cv"] = count_tokens(cv_text, model) + count_tokens(CV_HEADER, model) if cv_text else 0
+    grants = allocate(needs, max(remaining, 0), PROFILE_SECTION_SHARES)
+
+    for name in ("experience", "projects", "education"):
+        parts.extend(_fit_lines(profile.sections[name], grants[name], model))
+    if cv_text:
+        cv_budget = grants["cv"] - count_tokens(CV_HEADER, model)
+        cv_text = truncate_to_tokens(cv_text, cv_budget, model)
+        if cv_text:
+            parts.append(CV_HEADER)
+            parts.append(cv_text)
     return "\n\n".join(parts)
 
 
+def build_context(user, *, max_tokens: int | None = None, model: str | None = None) -> str:
+    """
+    Build system-prompt context from user profile (work experience, projects, education, CV).
+    Used to ground the AI career assistant.
+
+    The result fits in max_tokens (counted for model); see render_context(). Views use
+    the cached apps.ai.profile_cache.aget_context() instead, which skips the queries
+    while the profile is unchanged.
+    """
+    return render_context(load_profile(user), max_tokens=max_tokens, model=model)
+
+
+HISTORY_FIELDS = ("session_id", "role", "content", "token_count")
+
+
+def fit_history(messages: Iterable, *, max_tokens: int, model: str | None = None) -> list[dict[str, str]]:
+    """
+    The most recent of messages (ChatMessage rows, newest first) that fit in
+    max_tokens, oldest first. The latest message is always kept (truncated if it
+    alone is too long). Stored ChatMessage.token_count values are used instead
+    of recounting.
+    """
+    kept: list[dict[str, str]] = []
+    used = 0
+    for msg in messages:
+        message = {"role": msg.role, "content": msg.content, "token_count": msg.token_count}
+        cost = count_message_tokens(message, model)
+        if used + cost > max_tokens:
+            if not kept:
+                kept.append({
+                    "role": msg.role,
+                    "content": truncate_to_tokens(msg.content, max_tokens - MESSAGE_OVERHEAD_TOKENS, model),
+                })
+            break
+        kept.append({"role": msg.role, "content": msg.content})
+        used += cost
+    kept.reverse()
+    return kept
+
+
+async def aload_history(session, *, max_tokens: int, model: str | None = None) -> list[dict[str, str]]:
+    """
+    Most recent messages of a chat session that fit in max_tokens, oldest first
+    (see fit_history). Chat turns read a bounded window instead (apps.ai.chat_memory).
+    """
+    messages = session.messages.order_by("-created_at").only(*HISTORY_FIELDS)
+    return fit_history([msg async for msg in messages], max_tokens=max_tokens, model=model)
+
+
+CHAT_SUMMARY_HEADER = "--- Summary of the earlier conversation ---"
+
 COVER_LETTER_TONE_INSTRUCTIONS = {
     "formal": "Use a formal, professional tone. Avoid casual language and contractions.",
     "conversational": "Use a warm, conversational tone while remaining professional.",
@@ -51,28 +235,53 @@ COVER_LETTER_TONE_INSTRUCTIONS = {
 }
 
 
-def build_cover_letter_system_prompt(
+def build_chat_system_prompt(
+    profile_context: str,
+    summary: str | None = None,
+    excerpts: str | None = None,
+    *,
+    cache_profile: bool = True,
+) -> list[SystemBlock]:
+    """
+    System prompt for chat turns. The profile context is identical on every turn
+    of a session, so it is marked cacheable; the session summary (see
+    apps.ai.chat_memory) and the profile excerpts retrieved for this turn's
+    message (see apps.ai.retrieval) change as the chat goes on and follow it
+    uncached.
+
+    With retrieval the stable part is only the profile header, well under the
+    provider's minimum cacheable prefix (1024 tokens on Anthropic), so callers
+    pass cache_profile=False: each turn sends fewer tokens instead of reading
+    a cached full profile.
+    """
+    blocks = [SystemBlock(profile_context, cache=cache_profile)]
+    if summary:
+        blocks.append(SystemBlock(f"{CHAT_SUMMARY_HEADER}\n{summary}"))
+    if excerpts:
+        blocks.append(SystemBlock(excerpts))
+    return blocks
+
+
+def build_cover_letter_system_blocks(
     profile_context: str,
     job_description: str,
     tone: str = "formal",
-) -> str:
+) -> list[SystemBlock]:
     """
-    Build the system prompt for cover letter generation.
-
-    Combines profile context (candidate info) with the job description and
-    tone instructions so the LLM can generate a tailored cover letter.
+    Cover-letter system prompt as blocks: the instructions and candidate profile
+    form a cacheable prefix shared by every letter for this user; the tone and
+    job description follow it uncached.
     """
     tone_instruction = COVER_LETTER_TONE_INSTRUCTIONS.get(
         tone.lower(), COVER_LETTER_TONE_INSTRUCTIONS["formal"]
     )
-    return f"""You are an expert at writing job application cover letters.
-
-{tone_instruction}
+    profile_block = f"""You are an expert at writing job application cover letters.
 
 Use the following candidate profile to tailor the letter. Do not invent facts; only use information from the profile.
 
 --- CANDIDATE PROFILE ---
-{profile_context}
+{profile_context}"""
+    request_block = f"""{tone_instruction}
 
 --- JOB DESCRIPTION ---
 {job_description}
@@ -86,6 +295,21 @@ Write a cover letter that:
 5. Closes with a clear call to action and professional sign-off.
 6. Stays within one page when formatted (roughly 250-400 words).
 Output only the cover letter text, no meta-commentary."""
+    return [SystemBlock(profile_block, cache=True), SystemBlock(request_block)]
+
+
+def build_cover_letter_system_prompt(
+    profile_context: str,
+    job_description: str,
+    tone: str = "formal",
+) -> str:
+    """
+    Build the system prompt for cover letter generation.
+
+    Combines profile context (candidate info) with the job description and
+    tone instructions so the LLM can generate a tailored cover letter.
+    """
+    return system_text(build_cover_letter_system_blocks(profile_context, job_description, tone))
 
 
 def build_improve_answer_system_prompt(question: str | None) -> str:
@@ -112,40 +336,479 @@ Instructions:
 5. Do not add meta-commentary or "Here is your improved answer"."""
 
 
+DEFAULT_BATCH_CONCURRENCY = 4
+# LLMService(user_llm=...) default: look the user's own provider up in __init__.
+_RESOLVE = object()
+
+
+@dataclass
+class CompletionRequest:
+    """One prompt in a batch passed to LLMService.complete_many()."""
+
+    messages: list[dict[str, str]]
+    system_prompt: SystemPrompt | None = None
+    max_tokens: int = 2048
+
+
+@dataclass
+class CompletionResult:
+    """Outcome of one batch request; exactly one of text and error is set."""
+
+    index: int
+    text: str | None = None
+    error: Exception | None = None
+    usage: Usage = field(default_factory=Usage)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _sum_usage(results: list[CompletionResult]) -> Usage:
+    total = Usage()
+    for result in results:
+        total.add(result.usage)
+    return total
+
+
 class LLMService:
     """
     Service to communicate with the configured LLM (OpenAI or Anthropic).
 
     Configure via env: LLM_PROVIDER=openai|anthropic, OPENAI_API_KEY or ANTHROPIC_API_KEY.
+    Pass endpoint (e.g. "cover_letter") to opt in to the response cache for that
+    endpoint when it is enabled in settings.LLM_RESPONSE_CACHE. The endpoint is
+    also the task in the routing table (apps.ai.task_routing), which picks the
+    model, max_tokens and deadline for the user's tier; route_overrides replaces
+    any of those for this request. Provider calls are retried and circuit-broken
+    (see providers.llm.resilience).
+
+    After each call, last_usage holds the tokens it consumed, including prompt-cache
+    reads and writes (zero when answered from the response cache; for streams it is
+    filled in once the stream has finished).
+
+    complete_many() / acomplete_many() run a batch of prompts with bounded
+    concurrency; the iter_ variants yield results as they complete.
+
+    Every upstream call is timed and its usage and cost recorded per endpoint
+    (see providers.llm.metrics).
+
+    Given a user (and no explicit provider), calls go through the user's own API
+    key when they have configured one (see apps.ai.user_providers). In async code
+    build the service with acreate(), which looks the key up without blocking
+    the event loop; the constructor may query the database.
+
+    Upstream calls pass admission control for user (see apps.ai.admission):
+    complete/acomplete admit on a cache miss and may raise AdmissionRejected.
+    Stream callers should await aadmit() before starting the response, so a
+    rejection can still be reported as an HTTP error. Batch callers can
+    admit_batch() up front; the next calls then use the admissions it got.
+    Background work not done for a user passes admission_bucket instead: a
+    provider bucket of its own (LLM_ADMISSION["PROVIDERS"]), so it neither
+    spends a user's budget nor the one shared by user requests.
     """
 
-    def __init__(self, provider: str | None = None, llm: LLMProvider | None = None):
-        self._llm = llm if llm is not None else get_llm(provider)
+    def __init__(
+        self,
+        provider: str | None = None,
+        llm: LLMProvider | None = None,
+        *,
+        endpoint: str | None = None,
+        user=None,
+        route_overrides: dict[str, Any] | None = None,
+        user_llm: Any = _RESOLVE,
+        admission_bucket: str | None = None,
+    ):
+        self.route = task_routing.route_for(
+            endpoint,
+            tier=getattr(user, "subscription_tier", None),
+            overrides=route_overrides,
+        )
+        own_llm = None
+        if llm is None and provider is None and user is not None:
+            if user_llm is _RESOLVE:
+                user_llm = user_providers.resolve(user, models=self.route.models)
+            own_llm = llm = user_llm
+        llm = llm if llm is not None else get_llm(provider, models=self.route.models)
+        self._provider_name = type(llm).__name__
+        vendor = getattr(llm, "name", None) or self._provider_name.lower()
+        # A user's own key gets its own admission bucket and circuit breaker.
+        self._scope = f"{vendor}:user:{user.pk}" if own_llm is not None else None
+        # Metrics wrap the retries, so latency is what the caller waited.
+        self._llm = InstrumentedProvider(
+            with_resilience(
+                llm, name=self._scope, policy=RetryPolicy(deadline=self.route.timeout)
+            ),
+            endpoint=endpoint or "unknown",
+            name=vendor,
+            variant=self.route.variant,
+        )
+        self.endpoint = endpoint
+        self.user = user
+        self._admission_bucket = admission_bucket
+        self.last_usage = Usage()
+        self._admitted = 0
+        self._admitted_lock = threading.Lock()
+
+    @classmethod
+    async def acreate(
+        cls,
+        provider: str | None = None,
+        llm: LLMProvider | None = None,
+        *,
+        endpoint: str | None = None,
+        user=None,
+        route_overrides: dict[str, Any] | None = None,
+    ) -> "LLMService":
+        """Async constructor: the user's own provider is resolved off the event loop."""
+        user_llm = None
+        if llm is None and provider is None and user is not None:
+            route = task_routing.route_for(
+                endpoint,
+                tier=getattr(user, "subscription_tier", None),
+                overrides=route_overrides,
+            )
+            user_llm = await user_providers.aresolve(user, models=route.models)
+        return cls(
+            provider,
+            llm,
+            endpoint=endpoint,
+            user=user,
+            route_overrides=route_overrides,
+            user_llm=user_llm,
+        )
+
+    @property
+    def provider_name(self) -> str:
+        """Provider name used for per-provider admission buckets."""
+        return self._admission_bucket or self._scope or self._llm.name
+
+    def admit_batch(self, count: int) -> int:
+        """Admit up to count upstream calls now, without waiting; returns how many."""
+        admitted = admission.admit_many(self.user, self.provider_name, count)
+        with self._admitted_lock:
+            self._admitted += admitted
+        return admitted
+
+    def _use_admitted(self) -> bool:
+        """Use up one admission taken by admit_batch(), if any are left."""
+        with self._admitted_lock:
+            if self._admitted <= 0:
+                return False
+            self._admitted -= 1
+            return True
+
+    def admit(self) -> None:
+        """Wait for admission of one upstream call (raises AdmissionRejected)."""
+        if not self._use_admitted():
+            admission.admit(self.user, self.provider_name)
+
+    async def aadmit(self) -> None:
+        """Async variant of admit()."""
+        if not self._use_admitted():
+            await admission.aadmit(self.user, self.provider_name)
+
+    def try_admit(self) -> float:
+        """Admit one upstream call without waiting; seconds to wait when not admitted."""
+        return admission.try_admit(self.user, self.provider_name)
+
+    @property
+    def model(self) -> str | None:
+        """Model name of the underlying provider (used for token budgeting)."""
+        return getattr(self._llm, "model", None)
+
+    @property
+    def max_tokens(self) -> int:
+        """Output token budget for this endpoint's task (see apps.ai.task_routing)."""
+        return self.route.max_tokens
+
+    def _request_key(
+        self,
+        messages: list[dict[str, str]],
+        system_prompt: SystemPrompt | None,
+        max_tokens: int,
+    ) -> str:
+        """
+        Stable key for this request, shared by the response cache and single-flight.
+        It includes the user, so a reply is never served to someone else.
+        """
+        return llm_cache.make_key(
+            scope=f"user:{self.user.pk}" if self.user is not None else None,
+            provider=self._provider_name,
+            model=getattr(self._llm, "model", None),
+            messages=messages,
+            system_prompt=system_text(system_prompt),
+            max_tokens=max_tokens,
+        )
 
     def complete(
         self,
         messages: list[dict[str, str]],
         *,
-        system_prompt: str | None = None,
+        system_prompt: SystemPrompt | None = None,
         max_tokens: int = 2048,
     ) -> str:
         """Send messages to the LLM and return the assistant reply text."""
-        return self._llm.complete(
-            messages,
-            system_prompt=system_prompt,
-            max_tokens=max_tokens,
-        )
+        self.last_usage = Usage()
+        return self._complete(messages, system_prompt, max_tokens, self.last_usage)
+
+    def _complete(
+        self,
+        messages: list[dict[str, str]],
+        system_prompt: SystemPrompt | None,
+        max_tokens: int,
+        collector: Usage,
+    ) -> str:
+        key = self._request_key(messages, system_prompt, max_tokens)
+        use_cache = llm_cache.is_enabled(self.endpoint)
+        if use_cache:
+            cached = llm_cache.lookup(self.endpoint, key)
+            if cached is not None:
+                return cached
+
+        # Only the caller that makes the upstream call is admitted; coalesced
+        # callers share its reply and are credited its usage.
+        def call() -> tuple[str, Usage]:
+            self.admit()
+            spent = Usage()
+            with usage.collect(spent):
+                text = self._llm.complete(
+                    messages,
+                    system_prompt=system_prompt,
+                    max_tokens=max_tokens,
+                )
+            if use_cache:
+                llm_cache.store(key, text)
+            return text, spent
+
+        text, spent = singleflight.flights.do(key, call) if singleflight.is_enabled() else call()
+        collector.add(spent)
+        return text
 
     def stream_complete(
         self,
         messages: list[dict[str, str]],
         *,
-        system_prompt: str | None = None,
+        system_prompt: SystemPrompt | None = None,
         max_tokens: int = 2048,
     ):
         """Send messages to the LLM and stream the assistant reply as text chunks."""
-        return self._llm.stream_complete(
-            messages,
-            system_prompt=system_prompt,
-            max_tokens=max_tokens,
+        collector = self.last_usage = Usage()
+
+        def open_stream():
+            stream = self._llm.stream_complete(
+                messages,
+                system_prompt=system_prompt,
+                max_tokens=max_tokens,
+            )
+            return usage.track(stream, collector)
+
+        if singleflight.is_enabled():
+            key = self._request_key(messages, system_prompt, max_tokens)
+            return singleflight.flights.stream(key, open_stream)
+        return open_stream()
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        """Async variant of complete(); does not block a worker thread while waiting."""
+        self.last_usage = Usage()
+        return await self._acomplete(messages, system_prompt, max_tokens, self.last_usage)
+
+    async def _acomplete(
+        self,
+        messages: list[dict[str, str]],
+        system_prompt: SystemPrompt | None,
+        max_tokens: int,
+        collector: Usage,
+    ) -> str:
+        key = self._request_key(messages, system_prompt, max_tokens)
+        use_cache = llm_cache.is_enabled(self.endpoint)
+        if use_cache:
+            cached = await llm_cache.alookup(self.endpoint, key)
+            if cached is not None:
+                return cached
+
+        async def call() -> tuple[str, Usage]:
+            await self.aadmit()
+            spent = Usage()
+            with usage.collect(spent):
+                text = await self._llm.acomplete(
+                    messages,
+                    system_prompt=system_prompt,
+                    max_tokens=max_tokens,
+                )
+            if use_cache:
+                await llm_cache.astore(key, text)
+            return text, spent
+
+        if singleflight.is_enabled():
+            text, spent = await singleflight.flights.ado(key, call)
+        else:
+            text, spent = await call()
+        collector.add(spent)
+        return text
+
+    def astream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ):
+        """Async variant of stream_complete(); returns an async iterator of text chunks."""
+        collector = self.last_usage = Usage()
+
+        def open_stream():
+            stream = self._llm.astream_complete(
+                messages,
+                system_prompt=system_prompt,
+                max_tokens=max_tokens,
+            )
+            return usage.atrack(stream, collector)
+
+        if singleflight.is_enabled():
+            key = self._request_key(messages, system_prompt, max_tokens)
+            return singleflight.flights.astream(key, open_stream)
+        return open_stream()
+
+    # ---- Batches ----
+
+    def iter_complete_many(
+        self,
+        requests: Iterable[CompletionRequest],
+        *,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        timeout: float | None = None,
+    ) -> Iterator[CompletionResult]:
+        """
+        Run requests on a pool of at most max_concurrency threads, yielding each
+        result as soon as it is ready (use result.index to restore order).
+
+        A failing request yields a result with error set instead of raising.
+        timeout limits each request from the moment it starts; a request that runs
+        over yields a TimeoutError result and its late reply is discarded.
+        """
+        requests = list(requests)
+        if not requests:
+            return
+        started: dict[int, float] = {}
+
+        def run(index: int, request: CompletionRequest) -> CompletionResult:
+            started[index] = time.monotonic()
+            collector = Usage()
+            text = self._complete(
+                request.messages, request.system_prompt, request.max_tokens, collector
+            )
+            return CompletionResult(index=index, text=text, usage=collector)
+
+        pool = ThreadPoolExecutor(
+            max_workers=max(1, min(max_concurrency, len(requests))),
+            thread_name_prefix="llm-batch",
         )
+        try:
+            futures = {pool.submit(run, i, r): i for i, r in enumerate(requests)}
+            pending = set(futures)
+            while pending:
+                wait_for = None
+                if timeout is not None:
+                    running = [started[futures[f]] for f in pending if futures[f] in started]
+                    next_expiry = min(running) + timeout if running else time.monotonic() + timeout
+                    wait_for = max(0.0, next_expiry - time.monotonic())
+                done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures[future]
+                    try:
+                        yield future.result()
+                    except Exception as exc:
+                        yield CompletionResult(index=index, error=exc)
+                if timeout is None:
+                    continue
+                now = time.monotonic()
+                for future in list(pending):
+                    index = futures[future]
+                    if index in started and now - started[index] >= timeout:
+                        pending.discard(future)
+                        yield CompletionResult(
+                            index=index,
+                            error=TimeoutError(f"Request {index} timed out after {timeout}s"),
+                        )
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def complete_many(
+        self,
+        requests: Iterable[CompletionRequest],
+        *,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        timeout: float | None = None,
+    ) -> list[CompletionResult]:
+        """Like iter_complete_many(), but returns all results in request order."""
+        results = sorted(
+            self.iter_complete_many(requests, max_concurrency=max_concurrency, timeout=timeout),
+            key=lambda r: r.index,
+        )
+        self.last_usage = _sum_usage(results)
+        return results
+
+    async def aiter_complete_many(
+        self,
+        requests: Iterable[CompletionRequest],
+        *,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        timeout: float | None = None,
+    ) -> AsyncIterator[CompletionResult]:
+        """
+        Async variant of iter_complete_many(): at most max_concurrency requests are
+        in flight on the event loop; a request over timeout is cancelled.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run(index: int, request: CompletionRequest) -> CompletionResult:
+            async with semaphore:
+                collector = Usage()
+                try:
+                    text = await asyncio.wait_for(
+                        self._acomplete(
+                            request.messages, request.system_prompt, request.max_tokens, collector
+                        ),
+                        timeout=timeout,
+                    )
+                except asyncio.TimeoutError:
+                    return CompletionResult(
+                        index=index,
+                        error=TimeoutError(f"Request {index} timed out after {timeout}s"),
+                        usage=collector,
+                    )
+                except Exception as exc:
+                    return CompletionResult(index=index, error=exc, usage=collector)
+                return CompletionResult(index=index, text=text, usage=collector)
+
+        tasks = [asyncio.ensure_future(run(i, r)) for i, r in enumerate(requests)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def acomplete_many(
+        self,
+        requests: Iterable[CompletionRequest],
+        *,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        timeout: float | None = None,
+    ) -> list[CompletionResult]:
+        """Like aiter_complete_many(), but returns all results in request order."""
+        results = [
+            r async for r in self.aiter_complete_many(
+                requests, max_concurrency=max_concurrency, timeout=timeout
+            )
+        ]
+        results.sort(key=lambda r: r.index)
+        self.last_usage = _sum_usage(results)
+        return results
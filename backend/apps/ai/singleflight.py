@@ -0,0 +1,253 @@
+"""Single-flight coalescing of identical in-flight LLM requests."""
+
+import asyncio
+import concurrent.futures
+import threading
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from typing import Any, TypeVar
+
+from django.conf import settings
+
+
+T = TypeVar("T")
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, "LLM_SINGLE_FLIGHT_ENABLED", True))
+
+
+class LocalLockTable:
+    """Process-local table of in-flight entries keyed by request key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[str, Any] = {}
+
+    def get_or_create(self, key: str, factory: Callable[[], Any]) -> tuple[Any, bool]:
+        """Return (entry, created); created is True for the caller that must lead."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry, False
+            entry = self._entries[key] = factory()
+            return entry, True
+
+    def discard(self, key: str, entry: Any) -> None:
+        """Remove key if it still maps to entry."""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class StreamFlight:
+    """Shared, replayable buffer of chunks from one upstream stream."""
+
+    def __init__(self):
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self._cond = threading.Condition()
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self._cancel: Callable[[], None] | None = None
+        self.cancelled = False
+
+    def _wake_async(self) -> None:
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Subscriber's loop already closed.
+                pass
+
+    def publish(self, chunk: str) -> None:
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+            self._wake_async()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+            self._wake_async()
+
+    def set_canceller(self, cancel: Callable[[], None]) -> None:
+        """Called once when the last subscriber leaves before the stream is done."""
+        self._cancel = cancel
+
+    def _join(self) -> None:
+        with self._cond:
+            self.subscribers += 1
+
+    def _leave(self) -> None:
+        with self._cond:
+            self.subscribers -= 1
+            abandon = self.subscribers <= 0 and not self.done
+            if abandon:
+                self.cancelled = True
+        if abandon and self._cancel is not None:
+            self._cancel()
+
+    def subscribe(self) -> Iterator[str]:
+        """Blocking iterator over all chunks, from the first one to the end."""
+        self._join()
+        try:
+            index = 0
+            while True:
+                with self._cond:
+                    while index >= len(self.chunks) and not self.done:
+                        self._cond.wait()
+                    pending = self.chunks[index:]
+                    finished, error = self.done, self.error
+                index += len(pending)
+                yield from pending
+                if finished and index >= len(self.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            self._leave()
+
+    async def asubscribe(self) -> AsyncIterator[str]:
+        """Async iterator over all chunks, from the first one to the end."""
+        loop = asyncio.get_running_loop()
+        self._join()
+        try:
+            index = 0
+            while True:
+                event = None
+                with self._cond:
+                    pending = self.chunks[index:]
+                    finished, error = self.done, self.error
+                    if not pending and not finished:
+                        event = asyncio.Event()
+                        self._async_waiters.append((loop, event))
+                if event is not None:
+                    await event.wait()
+                    continue
+                index += len(pending)
+                for chunk in pending:
+                    yield chunk
+                if finished and index >= len(self.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            self._leave()
+
+
+class SingleFlight:
+    """Coalesces identical concurrent completions and streams."""
+
+    def __init__(self, table: LocalLockTable | None = None):
+        self.table = table if table is not None else LocalLockTable()
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        """Run fn once for all concurrent callers with the same key."""
+        future, leader = self.table.get_or_create("complete:" + key, concurrent.futures.Future)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self.table.discard("complete:" + key, future)
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Async variant of do(); followers may be on any thread or loop."""
+        future, leader = self.table.get_or_create("complete:" + key, concurrent.futures.Future)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self.table.discard("complete:" + key, future)
+
+    def stream(self, key: str, open_stream: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Subscribe to the shared stream for key, starting a pump thread if none is running."""
+        flight, leader = self.table.get_or_create("stream:" + key, StreamFlight)
+        if leader:
+            flight.set_canceller(lambda: self.table.discard("stream:" + key, flight))
+            thread = threading.Thread(
+                target=self._pump,
+                args=(key, flight, open_stream),
+                name="llm-stream-pump",
+                daemon=True,
+            )
+            thread.start()
+        return flight.subscribe()
+
+    def astream(self, key: str, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Async variant of stream(); the pump runs as a task on the leader's event loop."""
+        flight, leader = self.table.get_or_create("stream:" + key, StreamFlight)
+        if leader:
+            loop = asyncio.get_running_loop()
+            task = loop.create_task(self._apump(key, flight, open_stream))
+
+            def cancel():
+                self.table.discard("stream:" + key, flight)
+                loop.call_soon_threadsafe(task.cancel)
+
+            flight.set_canceller(cancel)
+        return flight.asubscribe()
+
+    def _pump(self, key: str, flight: StreamFlight, open_stream: Callable[[], Iterator[str]]) -> None:
+        upstream = None
+        try:
+            upstream = open_stream()
+            for chunk in upstream:
+                if flight.cancelled:
+                    break
+                flight.publish(chunk)
+        except BaseException as exc:
+            flight.finish(exc)
+        else:
+            flight.finish()
+        finally:
+            self.table.discard("stream:" + key, flight)
+            close = getattr(upstream, "close", None)
+            if close is not None:
+                close()
+
+    async def _apump(
+        self,
+        key: str,
+        flight: StreamFlight,
+        open_stream: Callable[[], AsyncIterator[str]],
+    ) -> None:
+        upstream = None
+        try:
+            upstream = open_stream()
+            async for chunk in upstream:
+                flight.publish(chunk)
+        except asyncio.CancelledError as exc:
+            flight.finish(exc)
+        except Exception as exc:
+            flight.finish(exc)
+        else:
+            flight.finish()
+        finally:
+            self.table.discard("stream:" + key, flight)
+            aclose = getattr(upstream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+flights = SingleFlight()
@@ -0,0 +1,168 @@
+"""Streaming responses for LLM replies (plain text, SSE, NDJSON)."""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from typing import Any
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+SSE_CONTENT_TYPE = "text/event-stream"
+TEXT_CONTENT_TYPE = "text/plain; charset=utf-8"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+HEARTBEAT = b": keep-alive\n\n"
+
+
+def _config() -> dict[str, Any]:
+    return getattr(settings, "LLM_STREAMING", {}) or {}
+
+
+def wants_sse(request) -> bool:
+    """True when the client asked for Server-Sent Events."""
+    return SSE_CONTENT_TYPE in request.headers.get("Accept", "")
+
+
+async def coalesce(
+    chunks: AsyncIterator[str],
+    *,
+    max_bytes: int | None = None,
+    max_delay: float | None = None,
+    heartbeat: float | None = None,
+) -> AsyncIterator[bytes | None]:
+    """
+    Re-chunk chunks into UTF-8 batches of up to about max_bytes, each sent at
+    most max_delay seconds after its first delta. With heartbeat set, yields
+    None after that many idle seconds. The upstream is closed when iteration
+    stops early.
+    """
+    config = _config()
+    max_bytes = max_bytes or int(config.get("FLUSH_BYTES", 256))
+    max_delay = max_delay if max_delay is not None else float(config.get("FLUSH_MS", 20)) / 1000
+    loop = asyncio.get_running_loop()
+    upstream = aiter(chunks)
+    pending: asyncio.Future | None = None
+    buffer: list[bytes] = []
+    size = 0
+    batch_started = 0.0
+    first = True
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(upstream))
+            if buffer:
+                timeout = max(0.0, batch_started + max_delay - loop.time())
+            else:
+                timeout = heartbeat
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                if buffer:
+                    yield b"".join(buffer)
+                    buffer, size = [], 0
+                else:
+                    yield None
+                continue
+            future, pending = pending, None
+            try:
+                chunk = future.result()
+            except StopAsyncIteration:
+                break
+            except Exception:
+                if buffer:
+                    yield b"".join(buffer)
+                raise
+            if not chunk:
+                continue
+            data = chunk.encode("utf-8")
+            if first:
+                first = False
+                yield data
+                continue
+            if not buffer:
+                batch_started = loop.time()
+            buffer.append(data)
+            size += len(data)
+            if size >= max_bytes:
+                yield b"".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield b"".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, Exception):
+                pass
+        aclose = getattr(upstream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def sse_event(data: bytes, *, event_id: int | None = None, event: str | None = None) -> bytes:
+    """Frame data as one Server-Sent Event (multi-line data becomes several data: lines)."""
+    lines = []
+    if event_id is not None:
+        lines.append(b"id: %d" % event_id)
+    if event:
+        lines.append(b"event: " + event.encode("ascii"))
+    lines.extend(b"data: " + line for line in data.split(b"\n"))
+    return b"\n".join(lines) + b"\n\n"
+
+
+async def _plain(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    batches = coalesce(chunks)
+    try:
+        async for batch in batches:
+            yield batch
+    finally:
+        await batches.aclose()
+
+
+async def _sse(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    heartbeat = float(_config().get("HEARTBEAT_SECONDS", 15))
+    batches = coalesce(chunks, heartbeat=heartbeat)
+    event_id = 0
+    try:
+        async for batch in batches:
+            if batch is None:
+                yield HEARTBEAT
+                continue
+            event_id += 1
+            yield sse_event(batch, event_id=event_id)
+    except Exception:
+        logger.exception("LLM stream failed")
+        yield sse_event(b"The AI service failed while replying.", event_id=event_id + 1, event="error")
+        return
+    finally:
+        await batches.aclose()
+    yield sse_event(b"", event_id=event_id + 1, event="end")
+
+
+def _no_buffering(response: StreamingHttpResponse) -> StreamingHttpResponse:
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from re-buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def streaming_response(chunks: AsyncIterator[str], *, sse: bool = False) -> StreamingHttpResponse:
+    """StreamingHttpResponse for a streamed reply: coalesced plain text, or SSE when sse=True."""
+    return _no_buffering(
+        StreamingHttpResponse(
+            _sse(chunks) if sse else _plain(chunks),
+            content_type=SSE_CONTENT_TYPE if sse else TEXT_CONTENT_TYPE,
+        )
+    )
+
+
+def sse_response(events: AsyncIterator[bytes]) -> StreamingHttpResponse:
+    """StreamingHttpResponse for already-framed SSE events (see sse_event)."""
+    return _no_buffering(StreamingHttpResponse(events, content_type=SSE_CONTENT_TYPE))
+
+
+def ndjson_response(lines: AsyncIterator[bytes]) -> StreamingHttpResponse:
+    """StreamingHttpResponse for newline-delimited JSON records, one per line."""
+    return _no_buffering(StreamingHttpResponse(lines, content_type=NDJSON_CONTENT_TYPE))
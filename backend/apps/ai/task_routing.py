@@ -0,0 +1,108 @@
+"""Task routing table: model, output budget and deadline per AI task."""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TOKENS = 1024
+DEFAULT_TIMEOUT_SECONDS = 60.0
+
+OVERRIDE_HEADERS = {
+    "model": "X-LLM-Model",
+    "max_tokens": "X-LLM-Max-Tokens",
+    "timeout": "X-LLM-Timeout",
+}
+
+
+@dataclass(frozen=True)
+class TaskRoute:
+    """Resolved settings for one task."""
+
+    task: str
+    models: dict[str, str] = field(default_factory=dict)
+    max_tokens: int = DEFAULT_MAX_TOKENS
+    timeout: float = DEFAULT_TIMEOUT_SECONDS
+    overridden: bool = False
+
+    @property
+    def variant(self) -> str:
+        return "override" if self.overridden else "default"
+
+
+def _config() -> dict[str, Any]:
+    return getattr(settings, "LLM_TASKS", {}) or {}
+
+
+def _merge(route: dict[str, Any], layer: dict[str, Any] | None) -> None:
+    for key, value in (layer or {}).items():
+        if key == "models":
+            route["models"] = {**route["models"], **value}
+        else:
+            route[key] = value
+
+
+def route_for(
+    task: str | None,
+    *,
+    tier: str | None = None,
+    overrides: dict[str, Any] | None = None,
+) -> TaskRoute:
+    """Route for task (None: DEFAULT only) and subscription tier, with overrides applied."""
+    config = _config()
+    route: dict[str, Any] = {
+        "models": {},
+        "max_tokens": DEFAULT_MAX_TOKENS,
+        "timeout": DEFAULT_TIMEOUT_SECONDS,
+    }
+    _merge(route, config.get("DEFAULT"))
+    if task:
+        _merge(route, config.get("TASKS", {}).get(task))
+        if tier:
+            _merge(route, config.get("TIERS", {}).get(tier, {}).get(task))
+    overrides = {k: v for k, v in (overrides or {}).items() if v is not None}
+    model = overrides.pop("model", None)
+    if model:
+        # One model for whichever provider serves the request.
+        route["models"] = {name: model for name in ("openai", "anthropic", "fake", *route["models"])}
+    _merge(route, overrides)
+    result = TaskRoute(
+        task=task or "default",
+        models=route["models"],
+        max_tokens=int(route["max_tokens"]),
+        timeout=float(route["timeout"]),
+        overridden=bool(model or overrides),
+    )
+    if result.overridden:
+        logger.info(
+            "LLM route override: task=%s models=%s max_tokens=%s timeout=%s",
+            result.task,
+            result.models,
+            result.max_tokens,
+            result.timeout,
+        )
+    return result
+
+
+def request_overrides(request, user) -> dict[str, Any] | None:
+    """Route overrides from X-LLM-* headers; honoured for staff users only."""
+    if not getattr(user, "is_staff", False):
+        return None
+    overrides: dict[str, Any] = {}
+    for key, header in OVERRIDE_HEADERS.items():
+        raw = request.headers.get(header, "").strip()
+        if not raw:
+            continue
+        if key == "model":
+            overrides[key] = raw
+            continue
+        try:
+            value = int(raw) if key == "max_tokens" else float(raw)
+        except ValueError:
+            continue
+        if value > 0:
+            overrides[key] = value
+    return overrides or None
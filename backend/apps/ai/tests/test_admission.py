@@ -0,0 +1,166 @@
+"""Tests for admission control."""
+
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+
+
+class AdmissionControlTest(TestCase):
+    """Tests for per-user / per-provider token buckets and the fair wait queue."""
+
+    def _controller(self, **overrides):
+        from apps.ai.admission import AdmissionController
+
+        config = {
+            "ENABLED": True,
+            "MAX_WAIT_SECONDS": 2,
+            "MAX_QUEUE": 100,
+            "TIERS": {
+                "free": {"rate_per_minute": 600, "burst": 2},
+                "pro": {"rate_per_minute": 600, "burst": 5},
+            },
+            "PROVIDER": {"rate_per_minute": 60_000, "burst": 100},
+            **overrides,
+        }
+        return AdmissionController(config)
+
+    @staticmethod
+    def _user(pk, tier="free"):
+        from types import SimpleNamespace
+
+        return SimpleNamespace(pk=pk, subscription_tier=tier)
+
+    def test_burst_is_admitted_then_requests_wait_for_refill(self):
+        """Up to burst calls go straight through; the next one waits ~1/rate."""
+        controller = self._controller()
+        user = self._user(1)
+        start = time.monotonic()
+        controller.admit(user, "openai")
+        controller.admit(user, "openai")
+        self.assertLess(time.monotonic() - start, 0.05)
+        controller.admit(user, "openai")
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        stats = controller.snapshot()
+        self.assertEqual(stats["admitted"], 3)
+        self.assertEqual(stats["queued"], 1)
+        self.assertEqual(stats["queue_depth"], 0)
+
+    def test_tier_sets_the_bucket_size(self):
+        """A pro user gets a larger burst than a free user."""
+        from apps.ai.admission import AdmissionRejected
+
+        controller = self._controller(MAX_WAIT_SECONDS=0)
+        admitted = {}
+        for tier in ("free", "pro"):
+            user = self._user(tier, tier)
+            admitted[tier] = 0
+            try:
+                for _ in range(10):
+                    controller.admit(user, "openai")
+                    admitted[tier] += 1
+            except AdmissionRejected:
+                pass
+        self.assertEqual(admitted, {"free": 2, "pro": 5})
+
+    def test_rejects_after_max_wait_and_when_queue_full(self):
+        """Waiting is bounded in time and in queue length."""
+        from apps.ai.admission import AdmissionRejected
+
+        slow = {"free": {"rate_per_minute": 1, "burst": 1}}
+        controller = self._controller(TIERS=slow, MAX_WAIT_SECONDS=0.05)
+        user = self._user(1)
+        controller.admit(user, "openai")
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.admit(user, "openai")
+        self.assertEqual(ctx.exception.reason, "wait timeout")
+        self.assertGreater(ctx.exception.retry_after, 1)
+
+        controller = self._controller(TIERS=slow, MAX_QUEUE=0)
+        controller.admit(user, "openai")
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.admit(user, "openai")
+        self.assertEqual(ctx.exception.reason, "queue full")
+        self.assertEqual(controller.snapshot()["rejected_queue_full"], 1)
+
+    def test_queue_is_round_robin_across_users(self):
+        """A user joining behind another's burst is served on the next turn, not last."""
+        import asyncio
+
+        controller = self._controller(PROVIDER={"rate_per_minute": 1200, "burst": 1})
+        heavy, light = self._user("heavy"), self._user("light")
+        order = []
+
+        async def request(user, label):
+            await controller.aadmit(user, "openai")
+            order.append(label)
+
+        async def run():
+            await controller.aadmit(heavy, "openai")  # drain the provider bucket
+            tasks = [asyncio.ensure_future(request(heavy, f"heavy{i}")) for i in range(4)]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.ensure_future(request(light, "light")))
+            await asyncio.gather(*tasks)
+
+        controller.config["TIERS"]["free"]["burst"] = 10
+        asyncio.run(run())
+        self.assertLessEqual(order.index("light"), 1)
+
+    def test_cancelled_waiter_leaves_the_queue(self):
+        """A request cancelled while queued (client gone) takes no token and holds no turn."""
+        import asyncio
+
+        slow = {"free": {"rate_per_minute": 600, "burst": 1}}
+        controller = self._controller(TIERS=slow)
+        gone, live = self._user("gone"), self._user("live")
+
+        async def run():
+            await controller.aadmit(gone, "openai")
+            waiting = asyncio.ensure_future(controller.aadmit(gone, "openai"))
+            await asyncio.sleep(0.01)
+            self.assertEqual(controller.snapshot()["queue_depth"], 1)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            self.assertEqual(controller.snapshot()["queue_depth"], 0)
+            await controller.aadmit(live, "openai")
+
+        asyncio.run(run())
+        stats = controller.snapshot()
+        self.assertEqual((stats["admitted"], stats["queue_depth"], stats["waiting_users"]), (2, 0, 0))
+
+    def test_chat_returns_429_when_rejected(self):
+        """Endpoints report an admission rejection as 429 with retry_after."""
+        import os
+
+        from django.test import override_settings
+
+        from apps.ai.admission import controller
+
+        controller.reset()
+        user = get_user_model().objects.create_user(
+            email="limited@example.com",
+            forwarding_address="limited-fwd@example.com",
+            password="testpass123",
+        )
+        client = Client()
+        client.force_login(user)
+        config = {
+            "ENABLED": True,
+            "MAX_WAIT_SECONDS": 0,
+            "MAX_QUEUE": 10,
+            "TIERS": {"free": {"rate_per_minute": 1, "burst": 1}},
+            "PROVIDER": {"rate_per_minute": 600, "burst": 60},
+        }
+        env = {"LLM_PROVIDER": "fake", "LLM_FAKE_TTFT_MS": "0", "LLM_FAKE_TOKENS_PER_SEC": "0"}
+        with override_settings(LLM_ADMISSION=config), patch.dict(os.environ, env):
+            first = client.post(
+                "/api/ai/improve-answer", {"draft_answer": "First draft"}, content_type="application/json"
+            )
+            second = client.post(
+                "/api/ai/improve-answer", {"draft_answer": "Second draft"}, content_type="application/json"
+            )
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 429)
+        self.assertGreater(second.json()["retry_after"], 0)
@@ -0,0 +1,110 @@
+"""Tests for the LLM response cache."""
+
+from django.test import TestCase, override_settings
+
+
+@override_settings(
+    LLM_RESPONSE_CACHE={"ALIAS": "llm", "ENDPOINTS": ["cover_letter", "improve_answer"]}
+)
+class LLMResponseCacheTest(TestCase):
+    """Tests for the opt-in LLMService response cache."""
+
+    def setUp(self):
+        from django.core.cache import caches
+
+        from apps.ai import llm_cache
+        from providers.llm.base import LLMProvider
+
+        caches["llm"].clear()
+        llm_cache.counters.reset()
+
+        class CountingProvider(LLMProvider):
+            model = "test-model"
+
+            def __init__(self):
+                self.calls = 0
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                self.calls += 1
+                return f"reply {self.calls}"
+
+        self.provider = CountingProvider()
+
+    def test_identical_request_is_served_from_cache(self):
+        """Second identical request for an enabled endpoint does not hit the provider."""
+        from apps.ai import llm_cache
+        from apps.ai.services import LLMService
+
+        service = LLMService(llm=self.provider, endpoint="cover_letter")
+        messages = [{"role": "user", "content": "Write it"}]
+        first = service.complete(messages, system_prompt="sys", max_tokens=100)
+        second = service.complete(messages, system_prompt="sys", max_tokens=100)
+        self.assertEqual(first, "reply 1")
+        self.assertEqual(second, "reply 1")
+        self.assertEqual(self.provider.calls, 1)
+        self.assertEqual(llm_cache.stats()["cover_letter"], {"hits": 1, "misses": 1})
+
+    def test_any_input_change_misses(self):
+        """Changing system prompt, messages or max_tokens produces a new key."""
+        from apps.ai.services import LLMService
+
+        service = LLMService(llm=self.provider, endpoint="cover_letter")
+        messages = [{"role": "user", "content": "Write it"}]
+        service.complete(messages, system_prompt="sys", max_tokens=100)
+        service.complete(messages, system_prompt="sys2", max_tokens=100)
+        service.complete(messages, system_prompt="sys", max_tokens=200)
+        service.complete([{"role": "user", "content": "Other"}], system_prompt="sys", max_tokens=100)
+        self.assertEqual(self.provider.calls, 4)
+
+    def test_endpoint_not_enabled_is_not_cached(self):
+        """Endpoints missing from LLM_RESPONSE_CACHE['ENDPOINTS'] always call the provider."""
+        from apps.ai.services import LLMService
+
+        for service in (LLMService(llm=self.provider, endpoint="chat"), LLMService(llm=self.provider)):
+            service.complete([{"role": "user", "content": "Hi"}])
+            service.complete([{"role": "user", "content": "Hi"}])
+        self.assertEqual(self.provider.calls, 4)
+
+    def test_enablement_follows_settings(self):
+        """Per-endpoint enablement is read from settings."""
+        from django.test import override_settings
+
+        from apps.ai.services import LLMService
+
+        with override_settings(LLM_RESPONSE_CACHE={"ALIAS": "llm", "ENDPOINTS": []}):
+            service = LLMService(llm=self.provider, endpoint="cover_letter")
+            service.complete([{"role": "user", "content": "Hi"}])
+            service.complete([{"role": "user", "content": "Hi"}])
+        self.assertEqual(self.provider.calls, 2)
+
+    def test_cache_is_off_by_default(self):
+        """The shipped settings cache no endpoint unless LLM_CACHE_ENDPOINTS lists it."""
+        import config.settings as project_settings
+
+        self.assertEqual(project_settings.LLM_RESPONSE_CACHE["ENDPOINTS"], [])
+
+    def test_replies_are_not_shared_between_users(self):
+        """The same prompt from two users is answered separately."""
+        from types import SimpleNamespace
+
+        from apps.ai.services import LLMService
+
+        messages = [{"role": "user", "content": "Write it"}]
+        for pk in (1, 2, 1):
+            user = SimpleNamespace(pk=pk, subscription_tier=None)
+            service = LLMService(llm=self.provider, endpoint="cover_letter", user=user)
+            service.complete(messages, system_prompt="sys", max_tokens=100)
+        self.assertEqual(self.provider.calls, 2)
+
+    def test_acomplete_shares_cache_with_complete(self):
+        """Async and sync completions use the same cache entries."""
+        import asyncio
+
+        from apps.ai.services import LLMService
+
+        service = LLMService(llm=self.provider, endpoint="improve_answer")
+        messages = [{"role": "user", "content": "Draft"}]
+        sync_text = service.complete(messages, system_prompt="star")
+        async_text = asyncio.run(service.acomplete(messages, system_prompt="star"))
+        self.assertEqual(sync_text, async_text)
+        self.assertEqual(self.provider.calls, 1)
@@ -0,0 +1,296 @@
+"""Tests for chat API and chat memory."""
+
+from unittest.mock import AsyncMock, patch
+
+from django.test import AsyncClient, TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+
+
+class ChatAPITest(TestCase):
+    """Tests for chat endpoints."""
+
+    def setUp(self):
+        self.client = Client()
+        self.User = get_user_model()
+        self.user = self.User.objects.create_user(
+            email="chat@example.com",
+            forwarding_address="chat-fwd@example.com",
+            password="testpass123",
+        )
+
+    def test_chat_create_session_unauthorized(self):
+        """POST /api/ai/chat/sessions without auth returns 401."""
+        response = self.client.post("/api/ai/chat/sessions", {})
+        self.assertEqual(response.status_code, 401)
+
+    def test_chat_create_session_success(self):
+        """POST /api/ai/chat/sessions creates session and returns 201."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            "/api/ai/chat/sessions",
+            {},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertIn("id", data)
+        self.assertIn("created_at", data)
+        from apps.ai.models import ChatSession
+
+        self.assertEqual(ChatSession.objects.filter(user=self.user).count(), 1)
+
+    def test_chat_list_sessions_unauthorized(self):
+        """GET /api/ai/chat/sessions without auth returns 401."""
+        response = self.client.get("/api/ai/chat/sessions")
+        self.assertEqual(response.status_code, 401)
+
+    def test_chat_list_sessions_returns_mine(self):
+        """GET /api/ai/chat/sessions returns user's sessions."""
+        from apps.ai.models import ChatSession
+
+        ChatSession.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        response = self.client.get("/api/ai/chat/sessions")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 1)
+
+    def test_chat_list_messages_returns_messages(self):
+        """GET /api/ai/chat/sessions/{id}/messages returns session messages."""
+        from apps.ai.models import ChatMessage, ChatSession
+
+        session = ChatSession.objects.create(user=self.user)
+        ChatMessage.objects.create(session=session, role="user", content="Hi")
+        ChatMessage.objects.create(session=session, role="assistant", content="Hello")
+        self.client.force_login(self.user)
+        response = self.client.get(f"/api/ai/chat/sessions/{session.id}/messages")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]["role"], "user")
+        self.assertEqual(data[1]["role"], "assistant")
+
+    def test_chat_list_messages_pages_from_the_bottom(self):
+        """Messages are paged by cursor, starting at the newest page."""
+        from apps.ai.models import ChatMessage, ChatSession
+
+        session = ChatSession.objects.create(user=self.user)
+        for i in range(7):
+            ChatMessage.objects.create(session=session, role="user", content=f"m{i}")
+        self.client.force_login(self.user)
+        url = f"/api/ai/chat/sessions/{session.id}/messages"
+
+        response = self.client.get(url, {"limit": 3})
+        self.assertEqual([m["content"] for m in response.json()], ["m4", "m5", "m6"])
+        self.assertNotIn("X-After-Cursor", response.headers)
+        older = self.client.get(url, {"limit": 3, "before": response.headers["X-Before-Cursor"]})
+        self.assertEqual([m["content"] for m in older.json()], ["m1", "m2", "m3"])
+        oldest = self.client.get(url, {"limit": 3, "before": older.headers["X-Before-Cursor"]})
+        self.assertEqual([m["content"] for m in oldest.json()], ["m0"])
+        self.assertNotIn("X-Before-Cursor", oldest.headers)
+        newer = self.client.get(url, {"limit": 3, "after": oldest.headers["X-After-Cursor"]})
+        self.assertEqual([m["content"] for m in newer.json()], ["m1", "m2", "m3"])
+        self.assertIn("X-After-Cursor", newer.headers)
+
+        everything = self.client.get(url)
+        self.assertEqual([m["content"] for m in everything.json()], [f"m{i}" for i in range(7)])
+        self.assertNotIn("X-Before-Cursor", everything.headers)
+
+        self.assertEqual(self.client.get(url, {"before": "not-a-cursor"}).status_code, 400)
+
+    def test_chat_list_sessions_pages_by_cursor(self):
+        """Sessions are listed newest first, a page at a time."""
+        from apps.ai.models import ChatSession
+
+        for i in range(5):
+            ChatSession.objects.create(user=self.user, title=f"s{i}")
+        self.client.force_login(self.user)
+        first = self.client.get("/api/ai/chat/sessions", {"limit": 2})
+        self.assertEqual([s["title"] for s in first.json()], ["s4", "s3"])
+        second = self.client.get("/api/ai/chat/sessions", {"limit": 2, "before": first.headers["X-Before-Cursor"]})
+        self.assertEqual([s["title"] for s in second.json()], ["s2", "s1"])
+        back = self.client.get("/api/ai/chat/sessions", {"limit": 2, "after": second.headers["X-After-Cursor"]})
+        self.assertEqual([s["title"] for s in back.json()], ["s4", "s3"])
+
+    def test_chat_send_message_unauthorized(self):
+        """POST .../messages without auth returns 401."""
+        from apps.ai.models import ChatSession
+
+        session = ChatSession.objects.create(user=self.user)
+        response = self.client.post(
+            f"/api/ai/chat/sessions/{session.id}/messages",
+            {"content": "Hello"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_chat_send_message_streams_with_mocked_llm(self):
+        """POST .../messages with auth calls LLM and streams response (mocked)."""
+        from apps.ai.models import ChatMessage, ChatSession
+
+        async def fake_stream(*args, **kwargs):
+            for chunk in ["Mocked ", "reply"]:
+                yield chunk
+
+        session = await ChatSession.objects.acreate(user=self.user)
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with patch("apps.ai.api.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            mock_instance = MockLLMService.return_value
+            mock_instance.max_tokens = 1024
+            mock_instance.aadmit = AsyncMock()
+            mock_instance.astream_complete.side_effect = fake_stream
+            response = await client.post(
+                f"/api/ai/chat/sessions/{session.id}/messages",
+                {"content": "Hello"},
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 200)
+            body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(body, b"Mocked reply")
+        user_msg = await ChatMessage.objects.aget(session=session, role="user")
+        self.assertEqual(user_msg.content, "Hello")
+        self.assertGreater(user_msg.token_count, 0)
+        assistant_msg = await ChatMessage.objects.aget(session=session, role="assistant")
+        self.assertEqual(assistant_msg.content, "Mocked reply")
+        self.assertGreater(assistant_msg.token_count, 0)
+
+
+@override_settings(LLM_CHAT_MEMORY={"WINDOW_MESSAGES": 4, "SUMMARY_BATCH": 2})
+class ChatMemoryTest(TestCase):
+    """Tests for the chat window and rolling session summary."""
+
+    def setUp(self):
+        from apps.ai import chat_memory
+        from apps.ai.models import ChatMessage, ChatSession
+
+        chat_memory.reset()
+        self.user = get_user_model().objects.create_user(
+            email="memory@example.com",
+            forwarding_address="memory-fwd@example.com",
+            password="testpass123",
+        )
+        self.session = ChatSession.objects.create(user=self.user)
+        for i in range(10):
+            ChatMessage.objects.create(
+                session=self.session,
+                role="user" if i % 2 == 0 else "assistant",
+                content=f"message {i}",
+                token_count=5,
+            )
+
+    async def test_window_reads_after_cursor_up_to_limit(self):
+        """Only unsummarised messages are read, at most window + batch of them."""
+        from apps.ai import chat_memory
+        from apps.ai.models import ChatSession
+
+        window = await chat_memory.aload_window(self.session, max_tokens=1000)
+        self.assertEqual([m["content"] for m in window.history], [f"message {i}" for i in range(4, 10)])
+        self.assertTrue(window.due)
+
+        cursor = await self.session.messages.order_by("created_at").values_list("created_at", flat=True).aget(
+            content="message 6"
+        )
+        await ChatSession.objects.filter(pk=self.session.pk).aupdate(summary="Earlier.", summarised_until=cursor)
+        session = await ChatSession.objects.aget(pk=self.session.pk)
+        window = await chat_memory.aload_window(session, max_tokens=1000)
+        self.assertEqual(window.summary, "Earlier.")
+        self.assertEqual([m["content"] for m in window.history], ["message 7", "message 8", "message 9"])
+        self.assertFalse(window.due)
+
+    def test_summary_follows_profile_in_system_prompt(self):
+        """The summary is an uncached block after the cached profile."""
+        from apps.ai.services import build_chat_system_prompt
+
+        blocks = build_chat_system_prompt("Profile", summary="Earlier.")
+        self.assertEqual([b.cache for b in blocks], [True, False])
+        self.assertIn("Earlier.", blocks[1].text)
+        self.assertEqual(len(build_chat_system_prompt("Profile", summary="")), 1)
+        grounded = build_chat_system_prompt("Name", excerpts="Excerpts", cache_profile=False)
+        self.assertEqual([b.cache for b in grounded], [False, False])
+
+    def test_summarise_folds_messages_before_window(self):
+        """All but the window is folded and the cursor moves past it."""
+        from apps.ai import chat_memory
+        from apps.ai.models import ChatSession
+
+        with patch("apps.ai.chat_memory.LLMService") as MockLLMService:
+            mock_instance = MockLLMService.return_value
+            mock_instance.model = None
+            mock_instance.max_tokens = 512
+            mock_instance.complete.return_value = "  The user asked six things.  "
+            self.assertTrue(chat_memory.summarise(self.session.id))
+        prompt = mock_instance.complete.call_args.args[0][0]["content"]
+        self.assertIn("message 5", prompt)
+        self.assertNotIn("message 6", prompt)
+        self.assertEqual(
+            MockLLMService.call_args.kwargs,
+            {"endpoint": "chat_summary", "admission_bucket": "chat_summary"},
+        )
+        session = ChatSession.objects.get(pk=self.session.pk)
+        self.assertEqual(session.summary, "The user asked six things.")
+        self.assertEqual(session.summarised_until, session.messages.get(content="message 5").created_at)
+
+        # Nothing older than the window is left.
+        with patch("apps.ai.chat_memory.LLMService") as MockLLMService:
+            self.assertFalse(chat_memory.summarise(self.session.id))
+        MockLLMService.assert_not_called()
+
+    def test_summarise_does_not_overwrite_a_moved_cursor(self):
+        """A job whose cursor was moved meanwhile writes nothing."""
+        from apps.ai import chat_memory
+        from apps.ai.models import ChatSession
+
+        def complete(*args, **kwargs):
+            ChatSession.objects.filter(pk=self.session.pk).update(
+                summary="Other job.", summarised_until=self.session.messages.get(content="message 1").created_at
+            )
+            return "Stale."
+
+        with patch("apps.ai.chat_memory.LLMService") as MockLLMService:
+            mock_instance = MockLLMService.return_value
+            mock_instance.model = None
+            mock_instance.max_tokens = 512
+            mock_instance.complete.side_effect = complete
+            self.assertFalse(chat_memory.summarise(self.session.id))
+        self.assertEqual(ChatSession.objects.get(pk=self.session.pk).summary, "Other job.")
+        self.assertEqual(chat_memory.stats()["conflicts"], 1)
+
+    def test_schedule_runs_one_job_per_session(self):
+        """A session already queued is not queued again."""
+        from apps.ai import chat_memory
+
+        with patch.object(chat_memory, "_pool") as pool:
+            self.assertTrue(chat_memory.schedule(self.session.id))
+            self.assertFalse(chat_memory.schedule(self.session.id))
+        pool.return_value.submit.assert_called_once()
+        self.assertEqual(chat_memory.stats(), {
+            "scheduled": 1, "skipped": 1, "completed": 0, "conflicts": 0, "failed": 0, "pending": 1
+        })
+
+    async def test_chat_turn_schedules_summary_when_due(self):
+        """A turn that read a full window queues a summary job after replying."""
+        async def fake_stream(*args, **kwargs):
+            yield "Reply"
+
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with patch("apps.ai.api.LLMService") as MockLLMService, patch(
+            "apps.ai.chat_memory.schedule"
+        ) as schedule:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            mock_instance = MockLLMService.return_value
+            mock_instance.max_tokens = 1024
+            mock_instance.aadmit = AsyncMock()
+            mock_instance.astream_complete.side_effect = fake_stream
+            response = await client.post(
+                f"/api/ai/chat/sessions/{self.session.id}/messages",
+                {"content": "Next"},
+                content_type="application/json",
+            )
+            [chunk async for chunk in response.streaming_content]
+        schedule.assert_called_once_with(self.session.id)
+        history = mock_instance.astream_complete.call_args.args[0]
+        self.assertEqual(len(history), 6)
+        self.assertEqual(history[-1]["content"], "Next")
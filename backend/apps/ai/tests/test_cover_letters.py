@@ -0,0 +1,385 @@
+"""Tests for cover-letter API."""
+
+import uuid
+from unittest.mock import AsyncMock, patch
+
+from django.test import AsyncClient, TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+
+
+class CoverLetterAPITest(TestCase):
+    """Tests for cover-letter endpoint."""
+
+    def setUp(self):
+        self.client = Client()
+        self.User = get_user_model()
+        self.user = self.User.objects.create_user(
+            email="cl@example.com",
+            forwarding_address="cl-fwd@example.com",
+            password="testpass123",
+        )
+
+    def test_cover_letter_unauthorized(self):
+        """POST /api/ai/cover-letter without auth returns 401."""
+        response = self.client.post(
+            "/api/ai/cover-letter",
+            {"job_description": "Senior Engineer at Acme."},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_cover_letter_empty_jd(self):
+        """POST with empty job_description returns 400."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            "/api/ai/cover-letter",
+            {"job_description": ""},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("detail", response.json())
+
+    def test_cover_letter_returns_generated_with_mocked_llm(self):
+        """POST with job_description returns 200 and cover_letter (mocked LLM)."""
+        self.client.force_login(self.user)
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            mock_instance = MockLLMService.return_value
+            mock_instance.max_tokens = 1024
+            mock_instance.acomplete = AsyncMock(
+                return_value="Dear Hiring Manager,\n\nI am writing to apply..."
+            )
+            response = self.client.post(
+                "/api/ai/cover-letter",
+                {"job_description": "Senior Software Engineer at Acme Corp.", "tone": "formal"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIn("cover_letter", data)
+        self.assertIn("Dear Hiring Manager", data["cover_letter"])
+        from apps.ai.models import AIOutput
+
+        output = AIOutput.objects.get(pk=data["output_id"])
+        self.assertEqual(output.type, "cover_letter")
+        self.assertEqual(output.job_description.raw_text, "Senior Software Engineer at Acme Corp.")
+        self.assertIn("--- JOB DESCRIPTION ---", output.prompt_snapshot)
+
+    async def test_cover_letter_stream_sends_tokens_and_stores_output(self):
+        """The streaming variant sends chunks as they arrive and stores the finished letter."""
+        from apps.ai.models import AIOutput
+
+        async def fake_stream(*args, **kwargs):
+            for chunk in ["Dear ", "Hiring ", "Manager,"]:
+                yield chunk
+
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            mock_instance = MockLLMService.return_value
+            mock_instance.max_tokens = 1024
+            mock_instance.model = None
+            mock_instance.aadmit = AsyncMock()
+            mock_instance.astream_complete.side_effect = fake_stream
+            response = await client.post(
+                "/api/ai/cover-letter/stream",
+                {"job_description": "Data Engineer at Acme."},
+                content_type="application/json",
+                headers={"Accept": "text/event-stream"},
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertTrue(body.startswith(b"id: 1\ndata: Dear "))
+        self.assertIn(b"event: end", body)
+        output = await AIOutput.objects.select_related("job_description").aget(user=self.user)
+        self.assertEqual(output.content, "Dear Hiring Manager,")
+        self.assertEqual(output.job_description.raw_text, "Data Engineer at Acme.")
+
+    async def test_cover_letter_stream_cut_short_is_not_stored(self):
+        """A letter whose stream is abandoned is not saved."""
+        from apps.ai.models import AIOutput
+
+        async def fake_stream(*args, **kwargs):
+            yield "Dear "
+            yield "Hiring Manager,"
+
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            mock_instance = MockLLMService.return_value
+            mock_instance.max_tokens = 1024
+            mock_instance.model = None
+            mock_instance.aadmit = AsyncMock()
+            mock_instance.astream_complete.side_effect = fake_stream
+            response = await client.post(
+                "/api/ai/cover-letter/stream",
+                {"job_description": "Data Engineer at Acme."},
+                content_type="application/json",
+            )
+            stream = response.streaming_content
+            self.assertEqual(await anext(stream), b"Dear ")
+            await stream.aclose()
+        self.assertFalse(await AIOutput.objects.filter(user=self.user).aexists())
+
+    def test_cover_letter_returns_503_when_llm_unavailable(self):
+        """An open circuit breaker surfaces as 503 rather than a server error."""
+        from providers.llm.resilience import CircuitOpenError
+
+        self.client.force_login(self.user)
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            MockLLMService.return_value.max_tokens = 1024
+            MockLLMService.return_value.acomplete = AsyncMock(
+                side_effect=CircuitOpenError("openai", 10)
+            )
+            response = self.client.post(
+                "/api/ai/cover-letter",
+                {"job_description": "Senior Software Engineer at Acme Corp."},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("detail", response.json())
+
+    def test_job_description_is_normalised_and_stored_once(self):
+        """Whitespace and line-ending variants of a posting hash alike and share one row."""
+        from apps.ai import cover_letters
+        from apps.ai.models import JobDescription
+
+        first = cover_letters.record_job_description(self.user, "Data  Engineer\r\n\r\n\r\nat Acme. ")
+        second = cover_letters.record_job_description(self.user, " Data Engineer\n\nat\tAcme.")
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(first.raw_text, "Data Engineer\n\nat Acme.")
+        self.assertEqual(first.content_hash, cover_letters.content_hash(first.raw_text))
+        self.assertEqual(JobDescription.objects.filter(user=self.user).count(), 1)
+        self.assertNotEqual(
+            cover_letters.content_hash("Data Engineer at Acme."),
+            cover_letters.content_hash("Data Engineer at Initech."),
+        )
+
+    def test_cover_letter_reuses_stored_letter(self):
+        """An identical request returns the stored letter without calling the LLM."""
+        from apps.ai import cover_letters
+        from apps.ai.profile_cache import bump_profile_version
+
+        self.client.force_login(self.user)
+        payload = {"job_description": "Senior Software Engineer at Acme Corp.", "tone": "formal"}
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            MockLLMService.return_value.max_tokens = 1024
+            MockLLMService.return_value.acomplete = AsyncMock(return_value="Dear Hiring Manager,")
+            first = self.client.post("/api/ai/cover-letter", payload, content_type="application/json")
+            second = self.client.post(
+                "/api/ai/cover-letter",
+                {**payload, "job_description": "Senior Software Engineer  at Acme Corp.\n"},
+                content_type="application/json",
+            )
+            self.assertEqual(MockLLMService.return_value.acomplete.await_count, 1)
+            self.assertFalse(first.json()["reused"])
+            self.assertTrue(second.json()["reused"])
+            self.assertEqual(second.json()["output_id"], first.json()["output_id"])
+
+            with self.assertNumQueries(1):
+                self.assertIsNotNone(cover_letters.find_output(self.user, payload["job_description"]))
+            self.assertIsNone(cover_letters.find_output(self.user, payload["job_description"], "enthusiastic"))
+
+            # A new tone, an explicit regenerate or a profile edit writes a new letter.
+            self.client.post(
+                "/api/ai/cover-letter", {**payload, "tone": "enthusiastic"}, content_type="application/json"
+            )
+            self.client.post(
+                "/api/ai/cover-letter", {**payload, "regenerate": True}, content_type="application/json"
+            )
+            bump_profile_version(self.user.pk)
+            third = self.client.post("/api/ai/cover-letter", payload, content_type="application/json")
+            self.assertEqual(MockLLMService.return_value.acomplete.await_count, 4)
+        self.assertFalse(third.json()["reused"])
+        self.assertNotEqual(third.json()["output_id"], first.json()["output_id"])
+
+    async def test_cover_letter_stream_sends_stored_letter(self):
+        """The streaming variant sends a stored letter in one piece without calling the LLM."""
+        from apps.ai import cover_letters
+
+        prompt = cover_letters.CoverLetterPrompt(service=None, system_prompt=[], tone="formal")
+        jd = await cover_letters.arecord_job_description(self.user, "Data Engineer at Acme.")
+        await cover_letters.asave_output(self.user, prompt, "Dear Hiring Manager,", jd)
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            response = await client.post(
+                "/api/ai/cover-letter/stream",
+                {"job_description": "Data Engineer at Acme."},
+                content_type="application/json",
+            )
+            body = b"".join([chunk async for chunk in response.streaming_content])
+        MockLLMService.assert_not_called()
+        self.assertEqual(body, b"Dear Hiring Manager,")
+
+
+class BulkCoverLetterTest(TestCase):
+    """Tests for bulk cover-letter generation."""
+
+    def setUp(self):
+        from django.utils import timezone
+
+        from apps.tracker.models import Application, ApplicationStatus
+
+        self.user = get_user_model().objects.create_user(
+            email="bulk@example.com",
+            forwarding_address="bulk-fwd@example.com",
+            password="testpass123",
+        )
+        self.applications = [
+            Application.objects.create(
+                user=self.user,
+                company_name=f"Company {i}",
+                job_title="Backend Engineer",
+                date_applied=timezone.now(),
+                status=ApplicationStatus.APPLIED,
+            )
+            for i in range(3)
+        ]
+
+    def _mock_llm(self, MockLLMService, fail=()):
+        """Batch results in reverse order (as if the last finished first); indexes in fail error."""
+        from apps.ai.services import CompletionResult
+
+        seen = {}
+
+        async def fake_many(requests, **kwargs):
+            requests = list(requests)
+            seen["requests"], seen["kwargs"] = requests, kwargs
+            for index in reversed(range(len(requests))):
+                if index in fail:
+                    yield CompletionResult(index=index, error=ValueError("boom"))
+                else:
+                    yield CompletionResult(index=index, text=f" Letter {index} ")
+
+        mock_instance = MockLLMService.return_value
+        mock_instance.max_tokens = 1024
+        mock_instance.model = None
+        mock_instance.aiter_complete_many.side_effect = fake_many
+        mock_instance.admit_batch.side_effect = lambda count: count
+        return seen
+
+    async def _post(self, payload):
+        import json
+
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.post(
+            "/api/ai/cover-letter/bulk", payload, content_type="application/json"
+        )
+        if response.status_code != 200:
+            return response, None
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        return response, [json.loads(line) for line in body.splitlines()]
+
+    async def test_bulk_streams_each_letter_and_stores_it(self):
+        """Each item is generated once, streamed as an NDJSON line and stored in AIOutput."""
+        from apps.ai.models import AIOutput, JobDescription
+
+        await JobDescription.objects.acreate(
+            user=self.user, application=self.applications[0], raw_text="Stored posting for company 0."
+        )
+        payload = {
+            "application_ids": [str(a.id) for a in self.applications] + [str(uuid.uuid4())],
+            "job_descriptions": ["Data Engineer at Acme."],
+            "tone": "enthusiastic",
+        }
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            seen = self._mock_llm(MockLLMService, fail={1})
+            response, lines = await self._post(payload)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        MockLLMService.assert_called_once()
+        self.assertEqual(len(seen["requests"]), 4)
+        self.assertEqual(seen["kwargs"]["max_concurrency"], 8)
+        # One profile block, shared by every prompt (one cacheable prefix).
+        profile_blocks = {r.system_prompt[0].text for r in seen["requests"]}
+        self.assertEqual(len(profile_blocks), 1)
+        self.assertIn("Stored posting for company 0.", seen["requests"][0].system_prompt[1].text)
+        self.assertIn("Backend Engineer at Company 1", seen["requests"][1].system_prompt[1].text)
+
+        by_index = {line["index"]: line for line in lines}
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0]["error"], "Application not found.")
+        self.assertEqual(by_index[0]["cover_letter"], "Letter 0")
+        self.assertEqual(by_index[2]["application_id"], str(self.applications[2].id))
+        self.assertEqual(by_index[1]["error"], "Cover letter generation failed.")
+        self.assertEqual(by_index[4]["cover_letter"], "Letter 3")
+        outputs = [o async for o in AIOutput.objects.filter(user=self.user)]
+        self.assertEqual(len(outputs), 3)
+        self.assertTrue(all(o.tone == "enthusiastic" for o in outputs))
+        output = await AIOutput.objects.aget(pk=by_index[2]["output_id"])
+        self.assertEqual(output.application_id, self.applications[2].id)
+
+    async def test_bulk_reuses_stored_letters(self):
+        """Letters already stored are sent without calling the LLM; the rest are generated."""
+        payload = {"job_descriptions": ["Data Engineer at Acme.", "SRE at Initech."]}
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            self._mock_llm(MockLLMService)
+            await self._post({"job_descriptions": ["Data Engineer at Acme."]})
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            seen = self._mock_llm(MockLLMService)
+            _, lines = await self._post(payload)
+        self.assertEqual(len(seen["requests"]), 1)
+        self.assertEqual((lines[0]["index"], lines[0]["reused"]), (0, True))
+        self.assertEqual(lines[0]["cover_letter"], "Letter 0")
+        self.assertEqual((lines[1]["index"], lines[1]["reused"]), (1, False))
+
+    async def test_bulk_validates_payload(self):
+        """Empty requests, blank job descriptions and oversized batches are rejected."""
+        response, _ = await self._post({})
+        self.assertEqual(response.status_code, 400)
+        response, _ = await self._post({"job_descriptions": ["Data Engineer.", "  "]})
+        self.assertEqual(response.status_code, 400)
+        with override_settings(LLM_COVER_LETTER_BULK={"MAX_ITEMS": 2}):
+            response, _ = await self._post({"job_descriptions": ["a", "b", "c"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("At most 2", response.json()["detail"])
+        response = await AsyncClient().post(
+            "/api/ai/cover-letter/bulk", {"job_descriptions": ["a"]}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(LLM_COVER_LETTER_JOBS={"IN_PROCESS": False})
+    async def test_bulk_over_the_plan_budget_queues_the_rest_as_jobs(self):
+        """With the default admission limits a large batch is never refused: the overflow becomes jobs."""
+        import os
+
+        from django.conf import settings
+
+        from apps.ai import admission
+        from apps.ai.models import CoverLetterJob, JobStatus
+
+        admission.controller.reset()
+        burst = settings.LLM_ADMISSION["TIERS"]["free"]["burst"]
+        env = {"LLM_PROVIDER": "fake", "LLM_FAKE_TTFT_MS": "0", "LLM_FAKE_TOKENS_PER_SEC": "0"}
+        with patch.dict(os.environ, env):
+            response, lines = await self._post(
+                {"job_descriptions": [f"Role {i}." for i in range(3 * burst)]}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(lines), 3 * burst)
+            written = [line for line in lines if line["cover_letter"]]
+            queued = [line for line in lines if line["job_id"]]
+            self.assertEqual(len(written), burst)
+            self.assertEqual(len(queued), 2 * burst)
+            self.assertFalse(any(line["error"] for line in lines))
+            self.assertEqual(admission.stats()["admitted"], burst)
+            job = await CoverLetterJob.objects.select_related("job_description").aget(
+                pk=queued[0]["job_id"]
+            )
+            self.assertEqual(job.status, JobStatus.QUEUED)
+            self.assertEqual(job.job_description.raw_text, f"Role {queued[0]['index']}.")
+
+            # The budget is spent: a further request is queued whole rather than refused.
+            response, lines = await self._post({"job_descriptions": ["One more role."]})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(lines[0]["job_id"])
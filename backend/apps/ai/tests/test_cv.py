@@ -0,0 +1,109 @@
+"""Tests for CV parsing and upload."""
+
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+
+from apps.ai.cv_parsing import extract_cv_text, extract_text_from_pdf
+from apps.ai.models import CVDocument
+
+
+class CVParsingTest(TestCase):
+    """Tests for CV text extraction."""
+
+    def test_extract_text_from_pdf_invalid_returns_none(self):
+        """Invalid PDF bytes return None."""
+        self.assertIsNone(extract_text_from_pdf(BytesIO(b"not a pdf")))
+
+    def test_extract_text_from_pdf_valid_blank_returns_empty_or_none(self):
+        """Valid blank PDF returns empty string or None."""
+        from pypdf import PdfWriter
+
+        w = PdfWriter()
+        w.add_blank_page(100, 100)
+        buf = BytesIO()
+        w.write(buf)
+        buf.seek(0)
+        result = extract_text_from_pdf(buf)
+        self.assertTrue(result is None or result.strip() == "")
+
+    def test_extract_cv_text_unsupported_type_returns_none(self):
+        """Unsupported content type returns None."""
+        self.assertIsNone(extract_cv_text("text/plain", BytesIO(b"x")))
+
+
+class CVUploadAPITest(TestCase):
+    """Tests for CV upload endpoint."""
+
+    def setUp(self):
+        self.client = Client()
+        self.User = get_user_model()
+        self.user = self.User.objects.create_user(
+            email="cv@example.com",
+            forwarding_address="cv-fwd@example.com",
+            password="testpass123",
+        )
+
+    def test_cv_upload_unauthorized(self):
+        """POST /api/ai/cv/upload without auth returns 401."""
+        f = SimpleUploadedFile("resume.pdf", b"fake pdf", content_type="application/pdf")
+        response = self.client.post("/api/ai/cv/upload", {"file": f}, format="multipart")
+        self.assertEqual(response.status_code, 401)
+
+    def test_cv_upload_no_file(self):
+        """POST /api/ai/cv/upload with no file returns 400."""
+        self.client.force_login(self.user)
+        response = self.client.post("/api/ai/cv/upload", {}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("detail", response.json())
+
+    def test_cv_upload_invalid_type(self):
+        """POST /api/ai/cv/upload with disallowed type returns 400."""
+        self.client.force_login(self.user)
+        f = SimpleUploadedFile("resume.txt", b"text", content_type="text/plain")
+        response = self.client.post("/api/ai/cv/upload", {"file": f}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertIn("Invalid file type", data.get("detail", ""))
+
+    def test_cv_upload_success(self):
+        """POST /api/ai/cv/upload with PDF creates CVDocument and returns 201."""
+        self.client.force_login(self.user)
+        content = b"%PDF-1.4 fake pdf content"
+        f = SimpleUploadedFile("resume.pdf", content, content_type="application/pdf")
+        response = self.client.post("/api/ai/cv/upload", {"file": f}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data["file_name"], "resume.pdf")
+        self.assertTrue(data["is_primary"])
+        self.assertIn("id", data)
+        self.assertIn("file_url", data)
+        self.assertIn("uploaded_at", data)
+        doc = CVDocument.objects.get(user=self.user)
+        self.assertEqual(doc.file_name, "resume.pdf")
+        self.assertTrue(doc.is_primary)
+
+    def test_cv_upload_parses_valid_pdf(self):
+        """Uploaded valid PDF is parsed; doc is created (parsed_text may be empty for blank PDF)."""
+        from io import BytesIO
+        from pypdf import PdfWriter
+
+        self.client.force_login(self.user)
+        writer = PdfWriter()
+        writer.add_blank_page(width=72, height=72)
+        buf = BytesIO()
+        writer.write(buf)
+        pdf_bytes = buf.getvalue()
+        f = SimpleUploadedFile(
+            "resume.pdf", pdf_bytes, content_type="application/pdf"
+        )
+        response = self.client.post(
+            "/api/ai/cv/upload", {"file": f}, format="multipart"
+        )
+        self.assertEqual(response.status_code, 201)
+        doc = CVDocument.objects.get(user=self.user)
+        self.assertEqual(doc.file_name, "resume.pdf")
+        # Parsing runs; blank PDF may yield None or empty string
+        self.assertTrue(doc.parsed_text is None or isinstance(doc.parsed_text, str))
@@ -0,0 +1,114 @@
+"""Tests for improve-answer."""
+
+from unittest.mock import AsyncMock, patch
+
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+
+
+class ImproveAnswerPromptTest(TestCase):
+    """Tests for improve-answer system prompt."""
+
+    def test_build_improve_answer_system_prompt_includes_star_and_question(self):
+        """Prompt mentions STAR and includes question when provided."""
+        from apps.ai.services import build_improve_answer_system_prompt
+
+        prompt = build_improve_answer_system_prompt("Tell me about a conflict.")
+        self.assertIn("STAR", prompt)
+        self.assertIn("Situation", prompt)
+        self.assertIn("Task", prompt)
+        self.assertIn("Action", prompt)
+        self.assertIn("Result", prompt)
+        self.assertIn("Tell me about a conflict", prompt)
+
+    def test_build_improve_answer_system_prompt_works_without_question(self):
+        """Prompt builds when question is None or empty."""
+        from apps.ai.services import build_improve_answer_system_prompt
+
+        prompt = build_improve_answer_system_prompt(None)
+        self.assertIn("STAR", prompt)
+        prompt2 = build_improve_answer_system_prompt("")
+        self.assertIn("STAR", prompt2)
+
+
+class ImproveAnswerAPITest(TestCase):
+    """Tests for improve-answer endpoint."""
+
+    def setUp(self):
+        self.client = Client()
+        self.User = get_user_model()
+        self.user = self.User.objects.create_user(
+            email="qa@example.com",
+            forwarding_address="qa-fwd@example.com",
+            password="testpass123",
+        )
+
+    def test_improve_answer_unauthorized(self):
+        """POST /api/ai/improve-answer without auth returns 401."""
+        response = self.client.post(
+            "/api/ai/improve-answer",
+            {"draft_answer": "I fixed the bug."},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_improve_answer_no_draft(self):
+        """POST with empty draft_answer returns 400."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            "/api/ai/improve-answer",
+            {"draft_answer": ""},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("detail", response.json())
+
+    def test_improve_answer_returns_improved_with_mocked_llm(self):
+        """POST with draft returns 200 and improved_answer (mocked LLM)."""
+        self.client.force_login(self.user)
+        with patch("apps.ai.api.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            mock_instance = MockLLMService.return_value
+            mock_instance.max_tokens = 1024
+            mock_instance.acomplete = AsyncMock(return_value="STAR-formatted improved text.")
+            response = self.client.post(
+                "/api/ai/improve-answer",
+                {"draft_answer": "I fixed a bug by testing.", "question": "Tell me about a bug you fixed."},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIn("improved_answer", data)
+        self.assertEqual(data["improved_answer"], "STAR-formatted improved text.")
+
+    def test_improve_answer_saves_to_user_answer_when_id_given(self):
+        """When user_answer_id is provided and valid, result is saved to UserAnswer."""
+        from apps.ai.models import InterviewQuestion, UserAnswer
+
+        self.client.force_login(self.user)
+        q = InterviewQuestion.objects.create(
+            category="Behavioural",
+            question_type="behavioural",
+            question="Tell me about a challenge.",
+        )
+        ua = UserAnswer.objects.create(
+            user=self.user,
+            question=q,
+            draft_answer="We had a tight deadline.",
+        )
+        with patch("apps.ai.api.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            mock_instance = MockLLMService.return_value
+            mock_instance.max_tokens = 1024
+            mock_instance.acomplete = AsyncMock(
+                return_value="Situation: ... Task: ... Action: ... Result: ..."
+            )
+            response = self.client.post(
+                "/api/ai/improve-answer",
+                {"draft_answer": "We had a tight deadline.", "user_answer_id": str(ua.id)},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        ua.refresh_from_db()
+        self.assertEqual(ua.ai_improved_answer, "Situation: ... Task: ... Action: ... Result: ...")
+        self.assertTrue(ua.is_ai_generated)
@@ -0,0 +1,94 @@
+"""Tests for interview questions and answers API."""
+
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+
+
+class InterviewQAAPITest(TestCase):
+    """Tests for interview questions and user answers endpoints."""
+
+    def setUp(self):
+        self.client = Client()
+        self.User = get_user_model()
+        self.user = self.User.objects.create_user(
+            email="qa2@example.com",
+            forwarding_address="qa2-fwd@example.com",
+            password="testpass123",
+        )
+
+    def test_list_interview_questions_unauthorized(self):
+        """GET /api/ai/interview-questions without auth returns 401."""
+        response = self.client.get("/api/ai/interview-questions")
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_interview_questions_empty(self):
+        """GET /api/ai/interview-questions returns 200 and list (may be empty)."""
+        self.client.force_login(self.user)
+        response = self.client.get("/api/ai/interview-questions")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+    def test_list_interview_questions_with_data(self):
+        """GET returns questions when present."""
+        from apps.ai.models import InterviewQuestion
+
+        InterviewQuestion.objects.create(
+            category="Behavioural",
+            question_type="behavioural",
+            question="Tell me about a challenge.",
+        )
+        self.client.force_login(self.user)
+        response = self.client.get("/api/ai/interview-questions")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]["question"], "Tell me about a challenge.")
+        self.assertEqual(data[0]["category"], "Behavioural")
+
+    def test_create_user_answer_unauthorized(self):
+        """POST /api/ai/user-answers without auth returns 401."""
+        response = self.client.post(
+            "/api/ai/user-answers",
+            {"custom_question": "Why us?", "draft_answer": "Because."},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_create_user_answer_requires_question_or_custom(self):
+        """POST without question_id or custom_question returns 400."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            "/api/ai/user-answers",
+            {},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_user_answer_with_custom_question(self):
+        """POST with custom_question creates user answer and returns 201."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            "/api/ai/user-answers",
+            {"custom_question": "Why us?", "draft_answer": "I want to grow here."},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertIn("id", data)
+        self.assertEqual(data["custom_question"], "Why us?")
+        self.assertEqual(data["draft_answer"], "I want to grow here.")
+        from apps.ai.models import UserAnswer
+
+        self.assertEqual(UserAnswer.objects.filter(user=self.user).count(), 1)
+
+    def test_list_user_answers_unauthorized(self):
+        """GET /api/ai/user-answers without auth returns 401."""
+        response = self.client.get("/api/ai/user-answers")
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_user_answers_returns_mine(self):
+        """GET returns current user's answers."""
+        self.client.force_login(self.user)
+        response = self.client.get("/api/ai/user-answers")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
@@ -0,0 +1,251 @@
+"""Tests for cover-letter jobs."""
+
+import time
+import uuid
+from unittest.mock import patch
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+
+
+@override_settings(LLM_COVER_LETTER_JOBS={"IN_PROCESS": False, "POLL_SECONDS": 0})
+class CoverLetterJobTest(TestCase):
+    """Tests for queued cover-letter jobs."""
+
+    def setUp(self):
+        from apps.ai import jobs
+
+        jobs.reset()
+        self.client = Client()
+        self.user = get_user_model().objects.create_user(
+            email="jobs@example.com",
+            forwarding_address="jobs-fwd@example.com",
+            password="testpass123",
+        )
+        self.client.force_login(self.user)
+
+    def _enqueue(self, jd="Platform Engineer at Acme."):
+        response = self.client.post(
+            "/api/ai/cover-letter/jobs",
+            {"job_description": jd, "tone": "enthusiastic"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def _mock_llm(self, MockLLMService, chunks=("Dear ", "Hiring Manager,")):
+        mock_instance = MockLLMService.return_value
+        mock_instance.max_tokens = 1024
+        mock_instance.model = None
+        mock_instance.try_admit.return_value = 0.0
+        mock_instance.stream_complete.side_effect = lambda *args, **kwargs: iter(chunks)
+        return mock_instance
+
+    def test_enqueue_returns_at_once(self):
+        """POST returns a queued job without calling the LLM."""
+        from apps.ai.models import CoverLetterJob
+
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            job = self._enqueue()
+        MockLLMService.assert_not_called()
+        self.assertEqual(job["status"], "queued")
+        self.assertIsNone(job["cover_letter"])
+        stored = CoverLetterJob.objects.get(pk=job["id"])
+        self.assertEqual(stored.tone, "enthusiastic")
+        self.assertEqual(stored.job_description.raw_text, "Platform Engineer at Acme.")
+        response = self.client.post(
+            "/api/ai/cover-letter/jobs", {"job_description": " "}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_worker_runs_job_and_stores_output(self):
+        """A worker generates the letter, stores it in AIOutput and polling returns it."""
+        from apps.ai import jobs
+        from apps.ai.models import AIOutput
+
+        job = self._enqueue()
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            mock_instance = self._mock_llm(MockLLMService)
+            self.assertEqual(jobs.run_next(), 0.0)
+            self.assertIsNone(jobs.run_next())
+            self.assertFalse(jobs.run(job["id"]))
+        mock_instance.try_admit.assert_called_once()
+        data = self.client.get(f"/api/ai/cover-letter/jobs/{job['id']}").json()
+        self.assertEqual(data["status"], "succeeded")
+        self.assertEqual(data["cover_letter"], "Dear Hiring Manager,")
+        self.assertEqual(data["progress_chars"], len("Dear Hiring Manager,"))
+        output = AIOutput.objects.get(pk=data["output_id"])
+        self.assertEqual(output.job_description.raw_text, "Platform Engineer at Acme.")
+        self.assertEqual(jobs.stats()["succeeded"], 1)
+
+    def test_failed_job_reports_error(self):
+        """Provider failures mark the job failed with a user-facing message."""
+        from apps.ai import jobs
+        from providers.llm.resilience import CircuitOpenError
+
+        job = self._enqueue()
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            mock_instance = self._mock_llm(MockLLMService)
+            mock_instance.stream_complete.side_effect = CircuitOpenError("openai", 10)
+            self.assertTrue(jobs.run(job["id"]))
+        data = self.client.get(f"/api/ai/cover-letter/jobs/{job['id']}").json()
+        self.assertEqual(data["status"], "failed")
+        self.assertIn("temporarily unavailable", data["error"])
+
+    def test_jobs_are_private(self):
+        """Another user's job is forbidden; unknown ids are 404."""
+        job = self._enqueue()
+        other = get_user_model().objects.create_user(
+            email="other-jobs@example.com", forwarding_address="other-jobs-fwd@example.com", password="x"
+        )
+        client = Client()
+        client.force_login(other)
+        self.assertEqual(client.get(f"/api/ai/cover-letter/jobs/{job['id']}").status_code, 403)
+        self.assertEqual(client.get(f"/api/ai/cover-letter/jobs/{uuid.uuid4()}").status_code, 404)
+
+    def test_stale_jobs_are_requeued(self):
+        """Jobs whose heartbeat is older than STALE_SECONDS go back to the queue."""
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from apps.ai import jobs
+        from apps.ai.models import CoverLetterJob
+
+        job = self._enqueue()
+        long_ago = timezone.now() - timedelta(hours=1)
+        CoverLetterJob.objects.filter(pk=job["id"]).update(
+            status="running", started_at=long_ago, heartbeat_at=timezone.now()
+        )
+        self.assertEqual(jobs.requeue_stale(), 0)
+        CoverLetterJob.objects.filter(pk=job["id"]).update(heartbeat_at=long_ago)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(CoverLetterJob.objects.get(pk=job["id"]).status, "queued")
+
+    def test_requeued_job_is_not_finished_by_its_old_worker(self):
+        """A worker whose job was requeued mid-run neither marks it done nor stores a letter."""
+        from apps.ai import jobs
+        from apps.ai.models import AIOutput, CoverLetterJob
+
+        job = self._enqueue()
+
+        def requeued_mid_stream(*args, **kwargs):
+            yield "Dear "
+            CoverLetterJob.objects.filter(pk=job["id"]).update(status="queued", started_at=None)
+            yield "Hiring Manager,"
+
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            self._mock_llm(MockLLMService).stream_complete.side_effect = requeued_mid_stream
+            self.assertTrue(jobs.run(job["id"]))
+        self.assertEqual(CoverLetterJob.objects.get(pk=job["id"]).status, "queued")
+        self.assertFalse(AIOutput.objects.filter(user=self.user).exists())
+
+    def test_rate_limited_job_is_deferred_not_failed(self):
+        """A job the user's admission budget cannot take yet goes back to the queue for later."""
+        import os
+
+        from apps.ai import jobs
+        from apps.ai.admission import controller
+        from apps.ai.models import CoverLetterJob
+
+        controller.reset()
+        config = {
+            "ENABLED": True,
+            "MAX_WAIT_SECONDS": 10,
+            "MAX_QUEUE": 10,
+            "TIERS": {"free": {"rate_per_minute": 1, "burst": 1}},
+            "PROVIDER": {"rate_per_minute": 600, "burst": 60},
+        }
+        env = {"LLM_PROVIDER": "fake", "LLM_FAKE_TTFT_MS": "0", "LLM_FAKE_TOKENS_PER_SEC": "0"}
+        first, second = self._enqueue("Job one."), self._enqueue("Job two.")
+        with override_settings(LLM_ADMISSION=config), patch.dict(os.environ, env):
+            start = time.monotonic()
+            self.assertTrue(jobs.run(first["id"]))
+            self.assertTrue(jobs.run(second["id"]))
+            self.assertLess(time.monotonic() - start, 5)
+            self.assertIsNone(jobs.run_next())
+        controller.reset()
+        self.assertEqual(CoverLetterJob.objects.get(pk=first["id"]).status, "succeeded")
+        deferred = CoverLetterJob.objects.get(pk=second["id"])
+        self.assertEqual((deferred.status, deferred.error), ("queued", None))
+        self.assertIsNotNone(deferred.not_before)
+        self.assertEqual(jobs.stats()["deferred"], 1)
+
+    def test_sweep_resubmits_queued_jobs(self):
+        """sweep() hands due queued jobs (e.g. left by a restart) to the pool once each."""
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from apps.ai import jobs
+        from apps.ai.models import CoverLetterJob
+
+        due, later = self._enqueue("Job one."), self._enqueue("Job two.")
+        CoverLetterJob.objects.filter(pk=later["id"]).update(not_before=timezone.now() + timedelta(minutes=1))
+        try:
+            with patch("apps.ai.jobs._pool") as pool:
+                self.assertEqual(jobs.sweep(), 1)
+                self.assertEqual(jobs.sweep(), 0)
+            pool.return_value.submit.assert_called_once_with(jobs._run_in_thread, uuid.UUID(due["id"]))
+        finally:
+            jobs._pending.clear()
+
+    def test_enqueue_reuses_stored_letter(self):
+        """A job for a letter already stored succeeds at once; regenerate queues a new one."""
+        from apps.ai import jobs
+
+        first = self._enqueue()
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            self._mock_llm(MockLLMService)
+            jobs.run(first["id"])
+        first = self.client.get(f"/api/ai/cover-letter/jobs/{first['id']}").json()
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            second = self._enqueue()
+            MockLLMService.assert_not_called()
+        self.assertEqual(second["status"], "succeeded")
+        self.assertEqual(second["output_id"], first["output_id"])
+        self.assertEqual(second["cover_letter"], "Dear Hiring Manager,")
+        response = self.client.post(
+            "/api/ai/cover-letter/jobs",
+            {"job_description": "Platform Engineer at Acme.", "tone": "enthusiastic", "regenerate": True},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json()["status"], "queued")
+
+    def test_management_command_drains_queue(self):
+        """run_cover_letter_worker --once runs every queued job."""
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from apps.ai.models import CoverLetterJob
+
+        self._enqueue("Job one.")
+        self._enqueue("Job two.")
+        out = StringIO()
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            self._mock_llm(MockLLMService)
+            call_command("run_cover_letter_worker", "--once", stdout=out)
+        self.assertIn("Ran 2 cover letter job(s), put back 0", out.getvalue())
+        self.assertEqual(CoverLetterJob.objects.filter(status="succeeded").count(), 2)
+
+    def test_events_stream_until_finished(self):
+        """The SSE feed sends the job's state and ends once it has finished."""
+        from asgiref.sync import async_to_sync
+
+        from apps.ai import jobs
+
+        job = self._enqueue()
+        with patch("apps.ai.cover_letters.LLMService") as MockLLMService:
+            self._mock_llm(MockLLMService)
+            jobs.run(job["id"])
+        response = self.client.get(f"/api/ai/cover-letter/jobs/{job['id']}/events")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        async def drain(stream):
+            return b"".join([chunk async for chunk in stream])
+
+        body = async_to_sync(drain)(response.streaming_content)
+        self.assertIn(b"event: status", body)
+        self.assertIn(b'"status":"succeeded"', body)
+        self.assertTrue(body.endswith(b"event: end\ndata: \n\n"))
@@ -0,0 +1,270 @@
+"""Tests for LLMService."""
+
+import time
+from unittest.mock import patch
+
+from django.test import TestCase
+
+
+class LLMServiceTest(TestCase):
+    """Tests for LLM integration service."""
+
+    def test_llm_service_complete_returns_provider_response(self):
+        """LLMService.complete delegates to provider and returns reply text."""
+        from apps.ai.services import LLMService
+        from providers.llm.base import LLMProvider
+
+        class MockProvider(LLMProvider):
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                return "Mocked reply"
+
+        service = LLMService(llm=MockProvider())
+        out = service.complete([{"role": "user", "content": "Hi"}])
+        self.assertEqual(out, "Mocked reply")
+
+    def test_llm_service_acomplete_falls_back_to_sync_provider(self):
+        """Providers without a native async SDK still serve acomplete/astream_complete."""
+        import asyncio
+
+        from apps.ai.services import LLMService
+        from providers.llm.base import LLMProvider
+
+        class MockProvider(LLMProvider):
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                return "Mocked reply"
+
+        service = LLMService(llm=MockProvider())
+
+        async def run():
+            text = await service.acomplete([{"role": "user", "content": "Hi"}])
+            chunks = [c async for c in service.astream_complete([{"role": "user", "content": "Hi"}])]
+            return text, chunks
+
+        text, chunks = asyncio.run(run())
+        self.assertEqual(text, "Mocked reply")
+        self.assertEqual(chunks, ["Mocked reply"])
+
+    def test_async_clients_are_pooled_per_event_loop(self):
+        """Async SDK clients are reused within a loop and not shared across loops."""
+        import asyncio
+
+        from providers.llm.openai_provider import OpenAIProvider
+
+        provider = OpenAIProvider(api_key="sk-test-async")
+
+        async def pair():
+            return provider._async_client(), provider._async_client()
+
+        a1, a2 = asyncio.run(pair())
+        b1, _ = asyncio.run(pair())
+        self.assertIs(a1, a2)
+        self.assertIsNot(a1, b1)
+
+    def test_get_llm_returns_openai_provider_by_default(self):
+        """get_llm() with no provider returns OpenAI provider."""
+        from providers.llm.factory import get_llm
+        from providers.llm.openai_provider import OpenAIProvider
+
+        llm = get_llm()
+        self.assertIsInstance(llm, OpenAIProvider)
+
+    def test_get_llm_returns_anthropic_when_requested(self):
+        """get_llm(provider='anthropic') returns Anthropic provider."""
+        from providers.llm.factory import get_llm
+        from providers.llm.anthropic_provider import AnthropicProvider
+
+        llm = get_llm(provider="anthropic")
+        self.assertIsInstance(llm, AnthropicProvider)
+
+
+    def test_anthropic_marks_cacheable_system_blocks(self):
+        """Blocks marked cache=True get cache_control; plain strings pass through."""
+        from providers.llm.anthropic_provider import AnthropicProvider
+        from providers.llm.base import SystemBlock
+
+        param = AnthropicProvider._system_param(
+            [SystemBlock("Profile", cache=True), SystemBlock("Per-turn")]
+        )
+        self.assertEqual(param[0]["cache_control"], {"type": "ephemeral"})
+        self.assertNotIn("cache_control", param[1])
+        self.assertEqual(AnthropicProvider._system_param("Plain"), "Plain")
+        self.assertEqual(AnthropicProvider._system_param(None), "")
+
+    def test_openai_flattens_system_blocks_in_order(self):
+        """OpenAI receives blocks as one system message, stable prefix first."""
+        from providers.llm.base import SystemBlock
+        from providers.llm.openai_provider import OpenAIProvider
+
+        messages = OpenAIProvider._build_messages(
+            [{"role": "user", "content": "Hi"}],
+            [SystemBlock("Profile", cache=True), SystemBlock("Per-turn")],
+        )
+        self.assertEqual(messages[0], {"role": "system", "content": "Profile\n\nPer-turn"})
+
+    def test_service_reports_prompt_cache_usage(self):
+        """last_usage carries the cache read/write tokens the provider reported."""
+        from types import SimpleNamespace
+        from unittest.mock import MagicMock
+
+        from apps.ai.services import LLMService, build_chat_system_prompt
+        from providers.llm.anthropic_provider import AnthropicProvider
+
+        client = MagicMock()
+        client.messages.create.return_value = SimpleNamespace(
+            content=[SimpleNamespace(type="text", text="Hello")],
+            usage=SimpleNamespace(
+                input_tokens=12,
+                output_tokens=3,
+                cache_read_input_tokens=1800,
+                cache_creation_input_tokens=0,
+            ),
+        )
+        provider = AnthropicProvider(api_key="sk-ant-test")
+        service = LLMService(llm=provider)
+        with patch.object(AnthropicProvider, "_client", return_value=client):
+            text = service.complete(
+                [{"role": "user", "content": "Hi"}],
+                system_prompt=build_chat_system_prompt("Name: Jane Doe"),
+            )
+        self.assertEqual(text, "Hello")
+        system = client.messages.create.call_args.kwargs["system"]
+        self.assertEqual(system[0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(service.last_usage.cache_read_tokens, 1800)
+        self.assertEqual(service.last_usage.input_tokens, 12)
+
+    def test_stream_usage_is_collected_when_stream_finishes(self):
+        """Usage recorded by a streaming provider lands in last_usage."""
+        from apps.ai.services import LLMService
+        from providers.llm import usage
+        from providers.llm.base import LLMProvider
+
+        class Streaming(LLMProvider):
+            model = "streaming-test"
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                return ""
+
+            def stream_complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                yield "a"
+                usage.record(self.model, input_tokens=5, cache_write_tokens=400)
+
+        service = LLMService(llm=Streaming())
+        self.assertEqual(list(service.stream_complete([{"role": "user", "content": "Hi"}])), ["a"])
+        self.assertEqual(service.last_usage.cache_write_tokens, 400)
+        self.assertEqual(usage.totals()["streaming-test"]["input_tokens"], 5)
+
+    def test_cover_letter_blocks_keep_job_description_out_of_cached_prefix(self):
+        """The cached block holds the profile; JD and tone follow uncached."""
+        from apps.ai.services import build_cover_letter_system_blocks
+
+        blocks = build_cover_letter_system_blocks("Name: Jane Doe", "Python developer", tone="formal")
+        self.assertTrue(blocks[0].cache)
+        self.assertIn("Jane Doe", blocks[0].text)
+        self.assertNotIn("Python developer", blocks[0].text)
+        self.assertFalse(blocks[1].cache)
+        self.assertIn("Python developer", blocks[1].text)
+
+
+class LLMBatchTest(TestCase):
+    """Tests for LLMService.complete_many and its async / streaming variants."""
+
+    def _provider(self):
+        import asyncio
+        import threading
+
+        from providers.llm.base import LLMProvider
+
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def reply(content):
+            if content == "boom":
+                raise ValueError("bad prompt")
+            return content.upper()
+
+        class Counting(LLMProvider):
+            model = "batch-test"
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                content = messages[-1]["content"]
+                with lock:
+                    state["active"] += 1
+                    state["peak"] = max(state["peak"], state["active"])
+                try:
+                    time.sleep(0.5 if content.startswith("slow") else 0.02)
+                    return reply(content)
+                finally:
+                    with lock:
+                        state["active"] -= 1
+
+            async def acomplete(self, messages, *, system_prompt=None, max_tokens=2048):
+                content = messages[-1]["content"]
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+                try:
+                    await asyncio.sleep(0.5 if content.startswith("slow") else 0.02)
+                    return reply(content)
+                finally:
+                    state["active"] -= 1
+
+        return Counting(), state
+
+    def _requests(self, *contents):
+        from apps.ai.services import CompletionRequest
+
+        return [CompletionRequest(messages=[{"role": "user", "content": c}]) for c in contents]
+
+    def test_complete_many_keeps_order_and_bounds_concurrency(self):
+        """Results come back in request order with at most max_concurrency in flight."""
+        from apps.ai.services import LLMService
+
+        provider, state = self._provider()
+        service = LLMService(llm=provider)
+        contents = [f"item {i}" for i in range(8)]
+        results = service.complete_many(self._requests(*contents), max_concurrency=3)
+        self.assertEqual([r.text for r in results], [c.upper() for c in contents])
+        self.assertTrue(all(r.ok for r in results))
+        self.assertLessEqual(state["peak"], 3)
+
+    def test_complete_many_reports_errors_and_timeouts_per_item(self):
+        """A failing or slow request does not sink the rest of the batch."""
+        from apps.ai.services import LLMService
+
+        provider, _ = self._provider()
+        service = LLMService(llm=provider)
+        results = service.complete_many(
+            self._requests("a", "boom", "slow", "b"), max_concurrency=4, timeout=0.2
+        )
+        self.assertEqual(results[0].text, "A")
+        self.assertIsInstance(results[1].error, ValueError)
+        self.assertIsInstance(results[2].error, TimeoutError)
+        self.assertEqual(results[3].text, "B")
+
+    def test_iter_complete_many_yields_as_completed(self):
+        """Fast results are yielded before a slow one that was submitted first."""
+        from apps.ai.services import LLMService
+
+        provider, _ = self._provider()
+        service = LLMService(llm=provider)
+        order = [r.index for r in service.iter_complete_many(self._requests("slow", "a", "b"))]
+        self.assertEqual(order[-1], 0)
+        self.assertEqual(sorted(order), [0, 1, 2])
+
+    def test_acomplete_many_orders_bounds_and_cancels_on_timeout(self):
+        """Async batches keep order, respect the bound and time out slow items."""
+        import asyncio
+
+        from apps.ai.services import LLMService
+
+        provider, state = self._provider()
+        service = LLMService(llm=provider)
+        # Distinct prompt so it cannot join a sync test's in-flight call.
+        contents = [f"item {i}" for i in range(6)] + ["boom", "slow async"]
+        results = asyncio.run(
+            service.acomplete_many(self._requests(*contents), max_concurrency=2, timeout=0.2)
+        )
+        self.assertEqual([r.text for r in results[:6]], [c.upper() for c in contents[:6]])
+        self.assertIsInstance(results[6].error, ValueError)
+        self.assertIsInstance(results[7].error, TimeoutError)
+        self.assertLessEqual(state["peak"], 2)
+        self.assertEqual(state["active"], 0)
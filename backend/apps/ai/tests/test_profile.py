@@ -0,0 +1,266 @@
+"""Tests for the profile context cache and profile API."""
+
+import json
+from unittest.mock import patch
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+
+from apps.ai.models import CVDocument
+
+
+class ProfileContextCacheTest(TestCase):
+    """Tests for the versioned profile context cache."""
+
+    def setUp(self):
+        from apps.ai import profile_cache
+
+        profile_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="cached@example.com",
+            forwarding_address="cached-fwd@example.com",
+            password="testpass123",
+            full_name="Casey Cache",
+        )
+
+    def _fresh_user(self):
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_unchanged_profile_is_served_without_queries(self):
+        """Repeat lookups for the same version and budget read no profile tables."""
+        from apps.ai import profile_cache
+        from apps.ai.services import build_context
+
+        first = profile_cache.get_context(self.user, max_tokens=1000)
+        self.assertEqual(first, build_context(self.user, max_tokens=1000))
+        with self.assertNumQueries(0):
+            self.assertEqual(profile_cache.get_context(self.user, max_tokens=1000), first)
+            profile_cache.get_context(self.user, max_tokens=200)
+        self.assertEqual(profile_cache.stats()["hits"], 2)
+
+    def test_profile_rows_bump_version(self):
+        """Saving or deleting a profile row changes the version and the context."""
+        from datetime import date
+
+        from apps.ai import profile_cache
+        from apps.ai.models import WorkExperience
+
+        before = profile_cache.get_context(self.user)
+        work = WorkExperience.objects.create(
+            user=self.user, company="Acme", role="Engineer", start_date=date(2020, 1, 1)
+        )
+        user = self._fresh_user()
+        self.assertEqual(user.profile_version, 1)
+        self.assertIn("Engineer at Acme", profile_cache.get_context(user))
+        work.delete()
+        user = self._fresh_user()
+        self.assertEqual(user.profile_version, 2)
+        self.assertEqual(profile_cache.get_context(user), before)
+
+    def test_only_profile_fields_bump_user_version(self):
+        """Saving unrelated user fields keeps the cached context; profile fields do not."""
+        self.user.credits_balance = 5
+        self.user.save(update_fields=["credits_balance"])
+        self.assertEqual(self._fresh_user().profile_version, 0)
+        self.user.full_name = "Casey Renamed"
+        self.user.save()
+        self.assertEqual(self.user.profile_version, 1)
+        self.assertEqual(self._fresh_user().profile_version, 1)
+
+    def test_stale_user_save_keeps_profile_version(self):
+        """A full save of a stale instance neither rewinds the version nor misses its own edit."""
+        from datetime import date
+
+        from apps.ai import profile_cache
+        from apps.ai.models import WorkExperience
+
+        stale = self._fresh_user()
+        WorkExperience.objects.create(
+            user=self.user, company="Acme", role="Engineer", start_date=date(2020, 1, 1)
+        )
+        self.assertIn("Engineer at Acme", profile_cache.get_context(self._fresh_user()))
+        stale.full_name = "Casey Renamed"
+        stale.save()
+        user = self._fresh_user()
+        self.assertEqual(user.profile_version, 2)
+        self.assertIn("Casey Renamed", profile_cache.get_context(user))
+
+    def test_unchanged_user_save_does_not_bump(self):
+        """Saves that leave the profile fields alone (last_login, an unchanged PATCH) do not bump."""
+        from django.contrib.auth.models import update_last_login
+
+        user = self._fresh_user()
+        with self.assertNumQueries(1):
+            update_last_login(None, user)
+        client = Client()
+        client.force_login(user)
+        response = client.patch(
+            "/api/users/me", {"full_name": user.full_name}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._fresh_user().profile_version, 0)
+        client.patch("/api/users/me", {"target_role": "Data Engineer"}, content_type="application/json")
+        self.assertEqual(self._fresh_user().profile_version, 1)
+
+    def test_load_profile_query_count_is_fixed(self):
+        """One query per section however many rows; soft-deleted rows are skipped."""
+        from datetime import date
+
+        from django.utils import timezone
+
+        from apps.ai.models import Education, Project, WorkExperience
+        from apps.ai.services import CV_MAX_CHARS, ProfileSnapshot, load_profile
+
+        for i in range(25):
+            WorkExperience.objects.create(
+                user=self.user, company=f"Co {i}", role="Engineer", start_date=date(2020, 1, 1)
+            )
+            Project.objects.create(user=self.user, title=f"Project {i}", description="Built it")
+            Education.objects.create(
+                user=self.user, institution=f"Uni {i}", degree="BSc", start_date=date(2010, 1, 1)
+            )
+        Project.objects.create(
+            user=self.user, title="Gone", description="Deleted", deleted_at=timezone.now()
+        )
+        CVDocument.objects.create(
+            user=self.user, file_name="cv.pdf", file_url="cv.pdf",
+            parsed_text="x" * (CV_MAX_CHARS + 5000), is_primary=True,
+        )
+        user = self._fresh_user()
+        with self.assertNumQueries(4):
+            profile = load_profile(user)
+        with self.assertNumQueries(5):
+            load_profile(user.pk)
+        self.assertIsInstance(profile, ProfileSnapshot)
+        self.assertEqual(len(profile.sections["experience"]), 20)
+        self.assertNotIn("Project: Gone. Deleted", profile.sections["projects"])
+        self.assertEqual(len(profile.cv_text), CV_MAX_CHARS)
+        with self.assertRaises(TypeError):
+            profile.sections["projects"] = ()
+
+    def test_chat_turn_skips_profile_tables(self):
+        """Once cached, chat turns run a fixed set of queries and none on profile tables."""
+        import os
+
+        from asgiref.sync import async_to_sync
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from apps.ai.models import ChatSession
+
+        session = ChatSession.objects.create(user=self.user, title="Cached")
+        client = Client()
+        client.force_login(self.user)
+        env = {"LLM_PROVIDER": "fake", "LLM_FAKE_TTFT_MS": "0", "LLM_FAKE_TOKENS_PER_SEC": "0"}
+
+        async def drain(stream):
+            return [chunk async for chunk in stream]
+
+        def turn(content):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post(
+                    f"/api/ai/chat/sessions/{session.id}/messages",
+                    {"content": content},
+                    content_type="application/json",
+                )
+                async_to_sync(drain)(response.streaming_content)
+            # The test client's own session lookup is not part of the view.
+            return [q["sql"] for q in queries.captured_queries if "django_session" not in q["sql"]]
+
+        with patch.dict(os.environ, env):
+            first = turn("First question")
+            second = turn("Second question")
+            third = turn("Third question")
+        profile_tables = ("work_experiences", "projects", "education", "cv_documents")
+        self.assertTrue(any(t in sql for sql in first for t in profile_tables))
+        self.assertFalse(any(t in sql for sql in second + third for t in profile_tables))
+        # History is read in one query however long the session grows.
+        self.assertEqual(len(second), len(third))
+
+    def test_cache_is_size_bounded(self):
+        """Old entries are evicted beyond PROFILE_CONTEXT_CACHE_SIZE."""
+        from apps.ai import profile_cache
+
+        with override_settings(PROFILE_CONTEXT_CACHE_SIZE=1):
+            profile_cache.get_context(self.user)
+            self.user.target_role = "Staff Engineer"
+            self.user.save()
+            profile_cache.get_context(self.user)
+        self.assertEqual(profile_cache.stats()["size"], 1)
+
+
+class ProfileWorkExperienceAPITest(TestCase):
+    """Tests for profile work experience API (AI-02)."""
+
+    def setUp(self):
+        self.client = Client()
+        self.User = get_user_model()
+        self.user = self.User.objects.create_user(
+            email="we@example.com",
+            forwarding_address="we-fwd@example.com",
+            password="testpass123",
+        )
+
+    def test_list_work_experience_unauthorized(self):
+        response = self.client.get("/api/ai/profile/work-experience")
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_and_create_work_experience(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/api/ai/profile/work-experience")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+        create = self.client.post(
+            "/api/ai/profile/work-experience",
+            data=json.dumps({
+                "company": "Acme",
+                "role": "Engineer",
+                "start_date": "2024-01-01",
+                "is_current": True,
+            }),
+            content_type="application/json",
+        )
+        self.assertEqual(create.status_code, 201)
+        data = create.json()
+        self.assertEqual(data["company"], "Acme")
+        self.assertEqual(data["role"], "Engineer")
+        list_resp = self.client.get("/api/ai/profile/work-experience")
+        self.assertEqual(list_resp.status_code, 200)
+        self.assertEqual(len(list_resp.json()), 1)
+
+
+class ProfileProjectsAPITest(TestCase):
+    """Tests for profile projects API (AI-02)."""
+
+    def setUp(self):
+        self.client = Client()
+        self.User = get_user_model()
+        self.user = self.User.objects.create_user(
+            email="proj@example.com",
+            forwarding_address="proj-fwd@example.com",
+            password="testpass123",
+        )
+
+    def test_list_projects_unauthorized(self):
+        response = self.client.get("/api/ai/profile/projects")
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_and_create_project(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/api/ai/profile/projects")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+        create = self.client.post(
+            "/api/ai/profile/projects",
+            data=json.dumps({
+                "title": "My App",
+                "description": "A web app",
+            }),
+            content_type="application/json",
+        )
+        self.assertEqual(create.status_code, 201)
+        data = create.json()
+        self.assertEqual(data["title"], "My App")
+        list_resp = self.client.get("/api/ai/profile/projects")
+        self.assertEqual(list_resp.status_code, 200)
+        self.assertEqual(len(list_resp.json()), 1)
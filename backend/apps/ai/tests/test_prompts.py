@@ -0,0 +1,110 @@
+"""Tests for prompt building and token budgets."""
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from apps.ai.models import CVDocument
+
+
+class CoverLetterPromptTest(TestCase):
+    """Tests for cover letter system prompt."""
+
+    def test_build_cover_letter_system_prompt_includes_profile_and_jd(self):
+        """Prompt contains profile context and job description."""
+        from apps.ai.services import build_cover_letter_system_prompt
+
+        profile = "Name: Jane Doe\nTarget role: Software Engineer"
+        jd = "We are looking for a Python developer with 3+ years experience."
+        prompt = build_cover_letter_system_prompt(profile, jd)
+        self.assertIn("Jane Doe", prompt)
+        self.assertIn("Software Engineer", prompt)
+        self.assertIn("Python developer", prompt)
+        self.assertIn("CANDIDATE PROFILE", prompt)
+        self.assertIn("JOB DESCRIPTION", prompt)
+
+    def test_build_cover_letter_system_prompt_tone_formal(self):
+        """Formal tone instruction is included."""
+        from apps.ai.services import build_cover_letter_system_prompt
+
+        prompt = build_cover_letter_system_prompt("Profile", "JD", tone="formal")
+        self.assertIn("formal", prompt.lower())
+        self.assertIn("professional", prompt.lower())
+
+    def test_build_cover_letter_system_prompt_tone_enthusiastic(self):
+        """Enthusiastic tone instruction is included."""
+        from apps.ai.services import build_cover_letter_system_prompt
+
+        prompt = build_cover_letter_system_prompt("Profile", "JD", tone="enthusiastic")
+        self.assertIn("enthusiastic", prompt.lower())
+
+
+class TokenBudgetTest(TestCase):
+    """Tests for token counting and prompt budgeting."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="budget@example.com",
+            forwarding_address="budget-fwd@example.com",
+            password="testpass123",
+            full_name="Jane Doe",
+        )
+
+    def test_count_tokens_and_context_windows(self):
+        """Approximate counts (~4 characters per token); windows by longest model prefix."""
+        from providers.llm.tokens import context_window, count_tokens
+
+        self.assertEqual(count_tokens("", "claude-3-5-haiku-20241022"), 0)
+        self.assertEqual(count_tokens("a" * 40, "claude-3-5-haiku-20241022"), 10)
+        self.assertEqual(context_window("gpt-4o-mini"), 128_000)
+        self.assertEqual(context_window("gpt-4-0613"), 8_192)
+        self.assertEqual(context_window("openai/gpt-4,anthropic/claude-3-5-haiku"), 8_192)
+        self.assertGreater(context_window(None), 0)
+
+    def test_allocate_hands_unused_share_to_later_sections(self):
+        """Sections needing less than their share free room for others, by priority."""
+        from providers.llm.tokens import allocate
+
+        grants = allocate(
+            {"a": 10, "b": 500, "c": 500},
+            budget=600,
+            shares={"a": 0.5, "b": 0.25, "c": 0.25},
+        )
+        self.assertEqual(grants, {"a": 10, "b": 440, "c": 150})
+
+    def test_build_context_trims_cv_to_budget(self):
+        """A long CV is cut to fit while name and experience are kept."""
+        from datetime import date
+
+        from apps.ai.models import WorkExperience
+        from apps.ai.services import build_context
+        from providers.llm.tokens import count_tokens
+
+        WorkExperience.objects.create(
+            user=self.user, company="Acme", role="Engineer", start_date=date(2020, 1, 1)
+        )
+        CVDocument.objects.create(
+            user=self.user, file_name="cv.pdf", file_url="cv.pdf",
+            parsed_text="word " * 5000, is_primary=True,
+        )
+        context = build_context(self.user, max_tokens=500)
+        self.assertIn("Jane Doe", context)
+        self.assertIn("Engineer at Acme", context)
+        self.assertIn("CV / Resume", context)
+        self.assertLessEqual(count_tokens(context), 500)
+        self.assertGreater(len(build_context(self.user, max_tokens=2000)), len(context))
+
+    async def test_history_keeps_newest_messages_within_budget(self):
+        """Oldest messages are dropped first; the latest is always kept."""
+        from apps.ai.models import ChatMessage, ChatSession
+        from apps.ai.services import aload_history
+
+        session = await ChatSession.objects.acreate(user=self.user)
+        for i in range(10):
+            await ChatMessage.objects.acreate(
+                session=session, role="user", content=f"message {i}", token_count=100
+            )
+        history = await aload_history(session, max_tokens=350)
+        self.assertEqual([m["content"] for m in history], ["message 7", "message 8", "message 9"])
+        self.assertEqual(set(history[0]), {"role", "content"})
+        history = await aload_history(session, max_tokens=10)
+        self.assertEqual(len(history), 1)
@@ -0,0 +1,419 @@
+"""Tests for LLM providers, the router, the client registry and metrics."""
+
+import time
+from unittest.mock import patch
+
+from django.test import AsyncClient, TestCase
+from django.contrib.auth import get_user_model
+
+
+class FakeProviderTest(TestCase):
+    """Tests for the local fake provider used in benchmarks."""
+
+    def _fake(self, **kwargs):
+        from providers.llm.fake_provider import FakeProvider
+
+        options = {"ttft_ms": 0, "tokens_per_sec": 0, "output_tokens": 20, **kwargs}
+        return FakeProvider(**options)
+
+    def test_output_is_deterministic_per_prompt(self):
+        """Same request gives the same reply; a different prompt gives another."""
+        fake = self._fake()
+        hi = [{"role": "user", "content": "Hi"}]
+        self.assertEqual(fake.complete(hi), fake.complete(hi))
+        self.assertNotEqual(fake.complete(hi), fake.complete([{"role": "user", "content": "Bye"}]))
+        self.assertEqual(len(fake.complete(hi, max_tokens=5).split()), 5)
+
+    def test_stream_chunks_join_to_completion(self):
+        """Streamed chunks (chunk_tokens each) add up to the complete() reply."""
+        fake = self._fake(chunk_tokens=3)
+        hi = [{"role": "user", "content": "Hi"}]
+        chunks = list(fake.stream_complete(hi))
+        self.assertEqual(len(chunks), 7)
+        self.assertEqual("".join(chunks).strip(), fake.complete(hi))
+
+    def test_timing_follows_ttft_and_rate(self):
+        """TTFT and tokens/sec shape how long a stream takes."""
+        fake = self._fake(ttft_ms=50, tokens_per_sec=200, output_tokens=10)
+        start = time.monotonic()
+        stream = fake.stream_complete([{"role": "user", "content": "Hi"}])
+        next(stream)
+        ttft = time.monotonic() - start
+        list(stream)
+        total = time.monotonic() - start
+        self.assertGreaterEqual(ttft, 0.05)
+        self.assertGreaterEqual(total, 0.05 + 9 / 200)
+
+    def test_injected_errors_look_transient(self):
+        """error_rate=1 always fails with a retryable 503."""
+        from providers.llm.fake_provider import FakeProviderError
+        from providers.llm.resilience import is_retryable
+
+        fake = self._fake(error_rate=1)
+        with self.assertRaises(FakeProviderError) as ctx:
+            fake.complete([{"role": "user", "content": "Hi"}])
+        self.assertTrue(is_retryable(ctx.exception))
+
+    def test_selectable_via_llm_provider_env(self):
+        """LLM_PROVIDER=fake makes get_llm() return the fake provider."""
+        import os
+
+        from providers.llm.factory import get_llm
+        from providers.llm.fake_provider import FakeProvider
+
+        with patch.dict(os.environ, {"LLM_PROVIDER": "fake"}):
+            self.assertIsInstance(get_llm(), FakeProvider)
+
+    async def test_chat_streams_end_to_end_with_fake_provider(self):
+        """The chat endpoint streams a fake reply with no vendor involved."""
+        import os
+
+        from asgiref.sync import sync_to_async
+
+        from apps.ai.models import ChatMessage, ChatSession
+
+        user = await sync_to_async(get_user_model().objects.create_user)(
+            email="fake@example.com",
+            forwarding_address="fake-fwd@example.com",
+            password="testpass123",
+        )
+        session = await ChatSession.objects.acreate(user=user)
+        client = AsyncClient()
+        await client.aforce_login(user)
+        env = {"LLM_PROVIDER": "fake", "LLM_FAKE_TTFT_MS": "0", "LLM_FAKE_TOKENS_PER_SEC": "0"}
+        with patch.dict(os.environ, env):
+            response = await client.post(
+                f"/api/ai/chat/sessions/{session.id}/messages",
+                {"content": "Hello"},
+                content_type="application/json",
+            )
+            body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(response.status_code, 200)
+        reply = await ChatMessage.objects.aget(session=session, role="assistant")
+        self.assertEqual(reply.content, body.decode())
+        self.assertFalse(reply.is_truncated)
+        self.assertGreater(len(body.split()), 0)
+
+
+class RoutingProviderTest(TestCase):
+    """Tests for the multi-provider router (failover and hedging)."""
+
+    def _providers(self, prefix):
+        import asyncio
+
+        from providers.llm.base import LLMProvider
+
+        state = {"slow_cancelled": False}
+
+        class Failing(LLMProvider):
+            model = "failing"
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                raise RuntimeError("503 from vendor")
+
+        class Slow(LLMProvider):
+            model = "slow"
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                time.sleep(1.0)
+                return "slow"
+
+            def stream_complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                time.sleep(1.0)
+                yield "slow"
+
+            async def astream_complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                try:
+                    await asyncio.sleep(1.0)
+                    yield "slow"
+                except asyncio.CancelledError:
+                    state["slow_cancelled"] = True
+                    raise
+
+        class Fast(LLMProvider):
+            model = "fast"
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                return "fast"
+
+            def stream_complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                yield "fa"
+                yield "st"
+
+        return {
+            "failing": (f"{prefix}-failing", Failing()),
+            "slow": (f"{prefix}-slow", Slow()),
+            "fast": (f"{prefix}-fast", Fast()),
+        }, state
+
+    def test_failover_moves_to_next_provider_on_error(self):
+        """A failing primary falls over to the secondary for complete and stream."""
+        from providers.llm.routing import RoutingProvider
+
+        p, _ = self._providers("failover")
+        router = RoutingProvider([p["failing"], p["fast"]], policy="failover")
+        with patch("providers.llm.routing.random.choices", return_value=[0]):
+            self.assertEqual(router.complete([{"role": "user", "content": "Hi"}]), "fast")
+            self.assertEqual(list(router.stream_complete([{"role": "user", "content": "Hi"}])), ["fa", "st"])
+
+    def test_failover_raises_when_all_providers_fail(self):
+        """The last error is raised when every provider fails."""
+        from providers.llm.routing import RoutingProvider
+
+        p, _ = self._providers("allfail")
+        router = RoutingProvider([p["failing"]], policy="failover")
+        with self.assertRaises(RuntimeError):
+            router.complete([{"role": "user", "content": "Hi"}])
+
+    def test_hedge_starts_second_request_after_threshold(self):
+        """With no answer within the hedge delay, the faster secondary wins."""
+        from providers.llm.routing import RoutingProvider
+
+        p, _ = self._providers("hedge")
+        router = RoutingProvider(
+            [p["slow"], p["fast"]],
+            policy="hedge",
+            hedge_min_seconds=0.01,
+            hedge_initial_seconds=0.05,
+        )
+        with patch("providers.llm.routing.random.choices", return_value=[0]):
+            started = time.monotonic()
+            self.assertEqual(router.complete([{"role": "user", "content": "Hi"}]), "fast")
+            self.assertEqual(list(router.stream_complete([{"role": "user", "content": "Hi"}])), ["fa", "st"])
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    def test_async_hedge_cancels_loser(self):
+        """Async hedging cancels the slower stream once the other produces a token."""
+        import asyncio
+
+        from providers.llm.routing import RoutingProvider
+
+        p, state = self._providers("ahedge")
+        router = RoutingProvider(
+            [p["slow"], p["fast"]],
+            policy="hedge",
+            hedge_min_seconds=0.01,
+            hedge_initial_seconds=0.05,
+        )
+
+        async def run():
+            return [c async for c in router.astream_complete([{"role": "user", "content": "Hi"}])]
+
+        with patch("providers.llm.routing.random.choices", return_value=[0]):
+            self.assertEqual(asyncio.run(run()), ["fa", "st"])
+        self.assertTrue(state["slow_cancelled"])
+
+    def test_winning_stream_is_closed_when_caller_stops(self):
+        """Closing a routed stream early also closes the provider's upstream stream."""
+        import asyncio
+
+        from providers.llm.base import LLMProvider
+        from providers.llm.routing import RoutingProvider
+
+        closed = []
+
+        class Endless(LLMProvider):
+            model = "endless"
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                return "tok"
+
+            def stream_complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                try:
+                    while True:
+                        yield "tok"
+                finally:
+                    closed.append("sync")
+
+            async def astream_complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                try:
+                    while True:
+                        yield "tok"
+                finally:
+                    closed.append("async")
+
+        router = RoutingProvider([("close-endless", Endless())], policy="failover")
+        stream = router.stream_complete([{"role": "user", "content": "Hi"}])
+        self.assertEqual(next(stream), "tok")
+        stream.close()
+
+        async def run():
+            stream = router.astream_complete([{"role": "user", "content": "Hi"}])
+            self.assertEqual(await anext(stream), "tok")
+            await stream.aclose()
+
+        asyncio.run(run())
+        self.assertEqual(closed, ["sync", "async"])
+
+    def test_hedge_delay_tracks_observed_p95(self):
+        """The hedge threshold follows the provider's p95 TTFT within bounds."""
+        from providers.llm.routing import RoutingProvider, get_tracker
+
+        p, _ = self._providers("p95")
+        router = RoutingProvider([p["fast"]], policy="hedge", hedge_min_seconds=0.1, hedge_max_seconds=5.0)
+        name = p["fast"][0]
+        self.assertEqual(router.hedge_delay(name), router.hedge_initial_seconds)
+        for i in range(100):
+            get_tracker(name).record(1.0 if i < 94 else 2.0)
+        self.assertEqual(router.hedge_delay(name), 2.0)
+
+    def test_get_llm_router_and_unknown_provider(self):
+        """get_llm builds the router from env and rejects unknown names."""
+        from providers.llm.factory import get_llm
+        from providers.llm.routing import RoutingProvider
+
+        with patch.dict("os.environ", {"LLM_ROUTER_PROVIDERS": "openai,anthropic", "LLM_ROUTER_POLICY": "hedge"}):
+            router = get_llm("router")
+        self.assertIsInstance(router, RoutingProvider)
+        self.assertEqual([name for name, _ in router.providers], ["openai", "anthropic"])
+        self.assertEqual(router.policy, "hedge")
+        with self.assertRaises(ValueError):
+            get_llm("nonexistent")
+
+
+class LLMClientRegistryTest(TestCase):
+    """Tests for pooled, shared LLM SDK clients."""
+
+    def setUp(self):
+        from providers.llm.clients import registry
+
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_same_key_and_base_url_reuse_client(self):
+        """Providers with the same key and base URL share one SDK client."""
+        from providers.llm.openai_provider import OpenAIProvider
+
+        a = OpenAIProvider(api_key="sk-test-a")
+        b = OpenAIProvider(api_key="sk-test-a")
+        self.assertIs(a._client(), b._client())
+
+    def test_different_key_or_provider_gets_separate_client(self):
+        """Clients are keyed by provider, api_key and base_url."""
+        from providers.llm.anthropic_provider import AnthropicProvider
+        from providers.llm.openai_provider import OpenAIProvider
+
+        a = OpenAIProvider(api_key="sk-test-a")._client()
+        b = OpenAIProvider(api_key="sk-test-b")._client()
+        c = OpenAIProvider(api_key="sk-test-a", base_url="http://localhost:9999/v1")._client()
+        d = AnthropicProvider(api_key="sk-test-a")._client()
+        self.assertEqual(len({id(a), id(b), id(c), id(d)}), 4)
+
+    def test_registry_is_bounded_lru(self):
+        """Least recently used clients are evicted past max_clients."""
+        from providers.llm.clients import ClientRegistry
+
+        reg = ClientRegistry(max_clients=2)
+        first = reg.get(("p", "1"), object)
+        reg.get(("p", "2"), object)
+        self.assertIs(reg.get(("p", "1"), object), first)
+        reg.get(("p", "3"), object)
+        self.assertEqual(len(reg), 2)
+        self.assertIs(reg.get(("p", "1"), object), first)
+        self.assertEqual(reg.get(("p", "2"), lambda: "rebuilt"), "rebuilt")
+
+    def test_registry_creates_once_across_threads(self):
+        """Concurrent first use builds a single client."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        from providers.llm.clients import ClientRegistry
+
+        reg = ClientRegistry(max_clients=4)
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return object()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            clients = list(pool.map(lambda _: reg.get(("p", "k"), factory), range(32)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(c) for c in clients}), 1)
+
+
+class LLMMetricsTest(TestCase):
+    """Tests for per-call LLM instrumentation."""
+
+    def setUp(self):
+        from providers.llm import metrics
+
+        metrics.reset()
+
+    def _series(self, endpoint, outcome="ok"):
+        from providers.llm import metrics
+
+        return next(
+            s for s in metrics.snapshot() if s["endpoint"] == endpoint and s["outcome"] == outcome
+        )
+
+    def test_complete_records_latency_usage_and_cost(self):
+        """complete() records latency, reported usage and estimated cost per endpoint."""
+        from apps.ai.services import LLMService
+        from providers.llm import usage
+        from providers.llm.base import LLMProvider
+
+        class Priced(LLMProvider):
+            name = "openai"
+            model = "gpt-4o-mini"
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                usage.record(self.model, input_tokens=1000, output_tokens=500, cache_read_tokens=400)
+                return "reply"
+
+            def stream_complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                yield "reply"
+
+        LLMService(llm=Priced(), endpoint="metrics_sync").complete([{"role": "user", "content": "Hi"}])
+        series = self._series("metrics_sync")
+        self.assertEqual((series["provider"], series["model"]), ("openai", "gpt-4o-mini"))
+        self.assertEqual(series["latency_seconds"]["count"], 1)
+        self.assertEqual(series["usage"]["input_tokens"], 1000)
+        # 600 uncached + 400 cached at half price, plus 500 output tokens.
+        expected = (600 * 0.15 + 400 * 0.075 + 500 * 0.60) / 1_000_000
+        self.assertAlmostEqual(series["cost_usd"], expected, places=6)
+
+    def test_stream_records_ttft_and_throughput(self):
+        """Streams record time to first token and output tokens per second."""
+        from apps.ai.services import LLMService
+        from providers.llm.fake_provider import FakeProvider
+
+        fake = FakeProvider(ttft_ms=20, tokens_per_sec=500, output_tokens=10)
+        chunks = list(LLMService(llm=fake, endpoint="metrics_stream").stream_complete(
+            [{"role": "user", "content": "Hi"}]
+        ))
+        self.assertEqual(len(chunks), 10)
+        series = self._series("metrics_stream")
+        self.assertGreaterEqual(series["ttft_seconds"]["min"], 0.02)
+        self.assertLess(series["ttft_seconds"]["max"], series["latency_seconds"]["max"])
+        self.assertEqual(series["output_tokens_per_second"]["count"], 1)
+        self.assertEqual(series["usage"]["output_tokens"], 10)
+
+    def test_errors_and_cancellations_are_labelled(self):
+        """Failed calls and streams closed early get their own outcome label."""
+        from providers.llm.fake_provider import FakeProvider, FakeProviderError
+        from providers.llm.metrics import InstrumentedProvider
+
+        failing = InstrumentedProvider(FakeProvider(ttft_ms=0, error_rate=1), endpoint="metrics_err")
+        with self.assertRaises(FakeProviderError):
+            failing.complete([{"role": "user", "content": "Hi"}])
+        self.assertEqual(self._series("metrics_err", "error")["latency_seconds"]["count"], 1)
+
+        streaming = InstrumentedProvider(
+            FakeProvider(ttft_ms=0, tokens_per_sec=0, output_tokens=10), endpoint="metrics_cancel"
+        )
+        stream = streaming.stream_complete([{"role": "user", "content": "Hi"}])
+        next(stream)
+        stream.close()
+        self.assertEqual(self._series("metrics_cancel", "cancelled")["latency_seconds"]["count"], 1)
+
+    def test_histogram_quantiles(self):
+        """Quantile estimates stay within the observed range."""
+        from providers.llm.metrics import LATENCY_BUCKETS, Histogram
+
+        histogram = Histogram(LATENCY_BUCKETS)
+        for value in (0.2, 0.3, 0.4, 3.0):
+            histogram.observe(value)
+        snap = histogram.snapshot()
+        self.assertEqual(snap["count"], 4)
+        self.assertTrue(0.2 <= snap["p50"] <= 0.5)
+        self.assertLessEqual(snap["p99"], 3.0)
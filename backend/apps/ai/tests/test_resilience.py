@@ -0,0 +1,298 @@
+"""Tests for LLM retries and circuit breaking."""
+
+import time
+
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+
+
+class LLMResilienceTest(TestCase):
+    """Tests for provider retries, deadlines and circuit breakers."""
+
+    def setUp(self):
+        from providers.llm.resilience import reset_resilience_state
+
+        reset_resilience_state()
+
+    @staticmethod
+    def _status_error(status, headers=None):
+        from types import SimpleNamespace
+
+        exc = Exception(f"HTTP {status}")
+        exc.status_code = status
+        exc.response = SimpleNamespace(headers=headers or {})
+        return exc
+
+    def _flaky(self, failures):
+        from providers.llm.base import LLMProvider
+
+        errors = list(failures)
+        calls = {"n": 0}
+        mid_stream_error = self._status_error(503)
+
+        class Flaky(LLMProvider):
+            model = "flaky"
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                calls["n"] += 1
+                if errors:
+                    raise errors.pop(0)
+                return "ok"
+
+            def stream_complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                calls["n"] += 1
+                if errors:
+                    raise errors.pop(0)
+                yield "o"
+                raise mid_stream_error
+
+        return Flaky(), calls
+
+    def _resilient(self, inner, name, **policy):
+        from providers.llm.resilience import ResilientProvider, RetryPolicy
+
+        policy = {"max_attempts": 3, "base_delay": 0, "max_delay": 0, "deadline": 5, **policy}
+        return ResilientProvider(inner, name=name, policy=RetryPolicy(**policy))
+
+    def test_transient_errors_are_retried(self):
+        """429/5xx are retried until success and counted for monitoring."""
+        from providers.llm.resilience import resilience_snapshot
+
+        inner, calls = self._flaky([self._status_error(429), self._status_error(503)])
+        provider = self._resilient(inner, "retry-ok")
+        self.assertEqual(provider.complete([{"role": "user", "content": "Hi"}]), "ok")
+        self.assertEqual(calls["n"], 3)
+        stats = resilience_snapshot()["retry-ok"]
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["breaker"]["state"], "closed")
+
+    def test_client_errors_are_not_retried(self):
+        """A 400 is raised immediately and does not count against the breaker."""
+        inner, calls = self._flaky([self._status_error(400)])
+        provider = self._resilient(inner, "no-retry")
+        with self.assertRaises(Exception):
+            provider.complete([{"role": "user", "content": "Hi"}])
+        self.assertEqual(calls["n"], 1)
+        self.assertEqual(provider.breaker.consecutive_failures, 0)
+
+    def test_client_errors_leave_the_breaker_alone(self):
+        """A 4xx neither resets the failure streak nor closes a half-open breaker."""
+        inner, _ = self._flaky(
+            [self._status_error(503), self._status_error(400), self._status_error(503)]
+        )
+        provider = self._resilient(inner, "neutral", max_attempts=1)
+        provider.breaker.failure_threshold = 2
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                provider.complete([{"role": "user", "content": "Hi"}])
+        self.assertEqual(provider.breaker.state, "open")
+
+        provider.breaker.opened_at -= provider.breaker.reset_timeout
+        inner, _ = self._flaky([self._status_error(400)])
+        probe = self._resilient(inner, "neutral", max_attempts=1)
+        with self.assertRaises(Exception):
+            probe.complete([{"role": "user", "content": "Hi"}])
+        self.assertEqual(provider.breaker.state, "half_open")
+
+    def test_sync_attempts_are_bounded_by_the_deadline(self):
+        """Each sync attempt sends the SDK a timeout no longer than what is left of the deadline."""
+        from providers.llm.base import LLMProvider
+        from providers.llm.clients import request_options
+
+        seen = []
+
+        class Recording(LLMProvider):
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                seen.append(request_options()["timeout"])
+                return "ok"
+
+            def stream_complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                seen.append(request_options()["timeout"])
+                yield "ok"
+
+        provider = self._resilient(Recording(), "bounded", deadline=45)
+        provider.complete([{"role": "user", "content": "Hi"}])
+        list(provider.stream_complete([{"role": "user", "content": "Hi"}]))
+        self.assertEqual(len(seen), 2)
+        self.assertTrue(all(0 < timeout <= 45 for timeout in seen))
+        self.assertEqual(request_options(), {})
+
+    def test_backoff_honours_retry_after(self):
+        """Retry-After / retry-after-ms headers override jittered backoff (capped)."""
+        from providers.llm.resilience import RetryPolicy
+
+        policy = RetryPolicy(base_delay=0.5, max_delay=8, deadline=60)
+        self.assertEqual(policy.backoff(1, self._status_error(429, {"retry-after": "2"})), 2.0)
+        self.assertEqual(policy.backoff(1, self._status_error(429, {"retry-after-ms": "250"})), 0.25)
+        self.assertEqual(policy.backoff(1, self._status_error(429, {"retry-after": "120"})), 8)
+        for attempt in (1, 2, 3):
+            delay = policy.backoff(attempt, self._status_error(503))
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, 0.5 * 2 ** (attempt - 1))
+
+    def test_breaker_opens_and_half_open_probe_closes_it(self):
+        """Consecutive failures open the breaker; after the reset timeout one probe is let through."""
+        from providers.llm.resilience import CircuitBreaker, CircuitOpenError
+
+        breaker = CircuitBreaker("probe", failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        time.sleep(0.06)
+        breaker.before_call()
+        self.assertEqual(breaker.state, "half_open")
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        breaker.before_call()
+
+    def test_open_breaker_fails_fast(self):
+        """While open, calls are rejected without reaching the provider."""
+        from providers.llm.resilience import CircuitOpenError, get_breaker
+
+        inner, calls = self._flaky([self._status_error(503)] * 10)
+        provider = self._resilient(inner, "fail-fast", max_attempts=1)
+        get_breaker("fail-fast").failure_threshold = 2
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                provider.complete([{"role": "user", "content": "Hi"}])
+        with self.assertRaises(CircuitOpenError):
+            provider.complete([{"role": "user", "content": "Hi"}])
+        self.assertEqual(calls["n"], 2)
+
+    def test_stream_retried_only_before_first_chunk(self):
+        """A stream failing before output is retried; a failure after a chunk is raised."""
+        inner, calls = self._flaky([self._status_error(502)])
+        provider = self._resilient(inner, "stream-retry")
+        stream = provider.stream_complete([{"role": "user", "content": "Hi"}])
+        self.assertEqual(next(stream), "o")
+        with self.assertRaises(Exception):
+            next(stream)
+        self.assertEqual(calls["n"], 2)
+
+    def test_async_call_is_bounded_by_deadline(self):
+        """acomplete gives up with DeadlineExceeded once the total budget is spent."""
+        import asyncio
+
+        from providers.llm.base import LLMProvider
+        from providers.llm.resilience import DeadlineExceeded
+
+        class Hanging(LLMProvider):
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                return ""
+
+            async def acomplete(self, messages, *, system_prompt=None, max_tokens=2048):
+                await asyncio.sleep(5)
+                return "late"
+
+        provider = self._resilient(Hanging(), "deadline", deadline=0.05)
+        with self.assertRaises(DeadlineExceeded):
+            asyncio.run(provider.acomplete([{"role": "user", "content": "Hi"}]))
+
+    def test_cancelled_half_open_probe_is_released(self):
+        """A probe cancelled mid-call (client gone) lets the next call probe again."""
+        import asyncio
+
+        from providers.llm.base import LLMProvider
+        from providers.llm.resilience import get_breaker
+
+        class Slow(LLMProvider):
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                return ""
+
+            async def acomplete(self, messages, *, system_prompt=None, max_tokens=2048):
+                await asyncio.sleep(5)
+                return "late"
+
+            async def astream_complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                await asyncio.sleep(5)
+                yield "late"
+
+        provider = self._resilient(Slow(), "cancel-probe")
+        breaker = get_breaker("cancel-probe")
+
+        async def cancel(call):
+            task = asyncio.ensure_future(call)
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        messages = [{"role": "user", "content": "Hi"}]
+        for call in (lambda: provider.acomplete(messages), lambda: anext(provider.astream_complete(messages))):
+            breaker.state, breaker.opened_at = "open", 0.0
+            asyncio.run(cancel(call()))
+            self.assertEqual(breaker.state, "half_open")
+            breaker.before_call()
+            breaker.record_success()
+
+    def test_sdk_errors_are_classified_by_name(self):
+        """SDK timeout/connection errors are retryable, matched by module and class name."""
+        from providers.llm.resilience import is_retryable
+
+        APITimeoutError = type("APITimeoutError", (Exception,), {"__module__": "openai._exceptions"})
+        Subclass = type("ReadTimeout", (APITimeoutError,), {"__module__": "anthropic._exceptions"})
+        Unrelated = type("APITimeoutError", (Exception,), {"__module__": "myapp.errors"})
+        self.assertTrue(is_retryable(APITimeoutError()))
+        self.assertTrue(is_retryable(Subclass()))
+        self.assertFalse(is_retryable(Unrelated()))
+        self.assertFalse(is_retryable(ValueError("bad prompt")))
+
+    def test_provider_timeout_is_retried_not_deadline(self):
+        """A TimeoutError raised by the provider itself is a transient failure, not the deadline."""
+        import asyncio
+
+        from providers.llm.base import LLMProvider
+
+        calls = {"n": 0}
+
+        class TimesOutOnce(LLMProvider):
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                return ""
+
+            async def acomplete(self, messages, *, system_prompt=None, max_tokens=2048):
+                calls["n"] += 1
+                if calls["n"] == 1:
+                    raise TimeoutError("read timed out")
+                return "ok"
+
+        provider = self._resilient(TimesOutOnce(), "inner-timeout")
+        self.assertEqual(asyncio.run(provider.acomplete([{"role": "user", "content": "Hi"}])), "ok")
+        self.assertEqual(calls["n"], 2)
+
+    def test_service_wraps_provider(self):
+        """LLMService wraps its provider; router children get per-vendor breakers."""
+        from apps.ai.services import LLMService
+        from providers.llm.resilience import ResilientProvider
+        from providers.llm.routing import RoutingProvider
+
+        inner, _ = self._flaky([self._status_error(500)])
+        service = LLMService(llm=inner)
+        self.assertIsInstance(service._llm.inner, ResilientProvider)
+        self.assertEqual(service.complete([{"role": "user", "content": "Hi"}]), "ok")
+        router = RoutingProvider([("vendor-a", self._flaky([])[0])])
+        LLMService(llm=router)
+        self.assertIsInstance(router.providers[0][1], ResilientProvider)
+        self.assertEqual(router.providers[0][1].name, "vendor-a")
+
+    def test_stats_endpoint_is_staff_only(self):
+        """GET /api/ai/llm/stats exposes breaker state to staff users only."""
+        user = get_user_model().objects.create_user(
+            email="ops@example.com",
+            forwarding_address="ops-fwd@example.com",
+            password="testpass123",
+        )
+        client = Client()
+        self.assertEqual(client.get("/api/ai/llm/stats").status_code, 401)
+        client.force_login(user)
+        self.assertEqual(client.get("/api/ai/llm/stats").status_code, 403)
+        user.is_staff = True
+        user.save(update_fields=["is_staff"])
+        self._resilient(self._flaky([])[0], "visible").complete([{"role": "user", "content": "Hi"}])
+        response = client.get("/api/ai/llm/stats")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["providers"]["visible"]["breaker"]["state"], "closed")
@@ -0,0 +1,124 @@
+"""Tests for profile retrieval."""
+
+from unittest.mock import AsyncMock, patch
+
+from django.test import AsyncClient, TestCase, override_settings
+from django.contrib.auth import get_user_model
+
+from apps.ai.models import CVDocument
+
+
+class RetrievalTest(TestCase):
+    """Tests for BM25 retrieval over profile content."""
+
+    def setUp(self):
+        from datetime import date
+
+        from apps.ai import profile_cache
+        from apps.ai.models import Project, WorkExperience
+
+        profile_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="retrieval@example.com",
+            forwarding_address="retrieval-fwd@example.com",
+            password="testpass123",
+            full_name="Riley Retrieval",
+            target_role="Data Engineer",
+        )
+        WorkExperience.objects.create(
+            user=self.user, company="Acme", role="Backend Engineer", start_date=date(2019, 1, 1),
+            description="Built Kafka pipelines and Postgres replication.",
+        )
+        Project.objects.create(user=self.user, title="Garden planner", description="A React app for planting.")
+        Project.objects.create(user=self.user, title="Stream tools", description="Kafka consumer lag dashboard.")
+        CVDocument.objects.create(
+            user=self.user, file_name="cv.pdf", file_url="cv.pdf", is_primary=True,
+            parsed_text=" ".join(f"word{i}" for i in range(300)),
+        )
+
+    def test_bm25_ranks_matching_chunks(self):
+        """Chunks sharing rare query terms rank first; postings are arrays."""
+        from array import array
+
+        from apps.ai.retrieval import BM25Index
+
+        index = BM25Index([
+            "Kafka pipelines at Acme",
+            "React garden planner",
+            "Kafka consumer lag dashboard with Kafka metrics",
+        ])
+        hits = index.search("How did you use Kafka?", 5)
+        self.assertEqual([doc_id for doc_id, _ in hits], [2, 0])
+        self.assertEqual(index.search("the and of", 5), [])
+        self.assertIsInstance(index._doc_ids[0], array)
+
+    def test_profile_is_chunked_with_cv_windows(self):
+        """Entries are chunks of their own; the CV is split into overlapping windows."""
+        from apps.ai.retrieval import chunk_profile
+        from apps.ai.services import load_profile
+
+        with override_settings(LLM_RETRIEVAL={"CHUNK_WORDS": 120, "CHUNK_OVERLAP": 30}):
+            chunks = chunk_profile(load_profile(self.user))
+        cv = [c for c in chunks if c.startswith("CV: ")]
+        self.assertEqual(len(chunks) - len(cv), 3)
+        self.assertEqual(len(cv), 3)
+        self.assertIn("word90 ", cv[1])
+        self.assertIn("word90 ", cv[0])
+
+    def test_grounding_selects_relevant_excerpts(self):
+        """Only chunks relevant to the message are sent; the index is reused."""
+        from apps.ai import profile_cache
+        from asgiref.sync import async_to_sync
+
+        header, excerpts = async_to_sync(profile_cache.aget_grounding)(self.user, "Tell me about Kafka")
+        self.assertIn("Target role: Data Engineer", header)
+        self.assertIn("Stream tools", excerpts)
+        self.assertIn("Kafka pipelines", excerpts)
+        self.assertNotIn("Garden planner", excerpts)
+        entry = profile_cache._cache[(self.user.pk, self.user.profile_version)]
+        index = entry.index
+        with self.assertNumQueries(0):
+            _, small_talk = async_to_sync(profile_cache.aget_grounding)(self.user, "hello")
+        self.assertIs(entry.index, index)
+        # Nothing matches: the leading chunks are used.
+        self.assertIn("Backend Engineer", small_talk)
+
+    def test_excerpts_fit_budget(self):
+        """Excerpts never exceed their token budget."""
+        from apps.ai.retrieval import BM25Index, excerpts
+        from providers.llm.tokens import count_tokens
+
+        index = BM25Index([f"kafka note {i} " + "filler " * 50 for i in range(10)])
+        text = excerpts(index, "kafka", max_tokens=150)
+        self.assertLessEqual(count_tokens(text), 150)
+        self.assertEqual(excerpts(index, "kafka", max_tokens=5), "")
+
+    async def test_chat_turn_sends_grounded_prompt(self):
+        """The chat system prompt carries the header and matching excerpts only."""
+        from apps.ai.models import ChatSession
+
+        async def fake_stream(*args, **kwargs):
+            yield "Reply"
+
+        session = await ChatSession.objects.acreate(user=self.user)
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with patch("apps.ai.api.LLMService") as MockLLMService:
+            MockLLMService.acreate = AsyncMock(side_effect=MockLLMService)
+            mock_instance = MockLLMService.return_value
+            mock_instance.max_tokens = 1024
+            mock_instance.model = None
+            mock_instance.aadmit = AsyncMock()
+            mock_instance.astream_complete.side_effect = fake_stream
+            response = await client.post(
+                f"/api/ai/chat/sessions/{session.id}/messages",
+                {"content": "Which Kafka work have I done?"},
+                content_type="application/json",
+            )
+            [chunk async for chunk in response.streaming_content]
+        blocks = mock_instance.astream_complete.call_args.kwargs["system_prompt"]
+        prompt = "\n".join(block.text for block in blocks)
+        self.assertFalse(any(block.cache for block in blocks))
+        self.assertIn("Riley Retrieval", blocks[0].text)
+        self.assertIn("Stream tools", prompt)
+        self.assertNotIn("Garden planner", prompt)
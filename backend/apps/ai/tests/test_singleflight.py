@@ -0,0 +1,204 @@
+"""Tests for single-flight request coalescing."""
+
+import time
+from unittest.mock import AsyncMock, patch
+
+from django.test import TestCase
+
+
+class SingleFlightTest(TestCase):
+    """Tests for coalescing identical in-flight LLM requests."""
+
+    def test_concurrent_identical_completions_share_one_call(self):
+        """Callers with the same key get the leader's result; fn runs once."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        from apps.ai.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        gate = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            gate.wait(5)
+            return "shared"
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(flight.do, "k", fn) for _ in range(4)]
+            while len(flight.table) == 0:
+                time.sleep(0.001)
+            time.sleep(0.1)  # let the other callers join the in-flight call
+            gate.set()
+            results = [f.result(5) for f in futures]
+        self.assertEqual(results, ["shared"] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(flight.table), 0)
+
+    def test_leader_error_is_raised_for_followers(self):
+        """An upstream error reaches every coalesced caller."""
+        import threading
+
+        from apps.ai.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def fn():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("upstream down")
+
+        def call():
+            try:
+                flight.do("k", fn)
+            except RuntimeError as exc:
+                errors.append(str(exc))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=call)
+        follower.start()
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(errors, ["upstream down", "upstream down"])
+
+    def test_late_stream_subscriber_replays_then_follows_tail(self):
+        """A second subscriber receives chunks produced before it joined, then the rest."""
+        import threading
+
+        from apps.ai.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        gate = threading.Event()
+        opened = []
+
+        def open_stream():
+            opened.append(1)
+            yield "a"
+            gate.wait(5)
+            yield "b"
+
+        first = flight.stream("k", open_stream)
+        self.assertEqual(next(first), "a")
+        second = flight.stream("k", open_stream)
+        self.assertEqual(next(second), "a")
+        gate.set()
+        self.assertEqual(list(first), ["b"])
+        self.assertEqual(list(second), ["b"])
+        self.assertEqual(len(opened), 1)
+
+    def test_async_streams_are_coalesced(self):
+        """Async subscribers share one upstream async stream."""
+        import asyncio
+
+        from apps.ai.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        opened = []
+
+        async def open_stream():
+            opened.append(1)
+            for chunk in ["x", "y", "z"]:
+                await asyncio.sleep(0.01)
+                yield chunk
+
+        async def collect(stream):
+            return [chunk async for chunk in stream]
+
+        async def run():
+            first = flight.astream("k", open_stream)
+            second = flight.astream("k", open_stream)
+            return await asyncio.gather(collect(first), collect(second))
+
+        self.assertEqual(asyncio.run(run()), [["x", "y", "z"], ["x", "y", "z"]])
+        self.assertEqual(len(opened), 1)
+
+    def test_stream_is_abandoned_when_all_subscribers_leave(self):
+        """Closing every subscriber stops the upstream and frees the key."""
+        import threading
+
+        from apps.ai.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        closed = threading.Event()
+
+        def open_stream():
+            try:
+                while True:
+                    yield "tick"
+            finally:
+                closed.set()
+
+        stream = flight.stream("k", open_stream)
+        self.assertEqual(next(stream), "tick")
+        stream.close()
+        self.assertTrue(closed.wait(5))
+        self.assertEqual(len(flight.table), 0)
+
+    def test_llm_service_coalesces_concurrent_completions(self):
+        """LLMService routes identical concurrent completions through single-flight."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        from apps.ai.services import LLMService
+        from providers.llm.base import LLMProvider
+
+        gate = threading.Event()
+
+        class SlowProvider(LLMProvider):
+            calls = 0
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                SlowProvider.calls += 1
+                gate.wait(5)
+                return "letter"
+
+        service = LLMService(llm=SlowProvider())
+        messages = [{"role": "user", "content": "Write"}]
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(service.complete, messages, system_prompt="s") for _ in range(3)]
+            while SlowProvider.calls == 0:
+                time.sleep(0.001)
+            time.sleep(0.1)  # let the other callers join the in-flight call
+            gate.set()
+            self.assertEqual([f.result(5) for f in futures], ["letter"] * 3)
+        self.assertEqual(SlowProvider.calls, 1)
+
+
+    def test_only_the_leader_is_admitted_and_followers_get_its_usage(self):
+        """Coalesced callers spend no admission token and report the shared call's usage."""
+        import asyncio
+        from types import SimpleNamespace
+
+        from apps.ai.services import LLMService
+        from providers.llm import usage
+        from providers.llm.base import LLMProvider
+
+        class SlowProvider(LLMProvider):
+            model = "slow"
+
+            def complete(self, messages, *, system_prompt=None, max_tokens=2048):
+                return ""
+
+            async def acomplete(self, messages, *, system_prompt=None, max_tokens=2048):
+                await asyncio.sleep(0.05)
+                usage.record(self.model, input_tokens=10, output_tokens=20)
+                return "letter"
+
+        user = SimpleNamespace(pk="coalesced", subscription_tier=None)
+        services = [LLMService(llm=SlowProvider(), user=user) for _ in range(3)]
+        messages = [{"role": "user", "content": "Write once"}]
+
+        async def run():
+            return await asyncio.gather(*(s.acomplete(messages, system_prompt="s") for s in services))
+
+        with patch("apps.ai.services.admission.aadmit", new_callable=AsyncMock) as aadmit:
+            self.assertEqual(asyncio.run(run()), ["letter"] * 3)
+        aadmit.assert_awaited_once()
+        self.assertEqual([s.last_usage.output_tokens for s in services], [20, 20, 20])
@@ -0,0 +1,155 @@
+"""Tests for streamed LLM replies."""
+
+from unittest.mock import patch
+
+from django.test import AsyncClient, TestCase
+from django.contrib.auth import get_user_model
+
+
+class StreamingOutputTest(TestCase):
+    """Tests for coalesced and SSE-framed streaming output."""
+
+    @staticmethod
+    async def _collect(stream):
+        return [item async for item in stream]
+
+    async def test_small_deltas_are_batched_by_size(self):
+        """The first delta goes out alone; the rest are grouped up to max_bytes."""
+        from apps.ai.streaming import coalesce
+
+        async def deltas():
+            for _ in range(41):
+                yield "ab"
+
+        batches = await self._collect(coalesce(deltas(), max_bytes=10, max_delay=5))
+        self.assertEqual(b"".join(batches), b"ab" * 41)
+        self.assertEqual(batches[0], b"ab")
+        self.assertEqual(len(batches), 9)
+
+    async def test_partial_batch_is_flushed_after_max_delay(self):
+        """A batch waiting on a slow upstream is sent once max_delay has passed."""
+        import asyncio
+
+        from apps.ai.streaming import coalesce
+
+        async def deltas():
+            yield "a"
+            yield "b"
+            await asyncio.sleep(0.2)
+            yield "c"
+
+        batches = await self._collect(coalesce(deltas(), max_bytes=256, max_delay=0.02))
+        self.assertEqual(batches, [b"a", b"b", b"c"])
+
+    async def test_heartbeat_while_idle(self):
+        """With heartbeat set, idle periods yield None ticks."""
+        import asyncio
+
+        from apps.ai.streaming import coalesce
+
+        async def deltas():
+            await asyncio.sleep(0.1)
+            yield "late"
+
+        batches = await self._collect(coalesce(deltas(), heartbeat=0.02))
+        self.assertIn(None, batches)
+        self.assertEqual(batches[-1], b"late")
+
+    async def test_slow_consumer_stops_upstream_reads(self):
+        """Upstream is only read as the client consumes; stopping early closes it."""
+        from apps.ai.streaming import coalesce
+
+        pulled = []
+        closed = []
+
+        async def deltas():
+            try:
+                for i in range(1000):
+                    pulled.append(i)
+                    yield "x" * 100
+            finally:
+                closed.append(True)
+
+        batches = coalesce(deltas(), max_bytes=256, max_delay=5)
+        await anext(batches)
+        await anext(batches)
+        await batches.aclose()
+        self.assertLess(len(pulled), 10)
+        self.assertEqual(closed, [True])
+
+    async def test_client_disconnect_saves_truncated_reply(self):
+        """Cancelling a chat stream closes the provider and saves a truncated reply."""
+        import asyncio
+        import os
+
+        from asgiref.sync import sync_to_async
+
+        from apps.ai.models import ChatMessage, ChatSession
+        from providers.llm import metrics
+
+        metrics.reset()
+        user = await sync_to_async(get_user_model().objects.create_user)(
+            email="gone@example.com",
+            forwarding_address="gone-fwd@example.com",
+            password="testpass123",
+        )
+        session = await ChatSession.objects.acreate(user=user)
+        client = AsyncClient()
+        await client.aforce_login(user)
+        env = {"LLM_PROVIDER": "fake", "LLM_FAKE_TTFT_MS": "0", "LLM_FAKE_TOKENS_PER_SEC": "5"}
+        with patch.dict(os.environ, env):
+            response = await client.post(
+                f"/api/ai/chat/sessions/{session.id}/messages",
+                {"content": "Tell me a long story"},
+                content_type="application/json",
+            )
+            content = response.streaming_content
+            first = await anext(content)
+
+            # What the ASGI handler does when the client goes away mid-stream.
+            task = asyncio.ensure_future(anext(content))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        reply = await ChatMessage.objects.aget(session=session, role="assistant")
+        self.assertTrue(reply.is_truncated)
+        self.assertEqual(reply.content, first.decode())
+        cancelled = [s for s in metrics.snapshot() if s["outcome"] == "cancelled"]
+        self.assertEqual(cancelled[0]["endpoint"], "chat")
+        self.assertGreater(cancelled[0]["aborted_unused_budget"], 0)
+
+    def test_sse_event_framing(self):
+        """Multi-line data becomes several data: lines under one id."""
+        from apps.ai.streaming import sse_event
+
+        self.assertEqual(sse_event(b"a\nb", event_id=3), b"id: 3\ndata: a\ndata: b\n\n")
+
+    async def test_chat_streams_sse_when_requested(self):
+        """Accept: text/event-stream switches the chat reply to SSE framing."""
+        import os
+
+        from asgiref.sync import sync_to_async
+
+        from apps.ai.models import ChatSession
+
+        user = await sync_to_async(get_user_model().objects.create_user)(
+            email="sse@example.com",
+            forwarding_address="sse-fwd@example.com",
+            password="testpass123",
+        )
+        session = await ChatSession.objects.acreate(user=user)
+        client = AsyncClient()
+        await client.aforce_login(user)
+        env = {"LLM_PROVIDER": "fake", "LLM_FAKE_TTFT_MS": "0", "LLM_FAKE_TOKENS_PER_SEC": "0"}
+        with patch.dict(os.environ, env):
+            response = await client.post(
+                f"/api/ai/chat/sessions/{session.id}/messages",
+                {"content": "Hello over SSE"},
+                content_type="application/json",
+                headers={"Accept": "text/event-stream"},
+            )
+            body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertTrue(body.startswith(b"id: 1\ndata: "))
+        self.assertTrue(body.endswith(b"event: end\ndata: \n\n"))
@@ -0,0 +1,92 @@
+"""Tests for task routing."""
+
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+
+TASK_TABLE = {
+    "DEFAULT": {"models": {"openai": "gpt-4o-mini", "anthropic": "claude-3-5-haiku-20241022"}},
+    "TASKS": {
+        "title": {"models": {"openai": "gpt-4.1-nano"}, "max_tokens": 32, "timeout": 5},
+        "cover_letter": {"max_tokens": 1024, "timeout": 90},
+    },
+    "TIERS": {"pro": {"cover_letter": {"models": {"openai": "gpt-4o"}, "max_tokens": 1500}}},
+}
+
+
+@override_settings(LLM_TASKS=TASK_TABLE)
+class TaskRoutingTest(TestCase):
+    """Tests for the per-task model routing table."""
+
+    def test_layers_merge_default_task_and_tier(self):
+        """Tasks override the default; tiers override the task."""
+        from apps.ai.task_routing import route_for
+
+        title = route_for("title")
+        self.assertEqual(title.models["openai"], "gpt-4.1-nano")
+        self.assertEqual(title.models["anthropic"], "claude-3-5-haiku-20241022")
+        self.assertEqual((title.max_tokens, title.timeout), (32, 5.0))
+        pro = route_for("cover_letter", tier="pro")
+        self.assertEqual((pro.models["openai"], pro.max_tokens, pro.timeout), ("gpt-4o", 1500, 90.0))
+        self.assertEqual(route_for("cover_letter", tier="free").models["openai"], "gpt-4o-mini")
+        self.assertEqual(route_for("cover_letter").variant, "default")
+
+    def test_per_request_override(self):
+        """Overrides replace the model for any provider and mark the route as a variant."""
+        from apps.ai.task_routing import route_for
+
+        route = route_for("title", overrides={"model": "gpt-4o", "max_tokens": 64})
+        self.assertEqual(route.models["anthropic"], "gpt-4o")
+        self.assertEqual(route.max_tokens, 64)
+        self.assertEqual(route.variant, "override")
+
+    def test_override_headers_are_staff_only(self):
+        """X-LLM-* headers are ignored for regular users and parsed for staff."""
+        from types import SimpleNamespace
+
+        from django.test import RequestFactory
+
+        from apps.ai.task_routing import request_overrides
+
+        request = RequestFactory().post(
+            "/", headers={"X-LLM-Model": "gpt-4o", "X-LLM-Max-Tokens": "256", "X-LLM-Timeout": "x"}
+        )
+        self.assertIsNone(request_overrides(request, SimpleNamespace(is_staff=False)))
+        self.assertEqual(
+            request_overrides(request, SimpleNamespace(is_staff=True)),
+            {"model": "gpt-4o", "max_tokens": 256},
+        )
+
+    def test_override_headers_pass_cors_preflight(self):
+        """The browser may send every X-LLM-* header cross-origin."""
+        from apps.ai.task_routing import OVERRIDE_HEADERS
+
+        response = self.client.options(
+            "/api/ai/chat/sessions",
+            headers={
+                "Origin": "http://localhost:3000",
+                "Access-Control-Request-Method": "POST",
+                "Access-Control-Request-Headers": ", ".join(OVERRIDE_HEADERS.values()),
+            },
+        )
+        allowed = response.headers["Access-Control-Allow-Headers"].lower()
+        for header in OVERRIDE_HEADERS.values():
+            self.assertIn(header.lower(), allowed)
+
+    def test_service_uses_route(self):
+        """LLMService builds the task's model, budget and deadline, labelled in metrics."""
+        import os
+        from types import SimpleNamespace
+
+        from apps.ai.services import LLMService
+
+        user = SimpleNamespace(pk=None, subscription_tier="pro")
+        with patch.dict(os.environ, {"LLM_PROVIDER": "openai"}):
+            service = LLMService(endpoint="cover_letter", user=user)
+            override = LLMService(endpoint="title", route_overrides={"model": "gpt-4o-mini"})
+        self.assertEqual(service.model, "gpt-4o")
+        self.assertEqual(service.max_tokens, 1500)
+        self.assertEqual(service._llm.inner.policy.deadline, 90.0)
+        self.assertEqual(override.model, "gpt-4o-mini")
+        self.assertEqual(override._llm.variant, "override")
@@ -0,0 +1,113 @@
+"""Tests for per-user LLM providers."""
+
+import uuid
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+
+class UserProviderTest(TestCase):
+    """Tests for bring-your-own-key provider resolution."""
+
+    def setUp(self):
+        from apps.ai import user_providers
+
+        user_providers.clear()
+        self.user = get_user_model().objects.create_user(
+            email="byok@example.com",
+            forwarding_address="byok-fwd@example.com",
+            password="testpass123",
+        )
+
+    def tearDown(self):
+        from apps.ai import user_providers
+
+        user_providers.clear()
+
+    def _settings(self, name="anthropic", key="sk-user"):
+        from apps.users.models import ProviderType, UserProviderSettings
+        from apps.users.services import encrypt_api_key
+
+        return UserProviderSettings.objects.create(
+            user=self.user,
+            provider_type=ProviderType.LLM,
+            provider_name=name,
+            encrypted_api_key=encrypt_api_key(key),
+        )
+
+    def test_api_key_round_trip(self):
+        """Keys are stored encrypted and decrypt back to the original."""
+        from apps.users.services import decrypt_api_key, encrypt_api_key
+
+        token = encrypt_api_key("sk-secret")
+        self.assertNotIn("sk-secret", token)
+        self.assertEqual(decrypt_api_key(token), "sk-secret")
+
+    def test_service_uses_user_key_with_own_scope(self):
+        """LLMService sends a BYOK user's calls with their key and their own quota."""
+        from apps.ai.services import LLMService
+        from providers.llm.anthropic_provider import AnthropicProvider
+
+        self._settings()
+        service = LLMService(user=self.user, endpoint="chat")
+        inner = service._llm.inner.inner
+        self.assertIsInstance(inner, AnthropicProvider)
+        self.assertEqual(inner._api_key, "sk-user")
+        self.assertEqual(service.provider_name, f"anthropic:user:{self.user.pk}")
+        self.assertEqual(service._llm.name, "anthropic")
+
+    async def test_async_service_never_resolves_on_the_event_loop(self):
+        """acreate() uses the async lookup even when its result was not cached."""
+        from asgiref.sync import sync_to_async
+
+        from apps.ai import user_providers
+        from apps.ai.services import LLMService
+
+        await sync_to_async(self._settings)()
+        # As if a settings change elsewhere raced with the load, so nothing is cached.
+        with patch("apps.ai.user_providers._store"):
+            service = await LLMService.acreate(user=self.user, endpoint="chat")
+        self.assertEqual(service._llm.inner.inner._api_key, "sk-user")
+        self.assertEqual(user_providers.stats()["size"], 0)
+
+    def test_resolution_is_cached_and_invalidated(self):
+        """Repeat lookups cost no query; saving or deleting settings drops the entry."""
+        from apps.ai import user_providers
+
+        self.assertIsNone(user_providers.resolve(self.user))
+        with self.assertNumQueries(0):
+            self.assertIsNone(user_providers.resolve(self.user))
+        settings_row = self._settings(name="openai", key="sk-one")
+        self.assertEqual(user_providers.resolve(self.user)._api_key, "sk-one")
+        with self.assertNumQueries(0):
+            self.assertEqual(user_providers.resolve(self.user)._api_key, "sk-one")
+        settings_row.delete()
+        self.assertIsNone(user_providers.resolve(self.user))
+
+    def test_undecryptable_key_falls_back_to_default(self):
+        """A key that cannot be decrypted is ignored rather than failing the request."""
+        from apps.ai import user_providers
+        from apps.users.models import ProviderType, UserProviderSettings
+
+        UserProviderSettings.objects.create(
+            user=self.user,
+            provider_type=ProviderType.LLM,
+            provider_name="openai",
+            encrypted_api_key="not-a-fernet-token",
+        )
+        with self.assertLogs("apps.ai.user_providers", level="WARNING"):
+            self.assertIsNone(user_providers.resolve(self.user))
+
+    def test_lru_bound(self):
+        """The cache keeps at most CACHE_SIZE users."""
+        from types import SimpleNamespace
+
+        from django.test import override_settings
+
+        from apps.ai import user_providers
+
+        with override_settings(LLM_USER_PROVIDERS={"CACHE_SIZE": 2, "TTL_SECONDS": 60}):
+            for _ in range(3):
+                user_providers.resolve(SimpleNamespace(pk=uuid.uuid4()))
+        self.assertEqual(user_providers.stats()["size"], 2)
@@ -0,0 +1,141 @@
+"""Per-user LLM providers (bring your own key)."""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from cryptography.fernet import InvalidToken
+from django.conf import settings
+
+from apps.users.models import ProviderType, UserProviderSettings
+from apps.users.services import decrypt_api_key
+from providers.llm.base import LLMProvider
+from providers.llm.factory import get_llm
+
+logger = logging.getLogger(__name__)
+
+# Vendors a user may bring a key for (ProviderName also lists email providers).
+BYOK_PROVIDERS = ("openai", "anthropic")
+
+# user_id -> (expires_at, (provider name, api key) or None)
+_cache: OrderedDict[Any, tuple[float, tuple[str, str] | None]] = OrderedDict()
+_lock = threading.Lock()
+# Bumped on every invalidation; a load that raced with one is not cached.
+_generation = 0
+_counts = {"hits": 0, "misses": 0}
+
+
+def _config() -> dict[str, Any]:
+    return getattr(settings, "LLM_USER_PROVIDERS", {}) or {}
+
+
+def _lookup(user_id) -> tuple[bool, tuple[str, str] | None]:
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(user_id)
+        if entry is None or entry[0] <= now:
+            _counts["misses"] += 1
+            return False, None
+        _cache.move_to_end(user_id)
+        _counts["hits"] += 1
+        return True, entry[1]
+
+
+def _store(user_id, credentials: tuple[str, str] | None, generation: int) -> None:
+    expires_at = time.monotonic() + float(_config().get("TTL_SECONDS", 300))
+    with _lock:
+        if generation != _generation:
+            return
+        _cache[user_id] = (expires_at, credentials)
+        _cache.move_to_end(user_id)
+        while len(_cache) > int(_config().get("CACHE_SIZE", 1000)):
+            _cache.popitem(last=False)
+
+
+def _load(user_id) -> tuple[str, str] | None:
+    """The user's (provider name, decrypted key), or None to use the default provider."""
+    row = (
+        UserProviderSettings.objects.filter(
+            user_id=user_id,
+            provider_type=ProviderType.LLM,
+            provider_name__in=BYOK_PROVIDERS,
+        )
+        .exclude(encrypted_api_key__isnull=True)
+        .exclude(encrypted_api_key="")
+        .values_list("provider_name", "encrypted_api_key")
+        .first()
+    )
+    if row is None:
+        return None
+    name, token = row
+    try:
+        api_key = decrypt_api_key(token)
+    except InvalidToken:
+        logger.warning("Cannot decrypt LLM API key for user %s; using the default provider", user_id)
+        return None
+    return name, api_key
+
+
+def _build(credentials: tuple[str, str] | None, models: Mapping[str, str] | None) -> LLMProvider | None:
+    if credentials is None:
+        return None
+    name, api_key = credentials
+    return get_llm(name, api_key=api_key, models=models)
+
+
+def resolve(user, *, models: Mapping[str, str] | None = None) -> LLMProvider | None:
+    """
+    The user's own provider (models: model per provider name, as in a task route),
+    or None when they have not configured a key.
+    """
+    user_id = getattr(user, "pk", None)
+    if user_id is None:
+        return None
+    found, credentials = _lookup(user_id)
+    if not found:
+        generation = _generation
+        credentials = _load(user_id)
+        _store(user_id, credentials, generation)
+    return _build(credentials, models)
+
+
+async def aresolve(user, *, models: Mapping[str, str] | None = None) -> LLMProvider | None:
+    """Async variant of resolve(); only a cache miss leaves the event loop."""
+    user_id = getattr(user, "pk", None)
+    if user_id is None:
+        return None
+    found, credentials = _lookup(user_id)
+    if not found:
+        generation = _generation
+        credentials = await sync_to_async(_load)(user_id)
+        _store(user_id, credentials, generation)
+    return _build(credentials, models)
+
+
+def invalidate(user_id) -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache.pop(user_id, None)
+
+
+def clear() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache.clear()
+        for key in _counts:
+            _counts[key] = 0
+
+
+def stats() -> dict[str, int]:
+    with _lock:
+        return {**_counts, "size": len(_cache)}
+
+
+def _settings_changed(sender, instance, **kwargs) -> None:
+    invalidate(instance.user_id)
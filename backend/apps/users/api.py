@@ -78,13 +78,20 @@ def patch_me(request, payload: UserMePatchIn):
     if not request.user.is_authenticated:
         return 401, {"detail": "Authentication required"}
     user = request.user
+    changes = {}
     if payload.full_name is not None:
-        user.full_name = payload.full_name.strip() or None
+        changes["full_name"] = payload.full_name.strip() or None
     if payload.target_role is not None:
-        user.target_role = payload.target_role.strip() or None
+        changes["target_role"] = payload.target_role.strip() or None
     if payload.onboarding_completed is not None:
-        user.onboarding_completed = payload.onboarding_completed
-    user.save()
+        changes["onboarding_completed"] = payload.onboarding_completed
+    # Only fields that actually change are written, so an unchanged name or
+    # role does not invalidate the user's cached AI profile.
+    changed = [name for name, value in changes.items() if getattr(user, name) != value]
+    if changed:
+        for name in changed:
+            setattr(user, name, changes[name])
+        user.save(update_fields=[*changed, "updated_at"])
     return 200, _user_me_out(user)
 
 
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
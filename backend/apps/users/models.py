@@ -82,6 +82,8 @@ class User(AbstractBaseUser, PermissionsMixin):
         default=SubscriptionTier.FREE,
     )
     credits_balance = models.IntegerField(default=0)
+    # Bumped whenever profile data used by the AI changes (see apps.ai.profile_cache).
+    profile_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
@@ -1,7 +1,12 @@
-"""User-related business logic (e.g. forwarding address generation)."""
+"""User-related business logic (e.g. forwarding address generation, provider key encryption)."""
 
+import base64
+import hashlib
 import secrets
 
+from cryptography.fernet import Fernet
+from django.conf import settings
+
 from apps.users.models import User
 
 FORWARDING_DOMAIN = "havenjob.app"
@@ -19,3 +24,21 @@ def generate_forwarding_address() -> str:
         if not User.objects.filter(forwarding_address__iexact=address).exists():
             return address
     raise RuntimeError("Could not generate unique forwarding address")
+
+
+def _fernet() -> Fernet:
+    """Fernet for provider API keys: PROVIDER_KEY_ENCRYPTION_KEY, else derived from SECRET_KEY."""
+    key = getattr(settings, "PROVIDER_KEY_ENCRYPTION_KEY", "")
+    if not key:
+        key = base64.urlsafe_b64encode(hashlib.sha256(settings.SECRET_KEY.encode()).digest())
+    return Fernet(key)
+
+
+def encrypt_api_key(api_key: str) -> str:
+    """Encrypt a provider API key for UserProviderSettings.encrypted_api_key."""
+    return _fernet().encrypt(api_key.encode()).decode()
+
+
+def decrypt_api_key(token: str) -> str:
+    """Decrypt UserProviderSettings.encrypted_api_key. Raises cryptography.fernet.InvalidToken."""
+    return _fernet().decrypt(token.encode()).decode()
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_asgi_application()
+
+# Resubmit queued cover-letter jobs this process should run (see apps.ai.jobs).
+from apps.ai import jobs  # noqa: E402
+
+jobs.start_sweeper()
@@ -14,6 +14,8 @@ import os
 import sys
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -77,6 +79,10 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 CORS_ALLOW_CREDENTIALS = True
+# Page cursors of chat list endpoints (apps/ai/pagination.py).
+CORS_EXPOSE_HEADERS = ["X-Before-Cursor", "X-After-Cursor"]
+# Staff-only per-request LLM route overrides (apps/ai/task_routing.py OVERRIDE_HEADERS).
+CORS_ALLOW_HEADERS = [*default_headers, "x-llm-model", "x-llm-max-tokens", "x-llm-timeout"]
 
 TEMPLATES = [
     {
@@ -124,6 +130,166 @@ else:
     }
 
 
+# Caches
+# "llm" holds cached LLM responses (see apps/ai/llm_cache.py). LocMemCache evicts
+# least-recently-used entries once MAX_ENTRIES is reached; CULL_FREQUENCY equal
+# to MAX_ENTRIES evicts a single entry at a time. Point LLM_CACHE_BACKEND /
+# LLM_CACHE_LOCATION at a shared backend (e.g. Redis with an LRU maxmemory
+# policy) to share the cache between processes; those options are locmem-only.
+
+LOCMEM_CACHE_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+LLM_CACHE_BACKEND = os.environ.get("LLM_CACHE_BACKEND", LOCMEM_CACHE_BACKEND)
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "1000"))
+
+CACHES = {
+    "default": {
+        "BACKEND": LOCMEM_CACHE_BACKEND,
+    },
+    "llm": {
+        "BACKEND": LLM_CACHE_BACKEND,
+        "LOCATION": os.environ.get("LLM_CACHE_LOCATION", "llm-responses"),
+        "TIMEOUT": int(os.environ.get("LLM_CACHE_TTL", "86400")),
+    },
+}
+if LLM_CACHE_BACKEND == LOCMEM_CACHE_BACKEND:
+    CACHES["llm"]["OPTIONS"] = {
+        "MAX_ENTRIES": LLM_CACHE_MAX_ENTRIES,
+        "CULL_FREQUENCY": LLM_CACHE_MAX_ENTRIES,
+    }
+
+# LLM response cache (opt-in): endpoints listed here may be answered from the "llm"
+# cache when the same user sent an identical request (prompt, messages, model,
+# max_tokens) before, e.g. LLM_CACHE_ENDPOINTS=cover_letter,improve_answer.
+LLM_RESPONSE_CACHE = {
+    "ALIAS": "llm",
+    "TIMEOUT": int(os.environ.get("LLM_CACHE_TTL", "86400")),
+    "ENDPOINTS": [
+        e.strip()
+        for e in os.environ.get("LLM_CACHE_ENDPOINTS", "").split(",")
+        if e.strip()
+    ],
+}
+
+# Concurrent identical LLM requests share one upstream call (apps/ai/singleflight.py).
+LLM_SINGLE_FLIGHT_ENABLED = os.environ.get("LLM_SINGLE_FLIGHT", "1") != "0"
+
+# Admission control for upstream LLM calls (apps/ai/admission.py): token buckets
+# per user (by subscription tier) and per provider, with a short fair wait queue.
+# PROVIDERS sets limits for a named bucket, e.g. the one background chat
+# summaries (apps/ai/chat_memory.py) use instead of the user's.
+LLM_ADMISSION = {
+    "ENABLED": os.environ.get("LLM_ADMISSION", "1") != "0",
+    "MAX_WAIT_SECONDS": float(os.environ.get("LLM_ADMISSION_MAX_WAIT", "10")),
+    "MAX_QUEUE": int(os.environ.get("LLM_ADMISSION_MAX_QUEUE", "200")),
+    "TIERS": {
+        "free": {"rate_per_minute": 10, "burst": 5},
+        "credits": {"rate_per_minute": 30, "burst": 10},
+        "pro": {"rate_per_minute": 60, "burst": 20},
+    },
+    "PROVIDER": {
+        "rate_per_minute": float(os.environ.get("LLM_PROVIDER_RPM", "600")),
+        "burst": float(os.environ.get("LLM_PROVIDER_BURST", "60")),
+    },
+    "PROVIDERS": {
+        "chat_summary": {
+            "rate_per_minute": float(os.environ.get("LLM_SUMMARY_RPM", "60")),
+            "burst": float(os.environ.get("LLM_SUMMARY_BURST", "10")),
+        },
+    },
+}
+
+# Profiles cached for AI context, keyed by (user, profile_version) (apps/ai/profile_cache.py).
+PROFILE_CONTEXT_CACHE_SIZE = int(os.environ.get("PROFILE_CONTEXT_CACHE_SIZE", "1000"))
+
+# Chat grounding (apps/ai/retrieval.py): each turn sends the TOP_K profile chunks
+# (entries and CV windows of CHUNK_WORDS, overlapping by CHUNK_OVERLAP) ranked by
+# BM25 against the message, instead of the whole profile. What stays the same
+# across turns is then too short for prompt caching, so none is requested.
+LLM_RETRIEVAL = {
+    "ENABLED": os.environ.get("LLM_RETRIEVAL", "1") != "0",
+    "TOP_K": int(os.environ.get("LLM_RETRIEVAL_TOP_K", "6")),
+    "CHUNK_WORDS": int(os.environ.get("LLM_RETRIEVAL_CHUNK_WORDS", "120")),
+    "CHUNK_OVERLAP": int(os.environ.get("LLM_RETRIEVAL_CHUNK_OVERLAP", "30")),
+}
+
+# Long chat sessions (apps/ai/chat_memory.py): the last WINDOW_MESSAGES are sent
+# verbatim; once SUMMARY_BATCH more have built up, a background job (WORKERS
+# threads) folds the older ones, at most MAX_FOLD_MESSAGES per job, into the
+# session's rolling summary.
+LLM_CHAT_MEMORY = {
+    "ENABLED": os.environ.get("LLM_CHAT_SUMMARY", "1") != "0",
+    "WINDOW_MESSAGES": int(os.environ.get("LLM_CHAT_WINDOW_MESSAGES", "12")),
+    "SUMMARY_BATCH": int(os.environ.get("LLM_CHAT_SUMMARY_BATCH", "8")),
+    "MAX_FOLD_MESSAGES": int(os.environ.get("LLM_CHAT_SUMMARY_MAX_FOLD", "40")),
+    "WORKERS": int(os.environ.get("LLM_CHAT_SUMMARY_WORKERS", "2")),
+}
+
+# Queued cover letters (apps/ai/jobs.py). With IN_PROCESS, jobs run on WORKERS
+# threads of the web process, and every SWEEP_SECONDS it requeues jobs with no
+# heartbeat for STALE_SECONDS and picks up queued ones (after a restart, or put
+# back until admitted); `manage.py run_cover_letter_worker` does both in separate
+# processes. The SSE feed re-reads a job every POLL_SECONDS; progress is saved
+# every PROGRESS_INTERVAL.
+LLM_COVER_LETTER_JOBS = {
+    "IN_PROCESS": os.environ.get("LLM_JOBS_IN_PROCESS", "1") != "0",
+    "WORKERS": int(os.environ.get("LLM_JOBS_WORKERS", "4")),
+    "STALE_SECONDS": float(os.environ.get("LLM_JOBS_STALE_SECONDS", "600")),
+    "SWEEP_SECONDS": float(os.environ.get("LLM_JOBS_SWEEP_SECONDS", "30")),
+    "POLL_SECONDS": float(os.environ.get("LLM_JOBS_POLL_SECONDS", "1")),
+    "PROGRESS_INTERVAL": float(os.environ.get("LLM_JOBS_PROGRESS_INTERVAL", "0.5")),
+}
+
+# Bulk cover letters (POST /api/ai/cover-letter/bulk): at most MAX_ITEMS letters
+# per request, CONCURRENCY of them generated at once. Letters over the user's
+# admission budget (LLM_ADMISSION) are queued as cover-letter jobs instead.
+LLM_COVER_LETTER_BULK = {
+    "CONCURRENCY": int(os.environ.get("LLM_BULK_CONCURRENCY", "8")),
+    "MAX_ITEMS": int(os.environ.get("LLM_BULK_MAX_ITEMS", "50")),
+}
+
+# Task routing table (apps/ai/task_routing.py): model per provider, output
+# budget and deadline (seconds, retries included) for each AI task. TIERS
+# overrides a task per subscription tier, e.g.
+#     "TIERS": {"pro": {"cover_letter": {"models": {"openai": "gpt-4o"}}}}
+LLM_TASKS = {
+    "DEFAULT": {
+        "models": {
+            "openai": os.environ.get("LLM_OPENAI_MODEL", "gpt-4o-mini"),
+            "anthropic": os.environ.get("LLM_ANTHROPIC_MODEL", "claude-3-5-haiku-20241022"),
+        },
+        "max_tokens": 1024,
+        "timeout": 60,
+    },
+    "TASKS": {
+        "chat": {"max_tokens": 2048, "timeout": 120},
+        "cover_letter": {"max_tokens": 1024, "timeout": 90},
+        "improve_answer": {"max_tokens": 1024, "timeout": 45},
+        "title": {"max_tokens": 32, "timeout": 10},
+        "chat_summary": {"max_tokens": 512, "timeout": 60},
+        "extraction": {"max_tokens": 1024, "timeout": 30},
+    },
+    "TIERS": {},
+}
+
+# Streamed replies (apps/ai/streaming.py): deltas are coalesced into writes of up
+# to FLUSH_BYTES, sent at most FLUSH_MS after their first delta. SSE streams send
+# a heartbeat comment after HEARTBEAT_SECONDS without output.
+LLM_STREAMING = {
+    "FLUSH_BYTES": int(os.environ.get("LLM_STREAM_FLUSH_BYTES", "256")),
+    "FLUSH_MS": float(os.environ.get("LLM_STREAM_FLUSH_MS", "20")),
+    "HEARTBEAT_SECONDS": float(os.environ.get("LLM_SSE_HEARTBEAT_SECONDS", "15")),
+}
+
+# Bring-your-own-key LLM providers (apps/ai/user_providers.py). API keys in
+# UserProviderSettings are Fernet-encrypted with PROVIDER_KEY_ENCRYPTION_KEY
+# (derived from SECRET_KEY when unset). Decrypted providers are cached per user.
+PROVIDER_KEY_ENCRYPTION_KEY = os.environ.get("PROVIDER_KEY_ENCRYPTION_KEY", "")
+LLM_USER_PROVIDERS = {
+    "CACHE_SIZE": int(os.environ.get("LLM_USER_PROVIDER_CACHE_SIZE", "1000")),
+    "TTL_SECONDS": float(os.environ.get("LLM_USER_PROVIDER_TTL", "300")),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
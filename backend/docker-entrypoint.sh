@@ -2,4 +2,4 @@
 set -e
 uv run python manage.py migrate --noinput
 uv run python manage.py collectstatic --noinput --clear
-exec uv run gunicorn config.wsgi:application --bind 0.0.0.0:8000 --workers 1
+exec uv run gunicorn config.asgi:application --worker-class uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000 --workers 1
@@ -1,6 +1,7 @@
-"""LLM providers (OpenAI, Anthropic)."""
+"""LLM providers (OpenAI, Anthropic, a local fake) and the multi-provider router."""
 
-from providers.llm.base import LLMProvider
+from providers.llm.base import LLMProvider, SystemBlock
 from providers.llm.factory import get_llm
+from providers.llm.routing import RoutingProvider
 
-__all__ = ["LLMProvider", "get_llm"]
+__all__ = ["LLMProvider", "RoutingProvider", "SystemBlock", "get_llm"]
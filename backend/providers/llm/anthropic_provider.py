@@ -1,38 +1,100 @@
 """Anthropic LLM provider."""
 
 import os
-from collections.abc import Iterator
+from collections.abc import AsyncIterator, Iterator
 
-from providers.llm.base import LLMProvider
+from providers.llm import usage
+from providers.llm.base import LLMProvider, SystemPrompt
+from providers.llm.clients import (
+    build_async_http_client,
+    build_http_client,
+    get_async_client,
+    get_client,
+    request_options,
+)
 
 
 class AnthropicProvider(LLMProvider):
     """Anthropic Messages API (Claude)."""
 
+    name = "anthropic"
+
     def __init__(
         self,
         api_key: str | None = None,
         model: str = "claude-3-5-haiku-20241022",
+        base_url: str | None = None,
     ):
         self._api_key = api_key or os.environ.get("ANTHROPIC_API_KEY", "")
+        self._base_url = base_url or os.environ.get("ANTHROPIC_BASE_URL") or None
         self.model = model
 
-    def complete(
-        self,
-        messages: list[dict[str, str]],
-        *,
-        system_prompt: str | None = None,
-        max_tokens: int = 2048,
-    ) -> str:
+    def _client(self):
+        """Shared, pooled client for this provider's key and base URL."""
         import anthropic
 
-        client = anthropic.Anthropic(api_key=self._api_key or None)
-        response = client.messages.create(
-            model=self.model,
-            max_tokens=max_tokens,
-            system=system_prompt or "",
-            messages=messages,
+        return get_client(
+            "anthropic",
+            api_key=self._api_key,
+            base_url=self._base_url,
+            factory=lambda: anthropic.Anthropic(
+                api_key=self._api_key or None,
+                base_url=self._base_url,
+                http_client=build_http_client(),
+                max_retries=0,
+            ),
+        )
+
+    def _async_client(self):
+        """Shared, pooled async client for this provider on the running event loop."""
+        import anthropic
+
+        return get_async_client(
+            "anthropic",
+            api_key=self._api_key,
+            base_url=self._base_url,
+            factory=lambda: anthropic.AsyncAnthropic(
+                api_key=self._api_key or None,
+                base_url=self._base_url,
+                http_client=build_async_http_client(),
+                max_retries=0,
+            ),
         )
+
+    @staticmethod
+    def _system_param(system_prompt: SystemPrompt | None):
+        """
+        Anthropic system parameter. Blocks marked cache=True get an ephemeral
+        cache_control breakpoint, so the prefix up to them is served from the
+        prompt cache on later calls instead of being re-processed.
+        """
+        if not system_prompt:
+            return ""
+        if isinstance(system_prompt, str):
+            return system_prompt
+        blocks = []
+        for block in system_prompt:
+            if not block.text:
+                continue
+            param = {"type": "text", "text": block.text}
+            if block.cache:
+                param["cache_control"] = {"type": "ephemeral"}
+            blocks.append(param)
+        return blocks
+
+    def _record_usage(self, response_usage) -> None:
+        if response_usage is None:
+            return
+        usage.record(
+            self.model,
+            input_tokens=getattr(response_usage, "input_tokens", 0),
+            output_tokens=getattr(response_usage, "output_tokens", 0),
+            cache_read_tokens=getattr(response_usage, "cache_read_input_tokens", 0),
+            cache_write_tokens=getattr(response_usage, "cache_creation_input_tokens", 0),
+        )
+
+    @staticmethod
+    def _response_text(response) -> str:
         if not response.content:
             return ""
         text_parts = [
@@ -42,22 +104,78 @@ class AnthropicProvider(LLMProvider):
         ]
         return "".join(text_parts).strip()
 
+    def complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        client = self._client()
+        response = client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            system=self._system_param(system_prompt),
+            messages=messages,
+            **request_options(),
+        )
+        self._record_usage(getattr(response, "usage", None))
+        return self._response_text(response)
+
     def stream_complete(
         self,
         messages: list[dict[str, str]],
         *,
-        system_prompt: str | None = None,
+        system_prompt: SystemPrompt | None = None,
         max_tokens: int = 2048,
     ) -> Iterator[str]:
-        import anthropic
-
-        client = anthropic.Anthropic(api_key=self._api_key or None)
+        client = self._client()
         with client.messages.stream(
             model=self.model,
             max_tokens=max_tokens,
-            system=system_prompt or "",
+            system=self._system_param(system_prompt),
             messages=messages,
+            **request_options(),
         ) as stream:
             for text in stream.text_stream:
                 if text:
                     yield text
+            self._record_usage(stream.get_final_message().usage)
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        client = self._async_client()
+        response = await client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            system=self._system_param(system_prompt),
+            messages=messages,
+            **request_options(),
+        )
+        self._record_usage(getattr(response, "usage", None))
+        return self._response_text(response)
+
+    async def astream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> AsyncIterator[str]:
+        client = self._async_client()
+        async with client.messages.stream(
+            model=self.model,
+            max_tokens=max_tokens,
+            system=self._system_param(system_prompt),
+            messages=messages,
+            **request_options(),
+        ) as stream:
+            async for text in stream.text_stream:
+                if text:
+                    yield text
+            self._record_usage((await stream.get_final_message()).usage)
@@ -1,7 +1,38 @@
 """Abstract base for LLM providers."""
 
+import asyncio
 from abc import ABC, abstractmethod
-from collections.abc import Iterator
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+
+_STREAM_DONE = object()
+
+
+@dataclass(frozen=True)
+class SystemBlock:
+    """
+    One part of a structured system prompt.
+
+    cache=True marks the end of a stable prefix (e.g. profile context) that
+    providers supporting prompt caching may reuse across calls. Put stable
+    blocks first and per-request content after them.
+    """
+
+    text: str
+    cache: bool = False
+
+
+# A system prompt is plain text or a list of blocks.
+SystemPrompt = str | list[SystemBlock]
+
+
+def system_text(system_prompt: SystemPrompt | None) -> str:
+    """Flatten a system prompt to plain text (for providers without block support)."""
+    if not system_prompt:
+        return ""
+    if isinstance(system_prompt, str):
+        return system_prompt
+    return "\n\n".join(block.text for block in system_prompt if block.text)
 
 
 class LLMProvider(ABC):
@@ -12,7 +43,7 @@ class LLMProvider(ABC):
         self,
         messages: list[dict[str, str]],
         *,
-        system_prompt: str | None = None,
+        system_prompt: SystemPrompt | None = None,
         max_tokens: int = 2048,
     ) -> str:
         """
@@ -20,7 +51,8 @@ class LLMProvider(ABC):
 
         Args:
             messages: List of {"role": "user"|"assistant"|"system", "content": "..."}.
-            system_prompt: Optional system instruction (prepended or sent as system).
+            system_prompt: Optional system instruction (prepended or sent as system);
+                plain text or a list of SystemBlock with cacheable prefixes marked.
             max_tokens: Maximum tokens in the response.
 
         Returns:
@@ -32,7 +64,7 @@ class LLMProvider(ABC):
         self,
         messages: list[dict[str, str]],
         *,
-        system_prompt: str | None = None,
+        system_prompt: SystemPrompt | None = None,
         max_tokens: int = 2048,
     ) -> Iterator[str]:
         """
@@ -46,3 +78,53 @@ class LLMProvider(ABC):
         )
         if full:
             yield full
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        """
+        Async variant of complete().
+        Default implementation runs complete() in a worker thread; providers with
+        an async SDK should override it so no thread is held while waiting.
+        """
+        return await asyncio.to_thread(
+            self.complete,
+            messages,
+            system_prompt=system_prompt,
+            max_tokens=max_tokens,
+        )
+
+    async def astream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> AsyncIterator[str]:
+        """
+        Async variant of stream_complete().
+        Default implementation pulls each chunk of stream_complete() in a worker thread.
+        """
+        iterator = self.stream_complete(
+            messages,
+            system_prompt=system_prompt,
+            max_tokens=max_tokens,
+        )
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, iterator, _STREAM_DONE)
+                if chunk is _STREAM_DONE:
+                    break
+                yield chunk
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except ValueError:
+                    # Cancelled while a worker thread is still inside next().
+                    pass
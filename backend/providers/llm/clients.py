@@ -0,0 +1,174 @@
+"""Shared, pooled LLM SDK clients."""
+
+import asyncio
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE = 20
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_TIMEOUT = 600.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_CLIENT_CACHE_SIZE = 32
+
+# Timeout for the SDK request being made, set per attempt by providers.llm.resilience.
+_request_timeout: ContextVar[float | None] = ContextVar("llm_request_timeout", default=None)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _httpx_options() -> dict[str, Any]:
+    """Connection limits and timeouts shared by sync and async HTTP clients."""
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=_env_int("LLM_HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS),
+            max_keepalive_connections=_env_int("LLM_HTTP_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE),
+            keepalive_expiry=_env_float("LLM_HTTP_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY),
+        ),
+        "timeout": httpx.Timeout(
+            _env_float("LLM_HTTP_TIMEOUT", DEFAULT_TIMEOUT),
+            connect=_env_float("LLM_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT),
+        ),
+    }
+
+
+def build_http_client():
+    """Return a pooled ``httpx.Client`` sized from the LLM_HTTP_* env knobs."""
+    import httpx
+
+    return httpx.Client(**_httpx_options())
+
+
+def build_async_http_client():
+    """Return a pooled ``httpx.AsyncClient`` sized from the LLM_HTTP_* env knobs."""
+    import httpx
+
+    return httpx.AsyncClient(**_httpx_options())
+
+
+class ClientRegistry:
+    """
+    Thread-safe, size-bounded (LRU) cache of SDK clients.
+
+    Evicted clients are dropped rather than closed, since another thread may
+    still be streaming through them; their pools are released once unreferenced.
+    """
+
+    def __init__(self, max_clients: int | None = None):
+        self._max_clients = max_clients
+        self._clients: OrderedDict[tuple, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_clients(self) -> int:
+        if self._max_clients is not None:
+            return self._max_clients
+        return max(1, _env_int("LLM_CLIENT_CACHE_SIZE", DEFAULT_CLIENT_CACHE_SIZE))
+
+    @staticmethod
+    def make_key(provider: str, api_key: str | None, base_url: str | None, *extra) -> tuple:
+        """Registry key; the API key is hashed so it is not held in key tuples."""
+        key_digest = hashlib.sha256((api_key or "").encode()).hexdigest()
+        return (provider, key_digest, base_url or "", *extra)
+
+    def get(self, key: tuple, factory: Callable[[], Any]) -> Any:
+        """Return the client for key, creating it with factory on first use."""
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+            client = factory()
+            self._clients[key] = client
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return client
+
+    def clear(self) -> None:
+        """Drop and close every registered client (e.g. on shutdown or in tests)."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            close = getattr(client, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    pass
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+registry = ClientRegistry()
+
+
+def get_client(
+    provider: str,
+    *,
+    api_key: str | None,
+    base_url: str | None = None,
+    factory: Callable[[], Any],
+) -> Any:
+    """Return the shared client for (provider, api_key, base_url)."""
+    return registry.get(ClientRegistry.make_key(provider, api_key, base_url), factory)
+
+
+_async_registries: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ClientRegistry]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_registries_lock = threading.Lock()
+
+
+def get_async_client(
+    provider: str,
+    *,
+    api_key: str | None,
+    base_url: str | None = None,
+    factory: Callable[[], Any],
+) -> Any:
+    """Return the shared async client for (provider, api_key, base_url) on the running loop."""
+    loop = asyncio.get_running_loop()
+    with _async_registries_lock:
+        loop_registry = _async_registries.get(loop)
+        if loop_registry is None:
+            loop_registry = _async_registries[loop] = ClientRegistry()
+    return loop_registry.get(ClientRegistry.make_key(provider, api_key, base_url), factory)
+
+
+@contextmanager
+def request_timeout(seconds: float | None) -> Iterator[None]:
+    """Bound SDK requests made inside the block to seconds (instead of LLM_HTTP_TIMEOUT)."""
+    token = _request_timeout.set(seconds)
+    try:
+        yield
+    finally:
+        _request_timeout.reset(token)
+
+
+def request_options() -> dict[str, Any]:
+    """Per-request SDK options: the timeout set by request_timeout(), if any."""
+    seconds = _request_timeout.get()
+    return {} if seconds is None else {"timeout": seconds}
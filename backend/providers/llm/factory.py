@@ -1,14 +1,25 @@
 """Factory to get the configured LLM provider."""
 
 import os
+from collections.abc import Mapping
 
 from providers.llm.anthropic_provider import AnthropicProvider
 from providers.llm.base import LLMProvider
+from providers.llm.fake_provider import FakeProvider
 from providers.llm.openai_provider import OpenAIProvider
+from providers.llm.routing import RoutingProvider
 
 PROVIDERS: dict[str, type[LLMProvider]] = {
     "openai": OpenAIProvider,
     "anthropic": AnthropicProvider,
+    "router": RoutingProvider,
+    "fake": FakeProvider,
+}
+
+DEFAULT_MODELS: dict[str, str] = {
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-5-haiku-20241022",
+    "fake": "fake-1",
 }
 
 
@@ -17,22 +28,35 @@ def get_llm(
     *,
     api_key: str | None = None,
     model: str | None = None,
+    base_url: str | None = None,
+    models: Mapping[str, str] | None = None,
 ) -> LLMProvider:
     """
     Return the configured LLM provider instance.
 
     Args:
-        provider: "openai" or "anthropic". Defaults to env LLM_PROVIDER or "openai".
+        provider: "openai", "anthropic", "router" or "fake". Defaults to env LLM_PROVIDER or "openai".
+            "router" wraps the providers named in LLM_ROUTER_PROVIDERS (see providers.llm.routing).
+            "fake" is a local deterministic stand-in for benchmarks (see providers.llm.fake_provider).
         api_key: Override API key (otherwise from OPENAI_API_KEY / ANTHROPIC_API_KEY).
         model: Optional model name override.
+        base_url: Optional API base URL (otherwise from OPENAI_BASE_URL / ANTHROPIC_BASE_URL).
+        models: Optional model per provider name (e.g. from a task routing table); used when
+            model is not given, and passed on to the router's providers.
 
     Returns:
         LLMProvider instance.
+
+    Raises:
+        ValueError: if the provider name is not registered in PROVIDERS.
     """
     name = (provider or os.environ.get("LLM_PROVIDER", "openai")).lower()
     if name not in PROVIDERS:
-        name = "openai"
+        raise ValueError(
+            f"Unknown LLM provider {name!r}; expected one of {', '.join(sorted(PROVIDERS))}"
+        )
     cls = PROVIDERS[name]
-    if name == "openai":
-        return cls(api_key=api_key, model=model or "gpt-4o-mini")
-    return cls(api_key=api_key, model=model or "claude-3-5-haiku-20241022")
+    if cls is RoutingProvider:
+        return RoutingProvider.from_env(lambda child: get_llm(child, models=models))
+    model = model or (models or {}).get(name) or DEFAULT_MODELS.get(name)
+    return cls(api_key=api_key, model=model, base_url=base_url)
@@ -0,0 +1,156 @@
+"""Deterministic local fake LLM provider (LLM_PROVIDER=fake)."""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections.abc import AsyncIterator, Iterator
+
+from providers.llm import usage
+from providers.llm.base import LLMProvider, SystemPrompt, system_text
+from providers.llm.tokens import count_tokens
+
+WORDS = (
+    "experience team project delivered results impact customers product design "
+    "engineering data growth led built improved reduced scaled launched platform "
+    "role skills strong background collaboration ownership quality performance "
+    "analysis strategy stakeholders roadmap system service reliable clear goals"
+).split()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class FakeProviderError(Exception):
+    """Injected failure; status_code makes it look like a transient vendor error."""
+
+    status_code = 503
+
+
+class FakeProvider(LLMProvider):
+    """Local stand-in for a vendor: deterministic text, simulated latency."""
+
+    name = "fake"
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        model: str = "fake-1",
+        base_url: str | None = None,
+        *,
+        ttft_ms: float | None = None,
+        tokens_per_sec: float | None = None,
+        chunk_tokens: int | None = None,
+        output_tokens: int | None = None,
+        error_rate: float | None = None,
+    ):
+        self.model = model
+        self.ttft = (ttft_ms if ttft_ms is not None else _env_float("LLM_FAKE_TTFT_MS", 200)) / 1000
+        self.tokens_per_sec = (
+            tokens_per_sec if tokens_per_sec is not None else _env_float("LLM_FAKE_TOKENS_PER_SEC", 50)
+        )
+        self.chunk_tokens = max(1, chunk_tokens or int(_env_float("LLM_FAKE_CHUNK_TOKENS", 1)))
+        self.output_tokens = output_tokens or int(_env_float("LLM_FAKE_OUTPUT_TOKENS", 200))
+        self.error_rate = error_rate if error_rate is not None else _env_float("LLM_FAKE_ERROR_RATE", 0)
+
+    def _tokens(
+        self,
+        messages: list[dict[str, str]],
+        system_prompt: SystemPrompt | None,
+        max_tokens: int,
+    ) -> list[str]:
+        """Reply tokens, seeded by a hash of the full request."""
+        payload = json.dumps(
+            [self.model, system_text(system_prompt), messages, max_tokens],
+            sort_keys=True,
+            default=str,
+        )
+        seed = int.from_bytes(hashlib.sha256(payload.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        count = min(self.output_tokens, max_tokens)
+        return [rng.choice(WORDS) + " " for _ in range(count)]
+
+    def _chunks(self, tokens: list[str]) -> list[str]:
+        size = self.chunk_tokens
+        return ["".join(tokens[i:i + size]) for i in range(0, len(tokens), size)]
+
+    def _chunk_delay(self) -> float:
+        return self.chunk_tokens / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate > 0 and random.random() < self.error_rate:
+            raise FakeProviderError("Fake provider injected failure (503)")
+
+    def _record_usage(self, messages, system_prompt, tokens: list[str]) -> None:
+        prompt = system_text(system_prompt) + "".join(m.get("content", "") for m in messages)
+        usage.record(
+            self.model,
+            input_tokens=count_tokens(prompt),
+            output_tokens=len(tokens),
+        )
+
+    def complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        tokens = self._tokens(messages, system_prompt, max_tokens)
+        time.sleep(self.ttft)
+        self._maybe_fail()
+        time.sleep(self._chunk_delay() * max(len(self._chunks(tokens)) - 1, 0))
+        self._record_usage(messages, system_prompt, tokens)
+        return "".join(tokens).strip()
+
+    def stream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> Iterator[str]:
+        tokens = self._tokens(messages, system_prompt, max_tokens)
+        time.sleep(self.ttft)
+        self._maybe_fail()
+        for i, chunk in enumerate(self._chunks(tokens)):
+            if i:
+                time.sleep(self._chunk_delay())
+            yield chunk
+        self._record_usage(messages, system_prompt, tokens)
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        tokens = self._tokens(messages, system_prompt, max_tokens)
+        await asyncio.sleep(self.ttft)
+        self._maybe_fail()
+        await asyncio.sleep(self._chunk_delay() * max(len(self._chunks(tokens)) - 1, 0))
+        self._record_usage(messages, system_prompt, tokens)
+        return "".join(tokens).strip()
+
+    async def astream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> AsyncIterator[str]:
+        tokens = self._tokens(messages, system_prompt, max_tokens)
+        await asyncio.sleep(self.ttft)
+        self._maybe_fail()
+        for i, chunk in enumerate(self._chunks(tokens)):
+            if i:
+                await asyncio.sleep(self._chunk_delay())
+            yield chunk
+        self._record_usage(messages, system_prompt, tokens)
@@ -0,0 +1,323 @@
+"""In-process metrics for LLM calls."""
+
+import asyncio
+import bisect
+import threading
+import time
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+
+from providers.llm import usage
+from providers.llm.base import LLMProvider, SystemPrompt
+from providers.llm.tokens import count_tokens
+from providers.llm.usage import Usage
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+RATE_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_CANCELLED = "cancelled"
+
+# USD per million tokens: (input, output). Cache reads and writes are priced
+# relative to input using each vendor's multipliers.
+PRICES_PER_MTOK: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-sonnet-4": (3.00, 15.00),
+    "claude-3-haiku": (0.25, 1.25),
+}
+CACHE_READ_MULTIPLIER = {"anthropic": 0.1, "openai": 0.5}
+CACHE_WRITE_MULTIPLIER = {"anthropic": 1.25}
+
+
+def estimate_cost(provider: str, model: str | None, used: Usage) -> float | None:
+    """Estimated USD cost of used for model; None when the model is not priced."""
+    if not model:
+        return None
+    matches = [prefix for prefix in PRICES_PER_MTOK if model.startswith(prefix)]
+    if not matches:
+        return None
+    price_in, price_out = PRICES_PER_MTOK[max(matches, key=len)]
+    cached = used.cache_read_tokens
+    # OpenAI counts cached tokens inside prompt_tokens; Anthropic reports them separately.
+    uncached = used.input_tokens - cached if provider == "openai" else used.input_tokens
+    cost = (
+        max(uncached, 0) * price_in
+        + cached * price_in * CACHE_READ_MULTIPLIER.get(provider, 1.0)
+        + used.cache_write_tokens * price_in * CACHE_WRITE_MULTIPLIER.get(provider, 1.0)
+        + used.output_tokens * price_out
+    )
+    return cost / 1_000_000
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum, min and max."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate by linear interpolation within the bucket holding the q-th value."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else (self.min or 0.0)
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                estimate = lower + (upper - lower) * ((rank - seen) / n)
+                return min(max(estimate, self.min), self.max)
+            seen += n
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else None,
+            "min": self.min,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class _Series:
+    def __init__(self):
+        self.ttft = Histogram(LATENCY_BUCKETS)
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.tokens_per_second = Histogram(RATE_BUCKETS)
+        self.usage = Usage()
+        self.cost_usd = 0.0
+        # max_tokens minus tokens generated, over cancelled streams: an upper
+        # bound on the tokens not paid for, not an estimate of them.
+        self.aborted_unused_budget = 0
+
+
+_series: dict[tuple[str, str, str, str, str], _Series] = defaultdict(_Series)
+_lock = threading.Lock()
+
+
+def observe_call(
+    *,
+    provider: str,
+    model: str | None,
+    endpoint: str | None,
+    outcome: str,
+    variant: str = "default",
+    latency: float,
+    ttft: float | None,
+    output_tokens: int,
+    used: Usage,
+    unused_budget: int = 0,
+) -> None:
+    """Record one finished (or failed / cancelled) upstream call."""
+    key = (provider, model or "unknown", endpoint or "unknown", variant, outcome)
+    generation = latency - (ttft or 0.0)
+    cost = estimate_cost(provider, model, used)
+    with _lock:
+        series = _series[key]
+        series.latency.observe(latency)
+        if ttft is not None:
+            series.ttft.observe(ttft)
+        if output_tokens and generation > 0:
+            series.tokens_per_second.observe(output_tokens / generation)
+        series.usage.add(used)
+        if cost is not None:
+            series.cost_usd += cost
+        series.aborted_unused_budget += unused_budget
+
+
+def snapshot() -> list[dict[str, Any]]:
+    """All series with their labels, histograms, token usage and cost."""
+    with _lock:
+        return [
+            {
+                "provider": provider,
+                "model": model,
+                "endpoint": endpoint,
+                "variant": variant,
+                "outcome": outcome,
+                "ttft_seconds": s.ttft.snapshot(),
+                "latency_seconds": s.latency.snapshot(),
+                "output_tokens_per_second": s.tokens_per_second.snapshot(),
+                "usage": s.usage.as_dict(),
+                "cost_usd": round(s.cost_usd, 6),
+                "aborted_unused_budget": s.aborted_unused_budget,
+            }
+            for (provider, model, endpoint, variant, outcome), s in sorted(_series.items())
+        ]
+
+
+def reset() -> None:
+    with _lock:
+        _series.clear()
+
+
+class _Call:
+    """Timing and usage of one call in progress."""
+
+    def __init__(self, provider: "InstrumentedProvider", max_tokens: int):
+        self.provider = provider
+        self.max_tokens = max_tokens
+        self.started = time.perf_counter()
+        self.ttft: float | None = None
+        self.used = Usage()
+        self.chars = 0
+
+    def chunk(self, text: str) -> None:
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+        self.chars += len(text)
+
+    def finish(self, outcome: str, text: str | None = None) -> None:
+        latency = time.perf_counter() - self.started
+        if text is not None:
+            self.ttft = latency
+        output_tokens = self.used.output_tokens
+        if not output_tokens and (text or self.chars):
+            # Provider reported no usage: estimate from the text we saw.
+            output_tokens = count_tokens("x" * self.chars if text is None else text)
+        unused_budget = 0
+        if outcome == OUTCOME_CANCELLED and text is None:
+            unused_budget = max(self.max_tokens - output_tokens, 0)
+        observe_call(
+            provider=self.provider.name,
+            model=self.provider.model,
+            endpoint=self.provider.endpoint,
+            outcome=outcome,
+            variant=self.provider.variant,
+            latency=latency,
+            ttft=self.ttft,
+            output_tokens=output_tokens,
+            used=self.used,
+            unused_budget=unused_budget,
+        )
+
+
+def _outcome(exc: BaseException) -> str:
+    if isinstance(exc, (GeneratorExit, asyncio.CancelledError, KeyboardInterrupt)):
+        return OUTCOME_CANCELLED
+    return OUTCOME_ERROR
+
+
+class InstrumentedProvider(LLMProvider):
+    """Wraps a provider and records latency, TTFT, throughput, usage and cost."""
+
+    def __init__(
+        self,
+        inner: LLMProvider,
+        *,
+        endpoint: str | None = None,
+        name: str | None = None,
+        variant: str = "default",
+    ):
+        self.inner = inner
+        self.endpoint = endpoint
+        self.variant = variant
+        name = name or getattr(inner, "name", None)
+        model = getattr(inner, "model", None)
+        self.name = name if isinstance(name, str) else type(inner).__name__.lower()
+        self.model = model if isinstance(model, str) else None
+
+    def complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        call = _Call(self, max_tokens)
+        try:
+            with usage.collect(call.used):
+                text = self.inner.complete(
+                    messages, system_prompt=system_prompt, max_tokens=max_tokens
+                )
+        except BaseException as exc:
+            call.finish(_outcome(exc))
+            raise
+        call.finish(OUTCOME_OK, text)
+        return text
+
+    def stream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> Iterator[str]:
+        call = _Call(self, max_tokens)
+        stream = usage.track(
+            self.inner.stream_complete(messages, system_prompt=system_prompt, max_tokens=max_tokens),
+            call.used,
+        )
+        try:
+            for chunk in stream:
+                call.chunk(chunk)
+                yield chunk
+        except BaseException as exc:
+            stream.close()
+            call.finish(_outcome(exc))
+            raise
+        call.finish(OUTCOME_OK)
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        call = _Call(self, max_tokens)
+        try:
+            with usage.collect(call.used):
+                text = await self.inner.acomplete(
+                    messages, system_prompt=system_prompt, max_tokens=max_tokens
+                )
+        except BaseException as exc:
+            call.finish(_outcome(exc))
+            raise
+        call.finish(OUTCOME_OK, text)
+        return text
+
+    async def astream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> AsyncIterator[str]:
+        call = _Call(self, max_tokens)
+        stream = usage.atrack(
+            self.inner.astream_complete(messages, system_prompt=system_prompt, max_tokens=max_tokens),
+            call.used,
+        )
+        try:
+            async for chunk in stream:
+                call.chunk(chunk)
+                yield chunk
+        except BaseException as exc:
+            await stream.aclose()
+            call.finish(_outcome(exc))
+            raise
+        call.finish(OUTCOME_OK)
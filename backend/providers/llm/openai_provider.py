@@ -1,41 +1,106 @@
 """OpenAI LLM provider."""
 
 import os
-from collections.abc import Iterator
+from collections.abc import AsyncIterator, Iterator
 
-from providers.llm.base import LLMProvider
+from providers.llm import usage
+from providers.llm.base import LLMProvider, SystemPrompt, system_text
+from providers.llm.clients import (
+    build_async_http_client,
+    build_http_client,
+    get_async_client,
+    get_client,
+    request_options,
+)
 
 
 class OpenAIProvider(LLMProvider):
     """OpenAI chat completions (GPT)."""
 
+    name = "openai"
+
     def __init__(
         self,
         api_key: str | None = None,
         model: str = "gpt-4o-mini",
+        base_url: str | None = None,
     ):
         self._api_key = api_key or os.environ.get("OPENAI_API_KEY", "")
+        self._base_url = base_url or os.environ.get("OPENAI_BASE_URL") or None
         self.model = model
 
+    def _client(self):
+        """Shared, pooled client for this provider's key and base URL."""
+        from openai import OpenAI
+
+        return get_client(
+            "openai",
+            api_key=self._api_key,
+            base_url=self._base_url,
+            factory=lambda: OpenAI(
+                api_key=self._api_key or None,
+                base_url=self._base_url,
+                http_client=build_http_client(),
+                max_retries=0,
+            ),
+        )
+
+    def _async_client(self):
+        """Shared, pooled async client for this provider on the running event loop."""
+        from openai import AsyncOpenAI
+
+        return get_async_client(
+            "openai",
+            api_key=self._api_key,
+            base_url=self._base_url,
+            factory=lambda: AsyncOpenAI(
+                api_key=self._api_key or None,
+                base_url=self._base_url,
+                http_client=build_async_http_client(),
+                max_retries=0,
+            ),
+        )
+
+    @staticmethod
+    def _build_messages(
+        messages: list[dict[str, str]],
+        system_prompt: SystemPrompt | None,
+    ) -> list[dict[str, str]]:
+        # OpenAI caches long stable prompt prefixes automatically; blocks are
+        # flattened in order, so cacheable ones still lead the prompt.
+        full_messages: list[dict[str, str]] = []
+        if system_prompt:
+            full_messages.append({"role": "system", "content": system_text(system_prompt)})
+        full_messages.extend(messages)
+        return full_messages
+
+    def _record_usage(self, response_usage) -> None:
+        if response_usage is None:
+            return
+        details = getattr(response_usage, "prompt_tokens_details", None)
+        usage.record(
+            self.model,
+            input_tokens=getattr(response_usage, "prompt_tokens", 0),
+            output_tokens=getattr(response_usage, "completion_tokens", 0),
+            cache_read_tokens=getattr(details, "cached_tokens", 0) if details else 0,
+        )
+
     def complete(
         self,
         messages: list[dict[str, str]],
         *,
-        system_prompt: str | None = None,
+        system_prompt: SystemPrompt | None = None,
         max_tokens: int = 2048,
     ) -> str:
-        from openai import OpenAI
-
-        client = OpenAI(api_key=self._api_key or None)
-        full_messages: list[dict[str, str]] = []
-        if system_prompt:
-            full_messages.append({"role": "system", "content": system_prompt})
-        full_messages.extend(messages)
+        client = self._client()
+        full_messages = self._build_messages(messages, system_prompt)
         response = client.chat.completions.create(
             model=self.model,
             messages=full_messages,
+            **request_options(),
             max_tokens=max_tokens,
         )
+        self._record_usage(getattr(response, "usage", None))
         choice = response.choices[0] if response.choices else None
         if not choice or not choice.message:
             return ""
@@ -45,22 +110,66 @@ class OpenAIProvider(LLMProvider):
         self,
         messages: list[dict[str, str]],
         *,
-        system_prompt: str | None = None,
+        system_prompt: SystemPrompt | None = None,
         max_tokens: int = 2048,
     ) -> Iterator[str]:
-        from openai import OpenAI
-
-        client = OpenAI(api_key=self._api_key or None)
-        full_messages: list[dict[str, str]] = []
-        if system_prompt:
-            full_messages.append({"role": "system", "content": system_prompt})
-        full_messages.extend(messages)
+        client = self._client()
+        full_messages = self._build_messages(messages, system_prompt)
         stream = client.chat.completions.create(
             model=self.model,
             messages=full_messages,
+            **request_options(),
             max_tokens=max_tokens,
             stream=True,
+            stream_options={"include_usage": True},
         )
         for chunk in stream:
             if chunk.choices and chunk.choices[0].delta.content:
                 yield chunk.choices[0].delta.content
+            elif getattr(chunk, "usage", None) is not None:
+                self._record_usage(chunk.usage)
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        client = self._async_client()
+        response = await client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(messages, system_prompt),
+            **request_options(),
+            max_tokens=max_tokens,
+        )
+        self._record_usage(getattr(response, "usage", None))
+        choice = response.choices[0] if response.choices else None
+        if not choice or not choice.message:
+            return ""
+        return (choice.message.content or "").strip()
+
+    async def astream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> AsyncIterator[str]:
+        client = self._async_client()
+        stream = await client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(messages, system_prompt),
+            **request_options(),
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                elif getattr(chunk, "usage", None) is not None:
+                    self._record_usage(chunk.usage)
+        finally:
+            await stream.close()
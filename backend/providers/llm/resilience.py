@@ -0,0 +1,476 @@
+"""Retries, backoff and circuit breaking for LLM providers."""
+
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterator
+
+from providers.llm.base import LLMProvider, SystemPrompt
+from providers.llm.clients import request_timeout
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit for LLM provider {name!r} is open; retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an LLM call runs out of its total time budget."""
+
+
+# SDK exception classes for timeouts and dropped connections, matched by name so
+# classifying an error never imports a vendor SDK (slow, and blocking on an event loop).
+_TRANSIENT_SDK_ERRORS = {
+    ("openai", "APITimeoutError"),
+    ("openai", "APIConnectionError"),
+    ("anthropic", "APITimeoutError"),
+    ("anthropic", "APIConnectionError"),
+}
+
+
+def _is_transient_exception(exc: BaseException) -> bool:
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return any(
+        (cls.__module__.split(".", 1)[0], cls.__name__) in _TRANSIENT_SDK_ERRORS
+        for cls in type(exc).__mro__
+    )
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for rate limits, server errors, timeouts and connection failures."""
+    if isinstance(exc, (CircuitOpenError, DeadlineExceeded)):
+        return False
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return _is_transient_exception(exc)
+
+
+def is_unavailable(exc: BaseException) -> bool:
+    """True when exc means the provider is temporarily unavailable (retries exhausted)."""
+    return isinstance(exc, (CircuitOpenError, DeadlineExceeded)) or is_retryable(exc)
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    """Server-requested delay from retry-after-ms / retry-after headers, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        if parsed is None:
+            return None
+        return max(0.0, parsed.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Attempt count, backoff bounds and total deadline for one call."""
+
+    def __init__(
+        self,
+        max_attempts: int | None = None,
+        base_delay: float | None = None,
+        max_delay: float | None = None,
+        deadline: float | None = None,
+    ):
+        self.max_attempts = max_attempts or int(_env_float("LLM_RETRY_MAX_ATTEMPTS", 3))
+        self.base_delay = (
+            base_delay if base_delay is not None else _env_float("LLM_RETRY_BASE_DELAY_MS", 500) / 1000
+        )
+        self.max_delay = (
+            max_delay if max_delay is not None else _env_float("LLM_RETRY_MAX_DELAY_MS", 8000) / 1000
+        )
+        self.deadline = (
+            deadline if deadline is not None else _env_float("LLM_CALL_DEADLINE_MS", 120000) / 1000
+        )
+
+    def backoff(self, attempt: int, exc: BaseException) -> float:
+        """Delay before retry number attempt (1-based): Retry-After, else full jitter."""
+        requested = retry_after_seconds(exc)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int | None = None,
+        reset_timeout: float | None = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(
+            _env_float("LLM_BREAKER_FAILURE_THRESHOLD", 5)
+        )
+        self.reset_timeout = (
+            reset_timeout if reset_timeout is not None else _env_float("LLM_BREAKER_RESET_SECONDS", 30)
+        )
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == STATE_OPEN and elapsed >= self.reset_timeout:
+                self.state = STATE_HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(self.name, max(0.0, self.reset_timeout - elapsed))
+
+    def release(self) -> None:
+        """Give back a call that ended without an outcome (cancelled), freeing the half-open probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = STATE_CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    self.times_opened += 1
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+            }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_counters: dict[str, dict[str, int]] = defaultdict(
+    lambda: {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+)
+_counters_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide circuit breaker for a provider."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def _count(name: str, field: str) -> None:
+    with _counters_lock:
+        _counters[name][field] += 1
+
+
+def resilience_snapshot() -> dict[str, dict]:
+    """Breaker state and call/retry/failure counters per provider (for monitoring)."""
+    with _breakers_lock:
+        breakers = {name: b.snapshot() for name, b in _breakers.items()}
+    with _counters_lock:
+        counters = {name: dict(c) for name, c in _counters.items()}
+    return {
+        name: {**counters.get(name, {}), "breaker": breakers.get(name)}
+        for name in sorted(set(breakers) | set(counters))
+    }
+
+
+def reset_resilience_state() -> None:
+    """Forget breakers and counters (tests)."""
+    with _breakers_lock:
+        _breakers.clear()
+    with _counters_lock:
+        _counters.clear()
+
+
+class ResilientProvider(LLMProvider):
+    """Wraps a provider with retries, a total deadline and a circuit breaker."""
+
+    def __init__(
+        self,
+        inner: LLMProvider,
+        *,
+        name: str | None = None,
+        policy: RetryPolicy | None = None,
+    ):
+        self.inner = inner
+        self.name = name or getattr(inner, "name", None) or type(inner).__name__.lower()
+        self.policy = policy or RetryPolicy()
+        self.model = getattr(inner, "model", None)
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return get_breaker(self.name)
+
+    def _attempt_started(self) -> None:
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            _count(self.name, "rejected")
+            raise
+        _count(self.name, "calls")
+
+    def _should_retry(self, exc: BaseException, attempt: int, deadline: float) -> float | None:
+        """Record the failure; return the backoff delay if another attempt is allowed."""
+        if not is_retryable(exc):
+            # Client errors say nothing about the endpoint's health either way.
+            self.breaker.release()
+            return None
+        self.breaker.record_failure()
+        _count(self.name, "failures")
+        if attempt >= self.policy.max_attempts:
+            return None
+        delay = self.policy.backoff(attempt, exc)
+        if time.monotonic() + delay >= deadline:
+            return None
+        _count(self.name, "retries")
+        return delay
+
+    def _attempt_timeout(self, deadline: float) -> float:
+        """Time left for this attempt: what remains of the call's deadline."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise self._deadline_exceeded()
+        return remaining
+
+    def _deadline_exceeded(self) -> DeadlineExceeded:
+        self.breaker.record_failure()
+        _count(self.name, "failures")
+        return DeadlineExceeded(f"LLM call to {self.name!r} exceeded its deadline")
+
+    # ---- sync ----
+
+    def complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        deadline = time.monotonic() + self.policy.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._attempt_timeout(deadline)
+            self._attempt_started()
+            try:
+                with request_timeout(timeout):
+                    result = self.inner.complete(
+                        messages, system_prompt=system_prompt, max_tokens=max_tokens
+                    )
+            except Exception as exc:
+                delay = self._should_retry(exc, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def stream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> Iterator[str]:
+        deadline = time.monotonic() + self.policy.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._attempt_timeout(deadline)
+            self._attempt_started()
+            stream = self.inner.stream_complete(
+                messages, system_prompt=system_prompt, max_tokens=max_tokens
+            )
+            try:
+                # The request is sent when the stream is first advanced.
+                with request_timeout(timeout):
+                    first = next(stream)
+            except StopIteration:
+                self.breaker.record_success()
+                return
+            except Exception as exc:
+                delay = self._should_retry(exc, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            break
+        # Output has reached the caller: later errors are not retried.
+        try:
+            yield first
+            yield from stream
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    # ---- async ----
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        deadline = time.monotonic() + self.policy.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            self._attempt_started()
+            timeout = max(deadline - time.monotonic(), 0.001)
+            timer = asyncio.timeout(timeout)
+            try:
+                async with timer:
+                    with request_timeout(timeout):
+                        result = await self.inner.acomplete(
+                            messages, system_prompt=system_prompt, max_tokens=max_tokens
+                        )
+            except Exception as exc:
+                if timer.expired():
+                    raise self._deadline_exceeded() from exc
+                delay = self._should_retry(exc, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def astream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> AsyncIterator[str]:
+        deadline = time.monotonic() + self.policy.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            self._attempt_started()
+            stream = self.inner.astream_complete(
+                messages, system_prompt=system_prompt, max_tokens=max_tokens
+            )
+            timeout = max(deadline - time.monotonic(), 0.001)
+            timer = asyncio.timeout(timeout)
+            try:
+                async with timer:
+                    with request_timeout(timeout):
+                        first = await anext(stream)
+            except StopAsyncIteration:
+                self.breaker.record_success()
+                return
+            except Exception as exc:
+                await stream.aclose()
+                if timer.expired():
+                    raise self._deadline_exceeded() from exc
+                delay = self._should_retry(exc, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                await stream.aclose()
+                raise
+            self.breaker.record_success()
+            break
+        try:
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+
+def with_resilience(
+    llm: LLMProvider,
+    *,
+    name: str | None = None,
+    policy: RetryPolicy | None = None,
+) -> LLMProvider:
+    """
+    Wrap llm with retries and a circuit breaker. A RoutingProvider has each of its
+    providers wrapped instead, so breakers are per vendor and failover skips open ones.
+    name overrides the breaker name (e.g. to give a user's own API key its own breaker);
+    policy overrides the env-configured retry policy (e.g. a per-task deadline).
+    """
+    from providers.llm.routing import RoutingProvider
+
+    if isinstance(llm, ResilientProvider):
+        return llm
+    if isinstance(llm, RoutingProvider):
+        llm.providers = [
+            (
+                child,
+                p if isinstance(p, ResilientProvider) else ResilientProvider(p, name=child, policy=policy),
+            )
+            for child, p in llm.providers
+        ]
+        return llm
+    return ResilientProvider(llm, name=name, policy=policy)
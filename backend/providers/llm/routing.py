@@ -0,0 +1,446 @@
+"""Multi-provider LLM router with failover and hedging."""
+
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from providers.llm.base import LLMProvider, SystemPrompt
+
+POLICY_FAILOVER = "failover"
+POLICY_HEDGE = "hedge"
+POLICIES = (POLICY_FAILOVER, POLICY_HEDGE)
+
+DEFAULT_HEDGE_MIN_SECONDS = 0.5
+DEFAULT_HEDGE_MAX_SECONDS = 10.0
+DEFAULT_HEDGE_INITIAL_SECONDS = 3.0
+MIN_SAMPLES_FOR_P95 = 20
+SAMPLE_WINDOW = 200
+
+
+class LatencyTracker:
+    """Rolling window of time-to-first-token samples for one provider."""
+
+    def __init__(self, window: int = SAMPLE_WINDOW):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.ewma: float | None = None
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.ewma = seconds if self.ewma is None else 0.8 * self.ewma + 0.2 * seconds
+
+    def p95(self) -> float | None:
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES_FOR_P95:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+_trackers: dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(name: str) -> LatencyTracker:
+    """Process-wide latency tracker for a routed provider name."""
+    with _trackers_lock:
+        tracker = _trackers.get(name)
+        if tracker is None:
+            tracker = _trackers[name] = LatencyTracker()
+        return tracker
+
+
+def latency_snapshot() -> dict[str, dict[str, float | int | None]]:
+    """Observed TTFT stats per routed provider (for monitoring)."""
+    with _trackers_lock:
+        items = list(_trackers.items())
+    return {
+        name: {"samples": len(t), "ewma_seconds": t.ewma, "p95_seconds": t.p95()}
+        for name, t in items
+    }
+
+
+class RoutingProvider(LLMProvider):
+    """Routes each call across several providers according to a policy."""
+
+    name = "router"
+
+    def __init__(
+        self,
+        providers: list[tuple[str, LLMProvider]],
+        *,
+        policy: str = POLICY_FAILOVER,
+        hedge_min_seconds: float = DEFAULT_HEDGE_MIN_SECONDS,
+        hedge_max_seconds: float = DEFAULT_HEDGE_MAX_SECONDS,
+        hedge_initial_seconds: float = DEFAULT_HEDGE_INITIAL_SECONDS,
+    ):
+        if not providers:
+            raise ValueError("RoutingProvider needs at least one provider")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy {policy!r}; expected one of {POLICIES}")
+        self.providers = list(providers)
+        self.policy = policy
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_max_seconds = hedge_max_seconds
+        self.hedge_initial_seconds = hedge_initial_seconds
+        self.model = ",".join(
+            f"{name}/{getattr(provider, 'model', '')}" for name, provider in self.providers
+        )
+
+    @classmethod
+    def from_env(cls, build) -> "RoutingProvider":
+        """
+        Build from LLM_ROUTER_* env vars; build(name) returns a provider instance.
+
+        LLM_ROUTER_PROVIDERS: comma-separated provider names (default "openai,anthropic").
+        LLM_ROUTER_POLICY: "failover" or "hedge" (default "failover").
+        LLM_ROUTER_HEDGE_MIN_MS / LLM_ROUTER_HEDGE_MAX_MS / LLM_ROUTER_HEDGE_INITIAL_MS:
+            bounds on, and the pre-warm-up value of, the hedge threshold.
+        """
+        names = [
+            n.strip().lower()
+            for n in os.environ.get("LLM_ROUTER_PROVIDERS", "openai,anthropic").split(",")
+            if n.strip()
+        ]
+        if "router" in names:
+            raise ValueError("LLM_ROUTER_PROVIDERS cannot include 'router'")
+
+        def ms(var: str, default: float) -> float:
+            try:
+                return float(os.environ[var]) / 1000.0
+            except (KeyError, ValueError):
+                return default
+
+        return cls(
+            [(name, build(name)) for name in names],
+            policy=os.environ.get("LLM_ROUTER_POLICY", POLICY_FAILOVER).lower(),
+            hedge_min_seconds=ms("LLM_ROUTER_HEDGE_MIN_MS", DEFAULT_HEDGE_MIN_SECONDS),
+            hedge_max_seconds=ms("LLM_ROUTER_HEDGE_MAX_MS", DEFAULT_HEDGE_MAX_SECONDS),
+            hedge_initial_seconds=ms("LLM_ROUTER_HEDGE_INITIAL_MS", DEFAULT_HEDGE_INITIAL_SECONDS),
+        )
+
+    # ---- selection ----
+
+    def ordered(self) -> list[tuple[str, LLMProvider]]:
+        """
+        Providers in attempt order. The first is drawn with probability inversely
+        proportional to its observed TTFT (unmeasured providers count as fastest,
+        so they get explored); the rest follow from fastest to slowest.
+        """
+        if len(self.providers) == 1:
+            return list(self.providers)
+        ewmas = {name: get_tracker(name).ewma for name, _ in self.providers}
+        known = [v for v in ewmas.values() if v]
+        best = min(known) if known else 1.0
+        weights = [1.0 / (ewmas[name] or best) for name, _ in self.providers]
+        first = random.choices(range(len(self.providers)), weights=weights)[0]
+        rest = [p for i, p in enumerate(self.providers) if i != first]
+        rest.sort(key=lambda p: ewmas[p[0]] if ewmas[p[0]] is not None else 0.0)
+        return [self.providers[first], *rest]
+
+    def hedge_delay(self, name: str) -> float:
+        """Seconds to wait for a first token from name before starting a hedge."""
+        p95 = get_tracker(name).p95()
+        delay = self.hedge_initial_seconds if p95 is None else p95
+        return min(self.hedge_max_seconds, max(self.hedge_min_seconds, delay))
+
+    # ---- sync ----
+
+    def complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        def call(provider: LLMProvider) -> str:
+            return provider.complete(messages, system_prompt=system_prompt, max_tokens=max_tokens)
+
+        if self.policy == POLICY_HEDGE:
+            return self._hedged_call(call)
+        return self._failover_call(call)
+
+    def stream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> Iterator[str]:
+        def open_stream(provider: LLMProvider) -> Iterator[str]:
+            return provider.stream_complete(
+                messages, system_prompt=system_prompt, max_tokens=max_tokens
+            )
+
+        if self.policy == POLICY_HEDGE:
+            return self._hedged_stream(open_stream)
+        return self._failover_stream(open_stream)
+
+    def _failover_call(self, call):
+        last_error: Exception | None = None
+        for name, provider in self.ordered():
+            started = time.monotonic()
+            try:
+                result = call(provider)
+            except Exception as exc:
+                last_error = exc
+                continue
+            get_tracker(name).record(time.monotonic() - started)
+            return result
+        raise last_error
+
+    def _hedged_call(self, call):
+        order = self.ordered()
+        pool = ThreadPoolExecutor(max_workers=len(order), thread_name_prefix="llm-hedge")
+        pending: dict = {}
+        started: dict[str, float] = {}
+        last_error: Exception | None = None
+        try:
+            remaining = list(order)
+            while remaining or pending:
+                if remaining and not pending:
+                    name, provider = remaining.pop(0)
+                    started[name] = time.monotonic()
+                    pending[pool.submit(call, provider)] = name
+                timeout = self.hedge_delay(list(pending.values())[-1]) if remaining else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # No answer within the hedge threshold: start the next provider too.
+                    name, provider = remaining.pop(0)
+                    started[name] = time.monotonic()
+                    pending[pool.submit(call, provider)] = name
+                    continue
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        last_error = exc
+                        continue
+                    get_tracker(name).record(time.monotonic() - started[name])
+                    for loser in pending:
+                        loser.cancel()
+                    return result
+            raise last_error
+        finally:
+            # Losers that already started cannot be interrupted; let them finish off-thread.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _failover_stream(self, open_stream) -> Iterator[str]:
+        last_error: Exception | None = None
+        for name, provider in self.ordered():
+            started = time.monotonic()
+            stream = open_stream(provider)
+            try:
+                first = next(stream)
+            except StopIteration:
+                get_tracker(name).record(time.monotonic() - started)
+                return
+            except Exception as exc:
+                last_error = exc
+                continue
+            get_tracker(name).record(time.monotonic() - started)
+            try:
+                yield first
+                yield from stream
+            finally:
+                # Also when the caller stops early: end the upstream request.
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+            return
+        raise last_error
+
+    def _hedged_stream(self, open_stream) -> Iterator[str]:
+        order = self.ordered()
+        events: queue.Queue = queue.Queue()
+        attempts: dict[str, dict] = {}
+
+        def pump(name: str, provider: LLMProvider) -> None:
+            state = attempts[name]
+            stream = None
+            try:
+                stream = open_stream(provider)
+                for chunk in stream:
+                    if state["cancelled"]:
+                        break
+                    events.put((name, "chunk", chunk))
+                else:
+                    events.put((name, "end", None))
+            except Exception as exc:
+                events.put((name, "error", exc))
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+
+        def start(name: str, provider: LLMProvider) -> None:
+            attempts[name] = {"cancelled": False, "started": time.monotonic()}
+            threading.Thread(target=pump, args=(name, provider), daemon=True).start()
+
+        remaining = list(order)
+        winner: str | None = None
+        last_error: Exception | None = None
+        try:
+            start(*remaining.pop(0))
+            live = 1
+            while True:
+                timeout = None
+                if winner is None and remaining:
+                    newest = list(attempts)[-1]
+                    timeout = self.hedge_delay(newest)
+                try:
+                    name, kind, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    start(*remaining.pop(0))
+                    live += 1
+                    continue
+                if winner is not None and name != winner:
+                    continue
+                if kind == "chunk":
+                    if winner is None:
+                        winner = name
+                        get_tracker(name).record(time.monotonic() - attempts[name]["started"])
+                        for other, state in attempts.items():
+                            if other != name:
+                                state["cancelled"] = True
+                    yield value
+                elif kind == "end":
+                    if winner is None:
+                        winner = name
+                    return
+                else:
+                    if winner is not None:
+                        raise value
+                    last_error = value
+                    live -= 1
+                    if remaining:
+                        start(*remaining.pop(0))
+                        live += 1
+                    elif live == 0:
+                        raise last_error
+        finally:
+            for state in attempts.values():
+                state["cancelled"] = True
+
+    # ---- async ----
+
+    async def acomplete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> str:
+        order = self.ordered()
+        hedge = self.policy == POLICY_HEDGE
+        tasks: dict[asyncio.Task, tuple[str, float]] = {}
+        last_error: Exception | None = None
+
+        def start(name: str, provider: LLMProvider) -> None:
+            task = asyncio.ensure_future(
+                provider.acomplete(messages, system_prompt=system_prompt, max_tokens=max_tokens)
+            )
+            tasks[task] = (name, time.monotonic())
+
+        remaining = list(order)
+        try:
+            while remaining or tasks:
+                if remaining and not tasks:
+                    start(*remaining.pop(0))
+                timeout = None
+                if hedge and remaining:
+                    timeout = self.hedge_delay(list(tasks.values())[-1][0])
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    start(*remaining.pop(0))
+                    continue
+                for task in done:
+                    name, started = tasks.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    get_tracker(name).record(time.monotonic() - started)
+                    return task.result()
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def astream_complete(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        system_prompt: SystemPrompt | None = None,
+        max_tokens: int = 2048,
+    ) -> AsyncIterator[str]:
+        order = self.ordered()
+        hedge = self.policy == POLICY_HEDGE
+        attempts: dict[asyncio.Task, tuple[str, AsyncIterator[str], float]] = {}
+        last_error: Exception | None = None
+
+        def start(name: str, provider: LLMProvider) -> None:
+            stream = provider.astream_complete(
+                messages, system_prompt=system_prompt, max_tokens=max_tokens
+            )
+            task = asyncio.ensure_future(anext(stream))
+            attempts[task] = (name, stream, time.monotonic())
+
+        remaining = list(order)
+        winner = None
+        try:
+            while remaining or attempts:
+                if remaining and not attempts:
+                    start(*remaining.pop(0))
+                timeout = None
+                if hedge and remaining:
+                    timeout = self.hedge_delay(list(attempts.values())[-1][0])
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    start(*remaining.pop(0))
+                    continue
+                for task in done:
+                    name, stream, started = attempts.pop(task)
+                    if isinstance(task.exception(), StopAsyncIteration):
+                        get_tracker(name).record(time.monotonic() - started)
+                        return
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    get_tracker(name).record(time.monotonic() - started)
+                    winner = (stream, task.result())
+                    break
+                if winner is not None:
+                    break
+            if winner is None:
+                raise last_error
+        finally:
+            for task, (_, stream, _) in attempts.items():
+                task.cancel()
+                try:
+                    await task
+                except BaseException:
+                    pass
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        stream, first = winner
+        try:
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            # Also when the caller stops early: end the upstream request.
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
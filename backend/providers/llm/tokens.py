@@ -0,0 +1,104 @@
+"""Token counting and context-window budgets for LLM prompts."""
+
+import math
+import os
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+DEFAULT_CONTEXT_WINDOW = 32_768
+DEFAULT_PROMPT_MAX_TOKENS = 16_000
+
+# Longest matching prefix wins.
+CONTEXT_WINDOWS: dict[str, int] = {
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+    "gpt-5": 400_000,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4": 200_000,
+    "claude-": 200_000,
+}
+
+
+def context_window(model: str | None) -> int:
+    """
+    Context window in tokens for model. For a routed model string
+    ("openai/gpt-4o-mini,anthropic/claude-..."), the smallest window applies.
+    """
+    if not isinstance(model, str) or not model:
+        return DEFAULT_CONTEXT_WINDOW
+    if "," in model or "/" in model:
+        return min(context_window(part.rsplit("/", 1)[-1]) for part in model.split(","))
+    matches = [prefix for prefix in CONTEXT_WINDOWS if model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+def approximate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def count_tokens(text: str | None, model: str | None = None) -> int:
+    """
+    Estimated tokens text takes for model. Counts are approximate for every
+    vendor (CHARS_PER_TOKEN characters per token, which slightly over-counts
+    English prose), so budgets err on the safe side.
+    """
+    return approximate_tokens(text or "")
+
+
+def count_message_tokens(message: dict, model: str | None = None) -> int:
+    """Tokens for one chat message, including per-message framing overhead."""
+    count = message.get("token_count")
+    if count is None:
+        count = count_tokens(message.get("content"), model)
+    return count + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str | None = None) -> str:
+    """Cut text so that it fits in max_tokens, preferring a whitespace boundary."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    cut = text[: max_tokens * CHARS_PER_TOKEN]
+    space = cut.rfind(" ", len(cut) // 2)
+    return cut[:space] if space > 0 else cut
+
+
+def prompt_budget(model: str | None, max_output_tokens: int) -> int:
+    """Tokens available for the prompt: the context window minus the reply, capped."""
+    try:
+        cap = int(os.environ.get("LLM_PROMPT_MAX_TOKENS", DEFAULT_PROMPT_MAX_TOKENS))
+    except ValueError:
+        cap = DEFAULT_PROMPT_MAX_TOKENS
+    return max(0, min(context_window(model) - max_output_tokens, cap))
+
+
+def allocate(
+    needs: dict[str, int],
+    budget: int,
+    shares: dict[str, float],
+) -> dict[str, int]:
+    """
+    Split budget between sections. Each section first gets up to its share of the
+    budget; whatever is left over then goes to sections that still need more, in
+    priority order (the order of shares).
+    """
+    grants = {
+        name: min(needs.get(name, 0), int(budget * share))
+        for name, share in shares.items()
+    }
+    left = budget - sum(grants.values())
+    for name in shares:
+        if left <= 0:
+            break
+        extra = min(needs.get(name, 0) - grants[name], left)
+        if extra > 0:
+            grants[name] += extra
+            left -= extra
+    return grants
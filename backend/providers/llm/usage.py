@@ -0,0 +1,111 @@
+"""Token usage reporting from providers to callers."""
+
+import threading
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class Usage:
+    """Token counts for one or more upstream calls."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    def add(self, other: "Usage") -> None:
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cache_read_tokens += other.cache_read_tokens
+        self.cache_write_tokens += other.cache_write_tokens
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+# Active collectors, innermost last; nested collect() blocks all see the usage.
+_current: ContextVar[tuple[Usage, ...]] = ContextVar("llm_usage", default=())
+_totals: dict[str, Usage] = defaultdict(Usage)
+_totals_lock = threading.Lock()
+
+
+def record(
+    model: str | None,
+    *,
+    input_tokens: int | None = 0,
+    output_tokens: int | None = 0,
+    cache_read_tokens: int | None = 0,
+    cache_write_tokens: int | None = 0,
+) -> None:
+    """Report usage of one upstream call to the active collector and the totals."""
+    usage = Usage(
+        input_tokens=input_tokens or 0,
+        output_tokens=output_tokens or 0,
+        cache_read_tokens=cache_read_tokens or 0,
+        cache_write_tokens=cache_write_tokens or 0,
+    )
+    for collector in _current.get():
+        collector.add(usage)
+    with _totals_lock:
+        _totals[model or "unknown"].add(usage)
+
+
+@contextmanager
+def collect(collector: Usage | None = None) -> Iterator[Usage]:
+    """
+    Collect usage recorded inside the block into collector (a new Usage by default).
+    Blocks nest: enclosing collectors keep receiving usage too.
+    """
+    collector = collector if collector is not None else Usage()
+    token = _current.set((*_current.get(), collector))
+    try:
+        yield collector
+    finally:
+        _current.reset(token)
+
+
+def track(stream: Iterator[str], collector: Usage) -> Iterator[str]:
+    """Iterate stream, collecting the usage it records into collector."""
+    try:
+        while True:
+            with collect(collector):
+                try:
+                    chunk = next(stream)
+                except StopIteration:
+                    return
+            yield chunk
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+
+async def atrack(stream: AsyncIterator[str], collector: Usage) -> AsyncIterator[str]:
+    """Async variant of track(); the upstream is closed if iteration stops early."""
+    try:
+        while True:
+            with collect(collector):
+                try:
+                    chunk = await anext(stream)
+                except StopAsyncIteration:
+                    return
+            yield chunk
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def totals() -> dict[str, dict[str, int]]:
+    """Usage per model since process start (for monitoring)."""
+    with _totals_lock:
+        return {model: usage.as_dict() for model, usage in _totals.items()}
+
+
+def reset_totals() -> None:
+    with _totals_lock:
+        _totals.clear()
@@ -27,17 +27,30 @@ export default function CoverLetterPage() {
     setLoading(true);
     setCoverLetter(null);
     try {
-      const res = await fetch(getApiUrl("/api/ai/cover-letter"), {
+      const res = await fetch(getApiUrl("/api/ai/cover-letter/stream"), {
         method: "POST",
         credentials: "include",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ job_description: jd, tone }),
       });
-      const data = await res.json();
       if (!res.ok) {
-        throw new Error(data.detail ?? "Failed to generate cover letter");
+        const data = await res.json().catch(() => ({}));
+        throw new Error((data as { detail?: string }).detail ?? "Failed to generate cover letter");
       }
-      setCoverLetter(data.cover_letter ?? "");
+      // Show the letter as it is written.
+      const reader = res.body?.getReader();
+      const decoder = new TextDecoder();
+      let accumulated = "";
+      setCoverLetter("");
+      if (reader) {
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          accumulated += decoder.decode(value, { stream: true });
+          setCoverLetter(accumulated);
+        }
+      }
+      setCoverLetter(accumulated.trim());
     } catch (e) {
       setError(e instanceof Error ? e.message : "Failed to generate cover letter");
     } finally {